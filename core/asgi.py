@@ -1,5 +1,28 @@
 """
 ASGI config for gestao_veiculos project.
+
+O servidor principal é o WSGI (core/wsgi.py). O ASGI serve só as views
+async, o dashboard e os relatórios, que fazem as consultas em paralelo
+(veiculos/paralelo.py) sem prender um worker enquanto esperam o banco:
+
+    gunicorn core.wsgi:application --workers 4 --threads 4
+    uvicorn core.asgi:application --workers 2 --port 8001
+
+    # nginx: só as views async vão para o uvicorn
+    location = /                         { proxy_pass http://127.0.0.1:8001; }
+    location = /relatorios/geral/        { proxy_pass http://127.0.0.1:8001; }
+    location = /relatorios/por-veiculo/  { proxy_pass http://127.0.0.1:8001; }
+    location /                           { proxy_pass http://127.0.0.1:8000; }
+
+Por que não servir tudo por ASGI: o Django consome o iterador síncrono de
+uma StreamingHttpResponse inteiro em memória antes de enviar, então as
+exportações (veiculos/exportacao.py) perdem o streaming e as imagens
+redimensionadas (veiculos/redimensionamento.py) perdem o sendfile; e as
+views síncronas, que são quase todas, passam a rodar no executor de
+sync_to_async do processo em vez de em workers próprios.
+
+Sob WSGI as views async também funcionam e continuam consultando em
+paralelo (cada requisição roda o seu loop); o ASGI só poupa os workers.
 """
 
 import os
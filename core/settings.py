@@ -25,19 +25,25 @@ INSTALLED_APPS = [
     'django.contrib.contenttypes',
     'django.contrib.sessions',
     'django.contrib.messages',
+    # runserver serve os estáticos pelo WhiteNoise, como em produção
+    'whitenoise.runserver_nostatic',
     'django.contrib.staticfiles',
     'django.contrib.humanize',
     'veiculos',
 ]
 
 MIDDLEWARE = [
+    # Primeiro da lista, para medir a requisição inteira (veja veiculos/middleware.py)
+    'veiculos.middleware.InstrumentacaoSQLMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'veiculos.roteamento.ReplicaMiddleware',
 ]
 
 ROOT_URLCONF = 'core.urls'
@@ -75,6 +81,19 @@ DATABASES = {
     }
 }
 
+# Réplica de leitura (opcional). Com o alias abaixo em DATABASES, os
+# relatórios e as listagens leem dela; o dashboard, que vem do cache, é
+# calculado no principal (veja veiculos/roteamento.py):
+# DATABASES['replica'] = {
+#     **DATABASES['default'],
+#     'HOST': 'replica.local',
+#     'TEST': {'MIRROR': 'default'},
+# }
+DATABASE_ROUTERS = ['veiculos.roteamento.RoteadorReplica']
+VEICULOS_BANCO_LEITURA = 'replica'
+# Segundos lendo do principal depois de uma escrita (ler os próprios dados)
+VEICULOS_JANELA_ESCRITA = 10
+
 
 # Password validation
 
@@ -111,11 +130,35 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = [
     BASE_DIR / 'static',
 ]
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# collectstatic gera nomes com hash do conteúdo (app.3f2a1c.css) e as versões
+# .gz/.br de cada arquivo. O WhiteNoise serve a versão comprimida que o
+# navegador aceita e, para os nomes com hash, Cache-Control de 10 anos
+# (immutable): um arquivo alterado ganha outro nome.
+# O CSS vem do Tailwind compilado: python manage.py compilar_css
+STORAGES = {
+    # Uploads guardados pelo hash do conteúdo: a mesma foto é gravada uma vez
+    # só (veja veiculos/armazenamento.py)
+    'default': {
+        'BACKEND': 'veiculos.armazenamento.ArmazenamentoConteudo',
+    },
+    'staticfiles': {
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
 
 # Media files (Uploads de usuários)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Cache das imagens redimensionadas sob demanda (veiculos/redimensionamento.py):
+# os arquivos menos usados são apagados quando o limite é ultrapassado
+VEICULOS_CACHE_IMAGENS_DIR = BASE_DIR / 'cache_imagens'
+VEICULOS_CACHE_IMAGENS_MB = 500
+# Com nginx, o envio pode ficar com ele (location internal apontando para o cache):
+# VEICULOS_CACHE_IMAGENS_X_ACCEL = '/cache-imagens-interno/'
+
 # Default primary key field type
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -125,3 +168,50 @@ USE_L10N = True
 USE_THOUSAND_SEPARATOR = True
 DECIMAL_SEPARATOR = ','
 THOUSAND_SEPARATOR = '.'
+
+# Cache (dashboard, veja veiculos/cache.py)
+# Com mais de um processo, use um backend compartilhado, por exemplo:
+# 'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://127.0.0.1:6379/1'
+# ou 'django.core.cache.backends.filebased.FileBasedCache' com um diretório comum
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'gestao-veiculos',
+    }
+}
+
+# Requisições lentas (veiculos/middleware.py): acima destes limites, a
+# requisição é registrada com as queries mais lentas e as repetidas (N+1)
+VEICULOS_REQUISICAO_LENTA_MS = 500
+VEICULOS_REQUISICAO_LENTA_QUERIES = 100
+
+# Token da API JSON (veiculos/api.py): com ele definido, as requisições
+# precisam do cabeçalho "Authorization: Bearer <token>". Sem token, a API
+# só aceita leituras (as gravações em lote respondem 403)
+VEICULOS_API_TOKEN = None
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        # Uma linha JSON por requisição lenta
+        'json': {'format': '{"hora": "%(asctime)s", "requisicao": %(message)s}'},
+    },
+    'handlers': {
+        'requisicoes_lentas': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'json',
+        },
+        # Para gravar em arquivo:
+        # 'class': 'logging.handlers.RotatingFileHandler',
+        # 'filename': BASE_DIR / 'logs' / 'requisicoes_lentas.log',
+        # 'maxBytes': 10 * 1024 * 1024, 'backupCount': 5,
+    },
+    'loggers': {
+        'veiculos.requisicoes_lentas': {
+            'handlers': ['requisicoes_lentas'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
@@ -1,5 +1,10 @@
 """
 WSGI config for gestao_veiculos project.
+
+Servidor principal em produção, ex.:
+    gunicorn core.wsgi:application --workers 4 --threads 4
+
+As views async (dashboard e relatórios) podem ir para o ASGI; veja core/asgi.py.
 """
 
 import os
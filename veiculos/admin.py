@@ -1,7 +1,7 @@
 from django.contrib import admin
 from .models import (
     Fornecedor, Cliente, Veiculo, VeiculoImagem, TipoDespesa, 
-    Despesa, FormaPagamento, Venda
+    Despesa, FormaPagamento, Venda, Tarefa, ResumoDiario
 )
 
 
@@ -27,7 +27,7 @@ class VeiculoImagemInline(admin.TabularInline):
 
 @admin.register(Veiculo)
 class VeiculoAdmin(admin.ModelAdmin):
-    list_display = ['marca', 'modelo', 'ano', 'placa', 'renavam', 'status', 'valor_compra', 'valor_venda']
+    list_display = ['marca', 'modelo', 'ano', 'placa', 'renavam', 'status', 'valor_compra', 'valor_venda', 'total_despesas', 'qtd_despesas']
     list_filter = ['status', 'marca', 'ano']
     search_fields = ['marca', 'modelo', 'placa', 'chassi', 'renavam']
     date_hierarchy = 'data_compra'
@@ -36,8 +36,8 @@ class VeiculoAdmin(admin.ModelAdmin):
 
 @admin.register(VeiculoImagem)
 class VeiculoImagemAdmin(admin.ModelAdmin):
-    list_display = ['veiculo', 'descricao', 'principal', 'ordem', 'data_upload']
-    list_filter = ['principal', 'data_upload']
+    list_display = ['veiculo', 'descricao', 'principal', 'ordem', 'processamento', 'data_upload']
+    list_filter = ['principal', 'processamento', 'data_upload']
     search_fields = ['veiculo__placa', 'descricao']
 
 
@@ -67,3 +67,17 @@ class VendaAdmin(admin.ModelAdmin):
     list_filter = ['forma_pagamento', 'data_venda']
     search_fields = ['veiculo__placa', 'cliente__nome']
     date_hierarchy = 'data_venda'
+
+
+@admin.register(Tarefa)
+class TarefaAdmin(admin.ModelAdmin):
+    list_display = ['id', 'tipo', 'status', 'tentativas', 'criada_em', 'concluida_em']
+    list_filter = ['tipo', 'status']
+    readonly_fields = ['criada_em', 'iniciada_em', 'concluida_em']
+
+
+@admin.register(ResumoDiario)
+class ResumoDiarioAdmin(admin.ModelAdmin):
+    list_display = ['data', 'qtd_vendas', 'total_vendas', 'total_entradas', 'total_despesas', 'lucro', 'atualizado_em']
+    date_hierarchy = 'data'
+    readonly_fields = ['data', 'qtd_vendas', 'total_vendas', 'total_entradas', 'total_despesas', 'lucro', 'atualizado_em']
@@ -0,0 +1,479 @@
+"""
+API JSON de veículos, vendas, despesas, clientes e fornecedores.
+
+    GET   /api/<recurso>/            lista paginada por cursor
+    GET   /api/<recurso>/<id>/       um registro
+    POST  /api/<recurso>/lote/       cria uma lista de registros
+    PATCH /api/<recurso>/lote/       atualiza uma lista de registros (com "id")
+
+Parâmetros das leituras:
+    fields=id,placa,fornecedor.nome   só esses campos (values(); campos de
+                                      relacionados viram JOIN na mesma query)
+    limite=500                        itens por página (máximo LIMITE_MAXIMO)
+    cursor=...                        vem pronto em "proximo"/"anterior"
+    atualizado_desde=2024-01-01T00:00 só o que mudou desde então
+    <campo>=valor                     filtros de igualdade (ver Recurso.filtros)
+
+Campos calculados só vêm quando pedidos em fields= (custam uma consulta
+por página). Em veículos, fields=id,imagens traz as fotos com a URL do
+original e, para cada tamanho de tamanhos=800x600,320x240 (padrão
+TAMANHOS_IMAGEM), a URL assinada da versão reduzida sob demanda.
+
+As gravações em lote valem tudo ou nada: os itens são validados juntos (as
+chaves estrangeiras e os campos únicos com uma consulta por campo, não por
+item) e, sem erros, gravados em uma única transação com bulk_create /
+bulk_update. Vendas são gravadas uma a uma com save(), que trava o veículo
+(veja Venda.save).
+
+Com settings.VEICULOS_API_TOKEN definido, toda requisição precisa do
+cabeçalho "Authorization: Bearer <token>". Sem ele só as leituras
+funcionam: as gravações respondem 403, porque dispensam o token CSRF e
+qualquer página aberta no navegador do usuário poderia enviá-las.
+"""
+import hmac
+import json
+import re
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_http_methods
+
+from .cache import invalidar as invalidar_cache
+from .models import Cliente, Despesa, Fornecedor, Veiculo, VeiculoImagem, Venda, VendaConflito
+from .paginacao import KeysetPaginator
+from .redimensionamento import LADO_MAXIMO, url_redimensionada
+from .roteamento import usar_replica
+
+LIMITE_PADRAO = 100
+LIMITE_MAXIMO = 1000
+LOTE_MAXIMO = 1000
+TAMANHO_LOTE = 500
+TAMANHOS_IMAGEM = '320x240,800x600'
+TAMANHOS_MAXIMO = 5
+
+_TAMANHO = re.compile(r'^(\d+)x(\d+)$')
+
+
+def _campos(*nomes):
+    """Nome na API -> lookup do ORM ('fornecedor.nome' -> 'fornecedor__nome')"""
+    return {nome: nome.replace('.', '__') for nome in nomes}
+
+
+@dataclass
+class Recurso:
+    model: type
+    campos: dict            # campos de leitura: nome na API -> lookup de values()
+    gravaveis: tuple        # campos aceitos em POST/PATCH
+    filtros: tuple = ()     # campos filtráveis por igualdade na query string
+    um_a_um: bool = False   # grava com save() (regras do Model.save), não em massa
+    calculados: dict = None  # campos fora do values(): nome -> função(request, ids) -> {id: valor}
+
+    @property
+    def padrao(self):
+        """Campos quando não há fields=: os do próprio model"""
+        return [nome for nome in self.campos if '.' not in nome]
+
+
+def _tamanhos(valor):
+    """'800x600,320x240' -> [(800, 600), (320, 240)]"""
+    tamanhos = []
+    for tamanho in (valor or TAMANHOS_IMAGEM).split(','):
+        match = _TAMANHO.match(tamanho.strip())
+        maximo = getattr(settings, 'VEICULOS_REDIMENSIONAR_MAXIMO', LADO_MAXIMO)
+        if not match or not all(0 < int(lado) <= maximo for lado in match.groups()):
+            raise ErroApi(f'tamanhos: use LARGURAxALTURA, com lados de 1 a {maximo}.')
+        tamanhos.append((int(match[1]), int(match[2])))
+    if len(tamanhos) > TAMANHOS_MAXIMO:
+        raise ErroApi(f'tamanhos: no máximo {TAMANHOS_MAXIMO}.')
+    return tamanhos
+
+
+def _imagens(request, ids):
+    tamanhos = _tamanhos(request.GET.get('tamanhos'))
+    storage = VeiculoImagem._meta.get_field('imagem').storage
+    imagens = {pk: [] for pk in ids}
+    for imagem in VeiculoImagem.objects.filter(veiculo_id__in=ids).values(
+        'id', 'veiculo_id', 'imagem', 'descricao', 'principal',
+    ):
+        imagens[imagem['veiculo_id']].append({
+            'id': imagem['id'],
+            'descricao': imagem['descricao'],
+            'principal': imagem['principal'],
+            'url': request.build_absolute_uri(storage.url(imagem['imagem'])),
+            'url_redimensionada': {
+                f'{largura}x{altura}': request.build_absolute_uri(
+                    url_redimensionada(imagem['imagem'], largura, altura)
+                )
+                for largura, altura in tamanhos
+            },
+        })
+    return imagens
+
+
+RECURSOS = {
+    'veiculos': Recurso(
+        Veiculo,
+        campos=_campos(
+            'id', 'marca', 'modelo', 'ano', 'placa', 'renavam', 'cor', 'km', 'chassi',
+            'valor_compra', 'valor_venda', 'status', 'observacoes', 'data_compra',
+            'data_cadastro', 'atualizado_em', 'total_despesas', 'qtd_despesas',
+            'fornecedor', 'fornecedor.nome',
+        ),
+        gravaveis=(
+            'marca', 'modelo', 'ano', 'placa', 'renavam', 'cor', 'km', 'chassi',
+            'valor_compra', 'valor_venda', 'fornecedor', 'status', 'observacoes', 'data_compra',
+        ),
+        filtros=('status', 'placa', 'fornecedor'),
+        calculados={'imagens': _imagens},
+    ),
+    'vendas': Recurso(
+        Venda,
+        campos=_campos(
+            'id', 'veiculo', 'veiculo.placa', 'cliente', 'cliente.nome', 'valor_venda',
+            'veiculo_entrada', 'veiculo_entrada.placa', 'valor_entrada',
+            'forma_pagamento', 'forma_pagamento.nome', 'observacoes', 'data_venda',
+            'data_cadastro', 'atualizado_em',
+        ),
+        gravaveis=(
+            'veiculo', 'cliente', 'valor_venda', 'veiculo_entrada', 'valor_entrada',
+            'forma_pagamento', 'data_venda', 'observacoes',
+        ),
+        filtros=('veiculo', 'cliente', 'data_venda'),
+        um_a_um=True,
+    ),
+    'despesas': Recurso(
+        Despesa,
+        campos=_campos(
+            'id', 'veiculo', 'veiculo.placa', 'tipo', 'tipo.nome', 'fornecedor',
+            'fornecedor.nome', 'valor', 'descricao', 'data_despesa', 'data_cadastro',
+            'atualizado_em',
+        ),
+        gravaveis=('veiculo', 'tipo', 'fornecedor', 'valor', 'descricao', 'data_despesa'),
+        filtros=('veiculo', 'tipo', 'fornecedor', 'data_despesa'),
+    ),
+    'clientes': Recurso(
+        Cliente,
+        campos=_campos(
+            'id', 'nome', 'cpf', 'telefone', 'email', 'endereco', 'data_cadastro', 'atualizado_em',
+        ),
+        gravaveis=('nome', 'cpf', 'telefone', 'email', 'endereco'),
+        filtros=('cpf',),
+    ),
+    'fornecedores': Recurso(
+        Fornecedor,
+        campos=_campos(
+            'id', 'nome', 'cnpj_cpf', 'telefone', 'email', 'endereco', 'ativo',
+            'data_cadastro', 'atualizado_em',
+        ),
+        gravaveis=('nome', 'cnpj_cpf', 'telefone', 'email', 'endereco', 'ativo'),
+        filtros=('cnpj_cpf', 'ativo'),
+    ),
+}
+
+
+class ErroApi(Exception):
+    def __init__(self, mensagem, status=400):
+        super().__init__(mensagem)
+        self.status = status
+
+    def resposta(self):
+        return JsonResponse({'erro': str(self)}, status=self.status)
+
+
+def api_view(view):
+    """
+    Confere o token (obrigatório nas gravações) e transforma ErroApi em
+    resposta JSON
+    """
+    def _view(request, *args, **kwargs):
+        token = getattr(settings, 'VEICULOS_API_TOKEN', None)
+        if token:
+            enviado = request.headers.get('Authorization', '').removeprefix('Bearer ')
+            if not hmac.compare_digest(enviado.encode(), token.encode()):
+                return JsonResponse({'erro': 'Token inválido.'}, status=401)
+        elif request.method not in ('GET', 'HEAD', 'OPTIONS'):
+            return JsonResponse(
+                {'erro': 'Gravação pela API desativada: defina settings.VEICULOS_API_TOKEN.'},
+                status=403,
+            )
+        try:
+            return view(request, *args, **kwargs)
+        except ErroApi as e:
+            return e.resposta()
+    return _view
+
+
+# ============= LEITURA =============
+
+def _campos_pedidos(recurso, fields):
+    """[(nome, lookup)]; lookup None para os campos calculados"""
+    calculados = recurso.calculados or {}
+    nomes = [nome.strip() for nome in fields.split(',') if nome.strip()] if fields else recurso.padrao
+    desconhecidos = [nome for nome in nomes if nome not in recurso.campos and nome not in calculados]
+    if desconhecidos:
+        raise ErroApi(f'Campos desconhecidos: {", ".join(desconhecidos)}.')
+    return [(nome, recurso.campos.get(nome)) for nome in dict.fromkeys(nomes)]
+
+
+def _serializar(request, recurso, campos, itens):
+    """Itens de values() -> dicts da resposta, com uma consulta por campo calculado"""
+    ids = [item['id'] for item in itens]
+    calculados = {
+        nome: recurso.calculados[nome](request, ids)
+        for nome, lookup in campos if lookup is None
+    }
+    return [
+        {
+            nome: calculados[nome][item['id']] if lookup is None else item[lookup]
+            for nome, lookup in campos
+        }
+        for item in itens
+    ]
+
+
+def _converter(field, valor):
+    try:
+        return field.to_python(valor)
+    except ValidationError as e:
+        raise ErroApi(f'{field.name}: {" ".join(e.messages)}')
+
+
+def _filtrar(recurso, parametros):
+    queryset = recurso.model.objects.all()
+    opts = recurso.model._meta
+    for nome in recurso.filtros:
+        if nome in parametros:
+            field = opts.get_field(nome)
+            queryset = queryset.filter(**{field.attname: _converter(field, parametros[nome])})
+    if 'atualizado_desde' in parametros:
+        desde = _converter(opts.get_field('atualizado_em'), parametros['atualizado_desde'])
+        queryset = queryset.filter(atualizado_em__gte=desde)
+    return queryset
+
+
+def _limite(valor):
+    if not valor:
+        return LIMITE_PADRAO
+    if not valor.isdigit() or not 1 <= int(valor) <= LIMITE_MAXIMO:
+        raise ErroApi(f'limite deve ser um número entre 1 e {LIMITE_MAXIMO}.')
+    return int(valor)
+
+
+def _url_cursor(request, cursor):
+    if cursor is None:
+        return None
+    parametros = request.GET.copy()
+    parametros['cursor'] = cursor
+    return request.build_absolute_uri(f'{request.path}?{parametros.urlencode()}')
+
+
+@usar_replica
+@require_GET
+@api_view
+def lista(request, recurso):
+    recurso = RECURSOS[recurso]
+    campos = _campos_pedidos(recurso, request.GET.get('fields'))
+    queryset = _filtrar(recurso, request.GET)
+    limite = _limite(request.GET.get('limite'))
+
+    # id sempre vem: é a ordenação do cursor
+    lookups = dict.fromkeys(['id'] + [lookup for _, lookup in campos if lookup])
+    pagina = KeysetPaginator(queryset.values(*lookups), ('id',), por_pagina=limite).get_page(
+        request.GET.get('cursor')
+    )
+    return JsonResponse({
+        'resultados': _serializar(request, recurso, campos, list(pagina)),
+        'proximo': _url_cursor(request, pagina.proximo_cursor),
+        'anterior': _url_cursor(request, pagina.cursor_anterior),
+    })
+
+
+@usar_replica
+@require_GET
+@api_view
+def detalhe(request, recurso, pk):
+    recurso = RECURSOS[recurso]
+    campos = _campos_pedidos(recurso, request.GET.get('fields'))
+    lookups = {'id'} | {lookup for _, lookup in campos if lookup}
+    item = recurso.model.objects.filter(pk=pk).values(*lookups).first()
+    if item is None:
+        raise ErroApi('Registro não encontrado.', status=404)
+    return JsonResponse(_serializar(request, recurso, campos, [item])[0])
+
+
+# ============= GRAVAÇÃO EM LOTE =============
+
+def _ler_itens(request):
+    # Só JSON: formulários de outros sites não conseguem enviar este tipo
+    # sem preflight de CORS, então a API dispensa o token CSRF
+    if request.content_type != 'application/json':
+        raise ErroApi('Envie os dados como application/json.', status=415)
+    try:
+        itens = json.loads(request.body)
+    except ValueError:
+        raise ErroApi('JSON inválido.')
+    if not isinstance(itens, list) or not all(isinstance(item, dict) for item in itens):
+        raise ErroApi('Envie uma lista de objetos.')
+    if not itens:
+        raise ErroApi('A lista está vazia.')
+    if len(itens) > LOTE_MAXIMO:
+        raise ErroApi(f'No máximo {LOTE_MAXIMO} itens por requisição.', status=413)
+    return itens
+
+
+def _atribuir(recurso, obj, dados, erros):
+    for nome, valor in dados.items():
+        if nome == 'id':
+            continue
+        if nome not in recurso.gravaveis:
+            erros[nome] = ['Campo desconhecido ou somente leitura.']
+            continue
+        field = recurso.model._meta.get_field(nome)
+        try:
+            setattr(obj, field.attname, None if valor is None else field.to_python(valor))
+        except ValidationError as e:
+            erros[nome] = e.messages
+
+
+def _validar(recurso, objs, erros):
+    """
+    Validação do model em cada item, sem as consultas por item: chaves
+    estrangeiras e campos únicos são conferidos com uma consulta por campo.
+    """
+    opts = recurso.model._meta
+    relacoes = [field for field in opts.concrete_fields if field.is_relation]
+    for obj, erros_item in zip(objs, erros):
+        if 'id' in erros_item:
+            continue
+        try:
+            obj.full_clean(
+                exclude=[field.name for field in relacoes] + list(erros_item),
+                validate_unique=False,
+            )
+        except ValidationError as e:
+            for campo, mensagens in e.message_dict.items():
+                erros_item.setdefault(campo, []).extend(mensagens)
+        for field in relacoes:
+            if getattr(obj, field.attname) is None and not field.null:
+                erros_item.setdefault(field.name, []).append('Este campo é obrigatório.')
+
+    for field in relacoes:
+        ids = {getattr(obj, field.attname) for obj in objs} - {None}
+        existentes = set(
+            field.related_model._base_manager.filter(pk__in=ids).values_list('pk', flat=True)
+        ) if ids else set()
+        for obj, erros_item in zip(objs, erros):
+            if getattr(obj, field.attname) not in existentes | {None}:
+                erros_item.setdefault(field.name, []).append('Registro não encontrado.')
+
+    for field in opts.concrete_fields:
+        if not field.unique or field.primary_key:
+            continue
+        indices = {}
+        for i, obj in enumerate(objs):
+            valor = getattr(obj, field.attname)
+            if valor in field.empty_values:
+                continue
+            if valor in indices:
+                erros[i].setdefault(field.name, []).append('Valor repetido no lote.')
+            indices.setdefault(valor, i)
+        existentes = recurso.model._base_manager.filter(
+            **{f'{field.attname}__in': list(indices)}
+        ).values_list(field.attname, 'pk') if indices else []
+        for valor, pk in existentes:
+            i = indices[valor]
+            if objs[i].pk != pk:
+                erros[i].setdefault(field.name, []).append(
+                    f'Já existe {opts.verbose_name} com este {field.verbose_name}.'
+                )
+
+
+def _resposta_erros(erros):
+    return JsonResponse(
+        {'erros': {str(i): erros_item for i, erros_item in enumerate(erros) if erros_item}},
+        status=400,
+    )
+
+
+def _montar_criacao(recurso, itens):
+    objs, erros = [], []
+    for dados in itens:
+        obj, erros_item = recurso.model(), {}
+        _atribuir(recurso, obj, dados, erros_item)
+        objs.append(obj)
+        erros.append(erros_item)
+    return objs, erros, None
+
+
+def _montar_atualizacao(recurso, itens):
+    ids = [dados.get('id') for dados in itens]
+    if not all(isinstance(pk, int) for pk in ids):
+        raise ErroApi('Todos os itens precisam de "id" numérico.')
+    existentes = recurso.model.objects.in_bulk(ids)
+    objs, erros, campos = [], [], set()
+    for dados in itens:
+        obj, erros_item = existentes.get(dados['id']), {}
+        if obj is None:
+            erros_item['id'] = ['Registro não encontrado.']
+            obj = recurso.model(pk=dados['id'])
+        elif any(outro is obj for outro in objs):
+            erros_item['id'] = ['Registro repetido no lote.']
+        else:
+            _atribuir(recurso, obj, dados, erros_item)
+        campos.update(nome for nome in dados if nome in recurso.gravaveis)
+        objs.append(obj)
+        erros.append(erros_item)
+    return objs, erros, sorted(campos)
+
+
+def _gravar(recurso, objs, campos):
+    """Tudo em uma transação; campos=None cria, senão atualiza esses campos"""
+    model = recurso.model
+    with transaction.atomic():
+        if recurso.um_a_um:
+            for i, obj in enumerate(objs):
+                try:
+                    obj.save()
+                except VendaConflito as e:
+                    raise ErroApi(f'Item {i}: {e}', status=409)
+        elif campos is None:
+            model.objects.bulk_create(objs, batch_size=TAMANHO_LOTE)
+        elif campos:
+            if any(field.name == 'atualizado_em' for field in model._meta.concrete_fields):
+                # auto_now não vale para bulk_update
+                agora = model._meta.get_field('atualizado_em').pre_save(objs[0], add=False)
+                for obj in objs:
+                    obj.atualizado_em = agora
+                campos = campos + ['atualizado_em']
+            model.objects.bulk_update(objs, campos, batch_size=TAMANHO_LOTE)
+        invalidar_cache()
+
+
+@csrf_exempt
+@require_http_methods(['POST', 'PATCH'])
+@api_view
+def lote(request, recurso):
+    recurso = RECURSOS[recurso]
+    itens = _ler_itens(request)
+    criacao = request.method == 'POST'
+    montar = _montar_criacao if criacao else _montar_atualizacao
+    objs, erros, campos = montar(recurso, itens)
+
+    _validar(recurso, objs, erros)
+    if any(erros):
+        return _resposta_erros(erros)
+
+    try:
+        _gravar(recurso, objs, campos)
+    except IntegrityError as e:
+        # Corrida com outra gravação depois da validação
+        raise ErroApi(f'Conflito ao gravar: {e}', status=409)
+
+    return JsonResponse(
+        {'ids': [obj.pk for obj in objs]},
+        status=201 if criacao else 200,
+    )
@@ -5,3 +5,6 @@ class VeiculosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'veiculos'
     verbose_name = 'Gestão de Veículos'
+
+    def ready(self):
+        from . import signals  # noqa: F401
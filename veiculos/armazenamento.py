@@ -0,0 +1,98 @@
+"""
+Armazenamento endereçado por conteúdo para as imagens (STORAGES['default']).
+
+O upload é lido em blocos uma única vez: cada bloco vai para um arquivo
+temporário e para o SHA-256. O arquivo final se chama pelo hash,
+
+    conteudo/3f/a2/3fa2...e9.jpg
+
+então a mesma foto enviada de novo (outra edição do veículo, o carro da
+troca que já tinha fotos) não ocupa espaço: o temporário é descartado e o
+nome existente é devolvido. O nome pedido pelo upload_to só contribui com a
+extensão.
+
+O storage não sabe quem usa cada arquivo. As referências são as linhas de
+VeiculoImagem com o mesmo nome (veja VeiculoImagem.liberar_arquivos, chamado
+quando uma imagem é removida) e o comando coletar_arquivos_orfaos apaga o que
+sobrar sem referência.
+"""
+import hashlib
+import os
+import re
+import tempfile
+from datetime import timedelta
+
+from django.core.files.storage import FileSystemStorage
+from django.utils import timezone
+
+PREFIXO = 'conteudo'
+# Arquivos tocados há menos tempo que isso podem ser de um upload ainda não
+# gravado no banco: não são apagados como órfãos
+CARENCIA = timedelta(minutes=1)
+
+_NOME = re.compile(rf'^{PREFIXO}/[0-9a-f]{{2}}/[0-9a-f]{{2}}/(?P<hash>[0-9a-f]{{64}})(\.\w+)?$')
+
+
+class ArmazenamentoConteudo(FileSystemStorage):
+
+    def get_available_name(self, name, max_length=None):
+        # O nome final vem do conteúdo; não há por que procurar um livre
+        return name
+
+    def _save(self, name, content):
+        raiz = self.path(PREFIXO)
+        os.makedirs(raiz, exist_ok=True)
+        sha = hashlib.sha256()
+        fd, temporario = tempfile.mkstemp(dir=raiz, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as saida:
+                for bloco in content.chunks():
+                    sha.update(bloco)
+                    saida.write(bloco)
+
+            nome = self.nome_para(sha.hexdigest(), name)
+            destino = self.path(nome)
+            if os.path.exists(destino):
+                # Já armazenado: renova a data, que protege da coleta de órfãos
+                # (as variantes redimensionadas usam o hash, não a data)
+                os.utime(destino)
+                os.unlink(temporario)
+            else:
+                os.makedirs(os.path.dirname(destino), exist_ok=True)
+                if self.file_permissions_mode is not None:
+                    os.chmod(temporario, self.file_permissions_mode)
+                os.replace(temporario, destino)
+        except BaseException:
+            if os.path.exists(temporario):
+                os.unlink(temporario)
+            raise
+        return nome
+
+    @staticmethod
+    def nome_para(sha256, nome_original):
+        extensao = os.path.splitext(nome_original)[1].lower()
+        return f'{PREFIXO}/{sha256[:2]}/{sha256[2:4]}/{sha256}{extensao}'
+
+    @staticmethod
+    def hash_do_nome(nome):
+        """SHA-256 do conteúdo, lido do próprio nome; None para arquivos fora do padrão"""
+        match = _NOME.match(nome or '')
+        return match['hash'] if match else None
+
+    def recente(self, nome):
+        """Gravado ou reenviado há menos de CARENCIA"""
+        try:
+            return timezone.now() - self.get_modified_time(nome) < CARENCIA
+        except FileNotFoundError:
+            return False
+
+    def listar_conteudo(self):
+        """Nomes de todos os arquivos endereçados por conteúdo"""
+        raiz = self.path(PREFIXO)
+        if not os.path.isdir(raiz):
+            return
+        for pasta, _, arquivos in os.walk(raiz):
+            for arquivo in arquivos:
+                nome = os.path.relpath(os.path.join(pasta, arquivo), self.location).replace(os.sep, '/')
+                if self.hash_do_nome(nome):
+                    yield nome
@@ -0,0 +1,280 @@
+"""
+Busca textual das listagens (campo "busca").
+
+Cada model pesquisável declara CAMPOS_BUSCA. O texto desses campos é
+concatenado, convertido para minúsculas e sem acentos, e cada palavra do
+termo buscado precisa aparecer nele ("gol 2015", parte da placa etc.). O
+queryset volta anotado com `relevancia`, para ordenar os melhores primeiro.
+
+Backends:
+- PostgresTrigramBackend: LIKE sobre a expressão indexada com GIN/pg_trgm
+  (migração 0003) e ranking por word_similarity().
+- NgramBackend: índice de trigramas em memória, para os outros bancos.
+  Sem limite de resultados: a paginação alcança todos.
+
+O backend é escolhido pelo banco, ou por settings.VEICULOS_BUSCA_BACKEND.
+"""
+import threading
+import unicodedata
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, models, transaction
+from django.db.models import Case, Value, When
+from django.db.models.expressions import RawSQL
+from django.db.models.signals import post_delete, post_save
+from django.utils.module_loading import import_string
+
+from .condicional import versao_tabela
+
+RELEVANCIA_FIELD = models.DecimalField(max_digits=5, decimal_places=4)
+
+
+def normalizar(texto):
+    """Minúsculas e sem acentos, como veiculos_unaccent(lower(...)) no Postgres"""
+    texto = unicodedata.normalize('NFKD', str(texto).lower())
+    return ''.join(c for c in texto if not unicodedata.combining(c))
+
+
+def termos(busca):
+    return [normalizar(termo) for termo in busca.split()]
+
+
+class PostgresTrigramBackend:
+    """Busca por trigramas usando os índices GIN criados na migração 0003"""
+
+    def expressao(self, model, connection, qualificar=True):
+        """
+        Mesma expressão dos índices da migração 0003: o planner só usa o
+        índice se a expressão da consulta for idêntica à indexada.
+        """
+        qn = connection.ops.quote_name
+        partes = []
+        for nome in model.CAMPOS_BUSCA:
+            field = model._meta.get_field(nome)
+            coluna = qn(field.column)
+            if qualificar:
+                coluna = f'{qn(model._meta.db_table)}.{coluna}'
+            if not isinstance(field, (models.CharField, models.TextField)):
+                coluna = f'{coluna}::text'
+            partes.append(f"coalesce({coluna}, '')")
+        return "veiculos_unaccent(lower(" + " || ' ' || ".join(partes) + "))"
+
+    def buscar(self, queryset, busca):
+        palavras = termos(busca)
+        if not palavras:
+            return queryset
+
+        connection = connections[queryset.db]
+        documento = self.expressao(queryset.model, connection)
+
+        for palavra in palavras:
+            queryset = queryset.filter(RawSQL(
+                f'{documento} LIKE %s',
+                ['%' + connection.ops.prep_for_like_query(palavra) + '%'],
+                output_field=models.BooleanField(),
+            ))
+
+        return queryset.annotate(relevancia=RawSQL(
+            f'round(word_similarity(%s, {documento})::numeric, 4)',
+            [' '.join(palavras)],
+            output_field=RELEVANCIA_FIELD,
+        ))
+
+
+class IndiceNgram:
+    """
+    Índice invertido de trigramas de uma tabela, mantido em memória.
+    `versao` é a versao_tabela() dos dados indexados.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.documentos = {}
+        self.trigramas = {}
+        self.lock = threading.RLock()
+        self.versao = None
+
+    @staticmethod
+    def gerar_trigramas(texto):
+        return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+    def documento(self, valores):
+        return normalizar(' '.join('' if valor is None else str(valor) for valor in valores))
+
+    def construir(self, versao):
+        """
+        Lê a tabela do banco principal. A versão é calculada antes da leitura:
+        uma escrita durante a construção deixa o índice desatualizado e ele é
+        reconstruído na busca seguinte.
+        """
+        with self.lock:
+            self.documentos = {}
+            self.trigramas = {}
+            linhas = self.model._default_manager.using(DEFAULT_DB_ALIAS).values_list(
+                'pk', *self.model.CAMPOS_BUSCA
+            )
+            for pk, *valores in linhas.iterator(chunk_size=2000):
+                self._adicionar(pk, self.documento(valores))
+            self.versao = versao
+
+    def _adicionar(self, pk, documento):
+        self.documentos[pk] = documento
+        for trigrama in self.gerar_trigramas(documento):
+            self.trigramas.setdefault(trigrama, set()).add(pk)
+
+    def _remover(self, pk):
+        documento = self.documentos.pop(pk, None)
+        if documento is None:
+            return False
+        for trigrama in self.gerar_trigramas(documento):
+            pks = self.trigramas.get(trigrama)
+            if pks is not None:
+                pks.discard(pk)
+                if not pks:
+                    del self.trigramas[trigrama]
+        return True
+
+    def remover(self, instance):
+        with self.lock:
+            if self.versao is None or not self._remover(instance.pk):
+                return
+            ultima, qtd = self.versao
+            # Removida a linha mais recente, a data máxima da tabela muda:
+            # sem como saber a nova, a próxima busca reconstrói
+            self.versao = None if instance.atualizado_em == ultima else (ultima, qtd - 1)
+
+    def atualizar(self, instance):
+        with self.lock:
+            if self.versao is None:
+                return
+            nova = not self._remover(instance.pk)
+            self._adicionar(
+                instance.pk,
+                self.documento(getattr(instance, campo) for campo in self.model.CAMPOS_BUSCA)
+            )
+            ultima, qtd = self.versao
+            self.versao = (max(filter(None, (ultima, instance.atualizado_em))), qtd + nova)
+
+    def buscar(self, palavras):
+        """Retorna [(pk, relevancia)] de todos os documentos que contêm todas as palavras"""
+        with self.lock:
+            candidatos = None
+            for palavra in palavras:
+                if len(palavra) >= 3:
+                    postings = [self.trigramas.get(t, set()) for t in self.gerar_trigramas(palavra)]
+                    encontrados = set.intersection(*sorted(postings, key=len))
+                else:
+                    encontrados = set(self.documentos) if candidatos is None else candidatos
+                candidatos = encontrados if candidatos is None else candidatos & encontrados
+                if not candidatos:
+                    return [], len(self.documentos)
+
+            trigramas_busca = self.gerar_trigramas(' '.join(palavras)) or {' '.join(palavras)}
+            resultados = []
+            for pk in candidatos:
+                documento = self.documentos[pk]
+                if all(palavra in documento for palavra in palavras):
+                    comuns = sum(1 for t in trigramas_busca if t in documento)
+                    resultados.append((pk, round(Decimal(comuns) / len(trigramas_busca), 4)))
+            return resultados, len(self.documentos)
+
+    def complemento(self, encontrados):
+        """pks indexados fora de `encontrados` e o maior pk indexado"""
+        with self.lock:
+            return [pk for pk in self.documentos if pk not in encontrados], max(self.documentos)
+
+
+class NgramBackend:
+    """
+    Fallback para bancos sem pg_trgm. Um índice por model, construído a
+    partir do banco principal e usado também pelas leituras na réplica.
+
+    Os sinais de save/delete (depois do commit) atualizam o índice e a sua
+    versão. A cada busca, a versao_tabela() do banco é comparada com a do
+    índice: escritas que não disparam sinais (bulk_create, bulk_update,
+    update(), que nesta app sempre gravam atualizado_em, e exclusões em massa)
+    mudam a versão e o índice é reconstruído.
+    """
+
+    def __init__(self):
+        self.indices = {}
+        self.lock = threading.Lock()
+
+    def indice(self, model):
+        chave = model._meta.label
+        with self.lock:
+            indice = self.indices.get(chave)
+            if indice is None:
+                indice = self.indices[chave] = IndiceNgram(model)
+                post_save.connect(self._ao_salvar, sender=model, weak=False)
+                post_delete.connect(self._ao_deletar, sender=model, weak=False)
+
+        versao = versao_tabela(model._default_manager.using(DEFAULT_DB_ALIAS))
+        if indice.versao != versao:
+            indice.construir(versao)
+        return indice
+
+    def _ao_salvar(self, sender, instance, raw=False, **kwargs):
+        indice = self.indices.get(sender._meta.label)
+        if indice is not None and not raw:
+            transaction.on_commit(lambda: indice.atualizar(instance))
+
+    def _ao_deletar(self, sender, instance, **kwargs):
+        indice = self.indices.get(sender._meta.label)
+        if indice is not None:
+            transaction.on_commit(lambda: indice.remover(instance))
+
+    def buscar(self, queryset, busca):
+        palavras = termos(busca)
+        if not palavras:
+            return queryset
+
+        indice = self.indice(queryset.model)
+        resultados, total = indice.buscar(palavras)
+        if not resultados:
+            return queryset.none().annotate(relevancia=Value(Decimal('0'), output_field=RELEVANCIA_FIELD))
+
+        # Todos os resultados, sem limite: a relevância tem poucos valores
+        # distintos, então vai um IN por valor (o maior grupo fica no default),
+        # e o filtro usa a lista menor entre os encontrados e os não encontrados
+        grupos = {}
+        for pk, relevancia in resultados:
+            grupos.setdefault(relevancia, []).append(pk)
+        maior = max(grupos, key=lambda relevancia: len(grupos[relevancia]))
+
+        if len(resultados) <= total - len(resultados):
+            queryset = queryset.filter(pk__in=[pk for pk, _ in resultados])
+        else:
+            # Linhas criadas depois da verificação da versão não estão no
+            # índice: o limite de pk evita que entrem como encontradas
+            nao_encontrados, ultimo_pk = indice.complemento({pk for pk, _ in resultados})
+            queryset = queryset.filter(pk__lte=ultimo_pk).exclude(pk__in=nao_encontrados)
+
+        return queryset.annotate(relevancia=Case(
+            *[When(pk__in=pks, then=Value(relevancia))
+              for relevancia, pks in grupos.items() if relevancia != maior],
+            default=Value(maior),
+            output_field=RELEVANCIA_FIELD,
+        ))
+
+
+_backends = {}
+
+
+def get_backend(using='default'):
+    caminho = getattr(settings, 'VEICULOS_BUSCA_BACKEND', None)
+    if not caminho:
+        if connections[using].vendor == 'postgresql':
+            caminho = 'veiculos.busca.PostgresTrigramBackend'
+        else:
+            caminho = 'veiculos.busca.NgramBackend'
+
+    if caminho not in _backends:
+        _backends[caminho] = import_string(caminho)()
+    return _backends[caminho]
+
+
+def buscar(queryset, busca):
+    """Filtra o queryset pelo termo e anota `relevancia` (0 a 1)"""
+    return get_backend(queryset.db).buscar(queryset, busca)
@@ -0,0 +1,93 @@
+"""
+Cache dos dados financeiros (dashboard).
+
+As chaves incluem uma versão global guardada no próprio cache. Toda escrita
+em Venda, Despesa, Veiculo ou VeiculoImagem incrementa essa versão (via
+veiculos.signals), então as entradas antigas deixam de ser lidas na hora e
+expiram sozinhas. Não é preciso adivinhar TTL para evitar dados velhos.
+
+Os valores são sempre calculados no banco principal, nunca na réplica de
+leitura (veja veiculos/roteamento.py): a versão sobe no commit do
+principal e a réplica pode ainda não ter a escrita.
+
+Usa o cache configurado em settings.VEICULOS_CACHE (padrão 'default'). Com
+mais de um processo/servidor, use um backend compartilhado (Redis,
+Memcached ou banco); locmem só é coerente dentro de um processo.
+"""
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from .roteamento import ler_do_principal
+
+CHAVE_VERSAO = 'veiculos:financeiro:versao'
+
+# Só para liberar espaço das versões antigas; a validade vem da versão
+TIMEOUT_PADRAO = 60 * 60 * 24
+
+
+def get_cache():
+    return caches[getattr(settings, 'VEICULOS_CACHE', 'default')]
+
+
+def versao():
+    """Versão atual dos dados financeiros"""
+    cache = get_cache()
+    atual = cache.get(CHAVE_VERSAO)
+    if atual is None:
+        # Começa de um valor novo a cada reinício do cache, para não
+        # reaproveitar entradas de uma versão anterior com o mesmo número
+        cache.add(CHAVE_VERSAO, time.time_ns(), timeout=None)
+        atual = cache.get(CHAVE_VERSAO)
+    return atual
+
+
+def incrementar_versao():
+    cache = get_cache()
+    try:
+        cache.incr(CHAVE_VERSAO)
+    except ValueError:
+        # Chave ainda não existe (ou foi expulsa do cache)
+        cache.add(CHAVE_VERSAO, time.time_ns(), timeout=None)
+
+
+def invalidar():
+    """Invalida o cache financeiro quando a transação atual for confirmada"""
+    transaction.on_commit(incrementar_versao)
+
+
+def chave(nome, *partes):
+    return ':'.join(['veiculos', nome, str(versao())] + [str(parte) for parte in partes])
+
+
+def obter_ou_calcular(nome, partes, calcular, timeout=None):
+    """Retorna o valor em cache para (nome, partes) ou calcula e guarda"""
+    cache = get_cache()
+    k = chave(nome, *partes)
+    valor = cache.get(k)
+    if valor is None:
+        with ler_do_principal():
+            valor = calcular()
+        cache.set(
+            k, valor,
+            timeout=timeout or getattr(settings, 'VEICULOS_CACHE_TIMEOUT', TIMEOUT_PADRAO),
+        )
+    return valor
+
+
+async def aobter_ou_calcular(nome, partes, calcular, timeout=None):
+    """Versão de obter_ou_calcular para views async; `calcular` é uma corrotina"""
+    cache = get_cache()
+    k = await sync_to_async(chave)(nome, *partes)
+    valor = await cache.aget(k)
+    if valor is None:
+        with ler_do_principal():
+            valor = await calcular()
+        await cache.aset(
+            k, valor,
+            timeout=timeout or getattr(settings, 'VEICULOS_CACHE_TIMEOUT', TIMEOUT_PADRAO),
+        )
+    return valor
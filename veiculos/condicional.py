@@ -0,0 +1,65 @@
+"""
+GET condicional (ETag/Last-Modified) para as páginas de detalhe e listagens.
+
+Antes da view, uma função barata (Max/Count em atualizado_em, com índice)
+calcula a versão da página. Se o navegador já tem essa versão
+(If-None-Match / If-Modified-Since), a resposta é um 304 sem corpo: a view
+e o template nem rodam.
+
+As respostas vão com Cache-Control: private, no-cache, ou seja, o navegador
+guarda a página mas sempre confere a versão antes de reaproveitá-la.
+"""
+import hashlib
+from datetime import datetime
+from functools import wraps
+
+from django.contrib.messages import get_messages
+from django.db.models import Count, Max
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+
+def versao_tabela(queryset):
+    """(última alteração, quantidade): alterações e exclusões mudam a versão"""
+    totais = queryset.order_by().aggregate(ultima=Max('atualizado_em'), qtd=Count('pk'))
+    return totais['ultima'], totais['qtd']
+
+
+def get_condicional(calcular_versao):
+    """
+    Decorator para views de leitura (sync). calcular_versao(request, *args,
+    **kwargs) retorna as partes que identificam o conteúdo (datas,
+    contagens) ou None para responder normalmente. O ETag é o hash das
+    partes e o Last-Modified, a maior data entre elas.
+    """
+    def versao(request, *args, **kwargs):
+        # Calculada uma vez, usada pelo ETag e pelo Last-Modified
+        if not hasattr(request, '_versao_pagina'):
+            partes = None
+            # Mensagens pendentes (depois de um redirect) só aparecem renderizando
+            if not len(get_messages(request)):
+                partes = calcular_versao(request, *args, **kwargs)
+            request._versao_pagina = partes
+        return request._versao_pagina
+
+    def etag(request, *args, **kwargs):
+        partes = versao(request, *args, **kwargs)
+        if partes is None:
+            return None
+        return hashlib.md5(repr(partes).encode(), usedforsecurity=False).hexdigest()
+
+    def ultima_alteracao(request, *args, **kwargs):
+        partes = versao(request, *args, **kwargs)
+        datas = [parte for parte in partes or () if isinstance(parte, datetime)]
+        return max(datas) if datas else None
+
+    def decorator(view):
+        view_condicional = condition(etag_func=etag, last_modified_func=ultima_alteracao)(view)
+
+        @wraps(view)
+        def _view(request, *args, **kwargs):
+            response = view_condicional(request, *args, **kwargs)
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return _view
+    return decorator
@@ -0,0 +1,264 @@
+"""
+Geração de dados sintéticos para testes de volume (comandos gerar_dados e
+benchmark).
+
+Tudo é derivado de random.Random(semente), então a mesma semente gera o
+mesmo conjunto de dados. As inserções são feitas com bulk_create em lotes;
+como bulk_create não dispara os sinais, os dias das vendas são marcados
+para o resumo diário e o cache é invalidado explicitamente.
+"""
+import random
+from dataclasses import dataclass
+from datetime import date, timedelta
+from decimal import Decimal
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image, ImageDraw
+
+from .cache import incrementar_versao
+from .imagens import gerar_derivados
+from .models import (
+    Cliente, Despesa, FormaPagamento, Fornecedor, ResumoDiario, TipoDespesa,
+    Veiculo, VeiculoImagem, Venda,
+)
+from .resumo import marcar_resumo
+
+TAMANHO_LOTE = 2000
+
+MARCAS = {
+    'Volkswagen': ['Gol', 'Polo', 'Virtus', 'T-Cross', 'Saveiro', 'Up'],
+    'Chevrolet': ['Onix', 'Prisma', 'Cruze', 'Tracker', 'S10', 'Spin'],
+    'Fiat': ['Uno', 'Argo', 'Mobi', 'Strada', 'Toro', 'Cronos'],
+    'Ford': ['Ka', 'Fiesta', 'EcoSport', 'Ranger', 'Focus'],
+    'Toyota': ['Corolla', 'Etios', 'Hilux', 'Yaris', 'SW4'],
+    'Honda': ['Civic', 'Fit', 'City', 'HR-V', 'WR-V'],
+    'Hyundai': ['HB20', 'Creta', 'Tucson'],
+    'Renault': ['Sandero', 'Logan', 'Duster', 'Kwid'],
+}
+CORES = ['Prata', 'Preto', 'Branco', 'Cinza', 'Vermelho', 'Azul']
+NOMES = ['Ana', 'Bruno', 'Carla', 'Diego', 'Eduarda', 'Felipe', 'Gabriela', 'Heitor',
+         'Isabela', 'João', 'Larissa', 'Marcos', 'Natália', 'Otávio', 'Paula', 'Rafael']
+SOBRENOMES = ['Silva', 'Santos', 'Oliveira', 'Souza', 'Lima', 'Pereira', 'Costa',
+              'Ferreira', 'Almeida', 'Ribeiro', 'Carvalho', 'Gomes']
+TIPOS_DESPESA = ['Mecânica', 'Funilaria', 'IPVA', 'Licenciamento', 'Pneus', 'Lavagem/Limpeza']
+FORMAS_PAGAMENTO = ['À Vista', 'PIX', 'Financiamento', 'Cartão de Crédito']
+
+# Placas geradas: prefixo + número sequencial (cabe nos 10 caracteres do campo)
+PREFIXO_PLACA = 'SIM'
+
+
+@dataclass
+class Configuracao:
+    veiculos: int = 1000
+    fornecedores: int = 50
+    clientes: int = 500
+    despesas_por_veiculo: int = 3
+    vendidos: float = 0.5        # fração dos veículos com venda
+    entradas: float = 0.2        # fração das vendas com veículo na troca
+    imagens_por_veiculo: int = 1
+    dias: int = 730              # período coberto pelas datas, até hoje
+    semente: int = 42
+
+    @classmethod
+    def para_escala(cls, veiculos, **kwargs):
+        """Quantidades proporcionais ao número de veículos"""
+        return cls(
+            veiculos=veiculos,
+            fornecedores=max(10, veiculos // 20),
+            clientes=max(50, veiculos // 2),
+            **kwargs,
+        )
+
+
+class GeradorDados:
+    def __init__(self, config, saida=None):
+        self.config = config
+        self.rng = random.Random(config.semente)
+        self.hoje = date.today()
+        self.saida = saida or (lambda mensagem: None)
+
+    def data_aleatoria(self, depois_de=None):
+        inicio = depois_de or self.hoje - timedelta(days=self.config.dias)
+        return inicio + timedelta(days=self.rng.randint(0, max(0, (self.hoje - inicio).days)))
+
+    def nome_pessoa(self):
+        return f'{self.rng.choice(NOMES)} {self.rng.choice(SOBRENOMES)} {self.rng.choice(SOBRENOMES)}'
+
+    def documento(self, digitos):
+        return ''.join(str(self.rng.randint(0, 9)) for _ in range(digitos))
+
+    def gerar(self):
+        with transaction.atomic():
+            tipos = self.gerar_tipos()
+            formas = self.gerar_formas()
+            fornecedores = self.gerar_fornecedores()
+            clientes = self.gerar_clientes()
+            veiculos = self.gerar_veiculos(fornecedores)
+            self.gerar_despesas(veiculos, tipos, fornecedores)
+            datas_vendas = self.gerar_vendas(veiculos, clientes, formas)
+            # As despesas já marcam seus dias (DespesaQuerySet.bulk_create)
+            marcar_resumo(datas=datas_vendas)
+        self.gerar_imagens(veiculos)
+        incrementar_versao()
+        return veiculos
+
+    def gerar_tipos(self):
+        for nome in TIPOS_DESPESA:
+            TipoDespesa.objects.get_or_create(nome=nome)
+        return list(TipoDespesa.objects.all())
+
+    def gerar_formas(self):
+        for nome in FORMAS_PAGAMENTO:
+            FormaPagamento.objects.get_or_create(nome=nome)
+        return list(FormaPagamento.objects.all())
+
+    def gerar_fornecedores(self):
+        Fornecedor.objects.bulk_create([
+            Fornecedor(
+                nome=f'{self.rng.choice(SOBRENOMES)} Auto Peças {i + 1}',
+                cnpj_cpf=self.documento(14),
+                telefone=f'(11) 9{self.documento(8)}',
+            )
+            for i in range(self.config.fornecedores)
+        ], batch_size=TAMANHO_LOTE)
+        self.saida(f'  {self.config.fornecedores} fornecedores')
+        return list(Fornecedor.objects.values_list('pk', flat=True))
+
+    def gerar_clientes(self):
+        Cliente.objects.bulk_create([
+            Cliente(
+                nome=self.nome_pessoa(),
+                cpf=self.documento(11),
+                telefone=f'(11) 9{self.documento(8)}',
+            )
+            for _ in range(self.config.clientes)
+        ], batch_size=TAMANHO_LOTE)
+        self.saida(f'  {self.config.clientes} clientes')
+        return list(Cliente.objects.values_list('pk', flat=True))
+
+    def gerar_veiculos(self, fornecedores):
+        inicio = Veiculo.objects.filter(placa__startswith=PREFIXO_PLACA).count()
+        novos = []
+        for i in range(inicio, inicio + self.config.veiculos):
+            marca = self.rng.choice(list(MARCAS))
+            valor_compra = Decimal(self.rng.randrange(15000, 150000, 100))
+            novos.append(Veiculo(
+                marca=marca,
+                modelo=self.rng.choice(MARCAS[marca]),
+                ano=self.rng.randint(2008, self.hoje.year),
+                placa=f'{PREFIXO_PLACA}{i:07d}',
+                cor=self.rng.choice(CORES),
+                km=self.rng.randint(0, 200000),
+                valor_compra=valor_compra,
+                valor_venda=(valor_compra * Decimal('1.2')).quantize(Decimal('1')),
+                fornecedor_id=self.rng.choice(fornecedores) if fornecedores else None,
+                status=self.rng.choice(['disponivel'] * 9 + ['manutencao']),
+                data_compra=self.data_aleatoria(),
+            ))
+        veiculos = Veiculo.objects.bulk_create(novos, batch_size=TAMANHO_LOTE)
+        self.saida(f'  {len(veiculos)} veículos')
+
+        if not veiculos[0].pk:
+            # Bancos sem RETURNING no bulk_create: busca as chaves pela placa
+            pks = dict(Veiculo.objects.filter(
+                placa__in=[v.placa for v in veiculos]
+            ).values_list('placa', 'pk'))
+            for veiculo in veiculos:
+                veiculo.pk = pks[veiculo.placa]
+        return veiculos
+
+    def gerar_despesas(self, veiculos, tipos, fornecedores):
+        despesas = []
+        for veiculo in veiculos:
+            for _ in range(self.rng.randint(0, self.config.despesas_por_veiculo * 2)):
+                despesas.append(Despesa(
+                    veiculo_id=veiculo.pk,
+                    tipo=self.rng.choice(tipos),
+                    fornecedor_id=self.rng.choice(fornecedores) if self.rng.random() < 0.7 else None,
+                    valor=Decimal(self.rng.randrange(5000, 300000)) / 100,
+                    descricao='Serviço gerado automaticamente',
+                    data_despesa=self.data_aleatoria(depois_de=veiculo.data_compra),
+                ))
+            if len(despesas) >= TAMANHO_LOTE:
+                Despesa.objects.bulk_create(despesas)
+                despesas = []
+        Despesa.objects.bulk_create(despesas)
+        self.saida('  despesas')
+
+    def gerar_vendas(self, veiculos, clientes, formas):
+        vendidos = self.rng.sample(veiculos, int(len(veiculos) * self.config.vendidos))
+        vendidos_ids = {veiculo.pk for veiculo in vendidos}
+        # Veículos que entraram na troca ficam disponíveis no estoque
+        estoque = [veiculo for veiculo in veiculos if veiculo.pk not in vendidos_ids]
+        self.rng.shuffle(estoque)
+
+        vendas = []
+        for veiculo in vendidos:
+            entrada = estoque.pop() if estoque and self.rng.random() < self.config.entradas else None
+            valor_venda = (veiculo.valor_compra * Decimal(self.rng.uniform(1.05, 1.35))).quantize(Decimal('1'))
+            vendas.append(Venda(
+                veiculo_id=veiculo.pk,
+                cliente_id=self.rng.choice(clientes),
+                valor_venda=valor_venda,
+                veiculo_entrada_id=entrada.pk if entrada else None,
+                valor_entrada=entrada.valor_compra if entrada else Decimal('0.00'),
+                forma_pagamento=self.rng.choice(formas),
+                data_venda=self.data_aleatoria(depois_de=veiculo.data_compra),
+            ))
+        Venda.objects.bulk_create(vendas, batch_size=TAMANHO_LOTE)
+
+        # bulk_create não chama Venda.save(), que marca o veículo como vendido
+        ids = list(vendidos_ids)
+        for i in range(0, len(ids), TAMANHO_LOTE):
+            Veiculo.objects.filter(pk__in=ids[i:i + TAMANHO_LOTE]).update(
+                status='vendido', atualizado_em=timezone.now()
+            )
+        self.saida(f'  {len(vendas)} vendas')
+        return {venda.data_venda for venda in vendas}
+
+    def gerar_imagens(self, veiculos):
+        """
+        Algumas imagens-modelo (com derivados) compartilhadas pelos veículos:
+        o objetivo é o volume de linhas, não de arquivos.
+        """
+        if not self.config.imagens_por_veiculo:
+            return
+        modelos = []
+        for cor in ((180, 30, 30), (30, 90, 180), (60, 60, 60), (200, 200, 200)):
+            imagem = Image.new('RGB', (1600, 1200), cor)
+            ImageDraw.Draw(imagem).rectangle((300, 500, 1300, 900), fill=(20, 20, 20))
+            buffer = BytesIO()
+            imagem.save(buffer, format='JPEG', quality=85)
+            nome = default_storage.save('veiculos/sinteticos/modelo.jpg', ContentFile(buffer.getvalue()))
+            modelos.append((nome, gerar_derivados(nome, default_storage)))
+
+        imagens = []
+        for veiculo in veiculos:
+            for ordem in range(self.config.imagens_por_veiculo):
+                nome, derivados = self.rng.choice(modelos)
+                imagens.append(VeiculoImagem(
+                    veiculo_id=veiculo.pk, imagem=nome, derivados=derivados,
+                    processamento='concluido', principal=ordem == 0, ordem=ordem,
+                ))
+            if len(imagens) >= TAMANHO_LOTE:
+                VeiculoImagem.objects.bulk_create(imagens)
+                imagens = []
+        VeiculoImagem.objects.bulk_create(imagens)
+        self.saida('  imagens')
+
+
+def limpar_dados():
+    """
+    Apaga veículos, vendas, despesas, imagens, clientes, fornecedores e o
+    resumo. Usa _raw_delete (DELETE direto, sem carregar as linhas nem
+    disparar sinais): os totais e o resumo somem junto, e os arquivos das
+    imagens ficam para o comando coletar_arquivos_orfaos.
+    """
+    with transaction.atomic():
+        for model in (Venda, Despesa, VeiculoImagem, Veiculo, Cliente, Fornecedor, ResumoDiario):
+            model.objects.all()._raw_delete(model.objects.db)
+    incrementar_versao()
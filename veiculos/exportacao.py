@@ -0,0 +1,206 @@
+"""
+Exportação de listagens em CSV e XLSX por streaming.
+
+As linhas vêm de QuerySet.iterator(chunk_size=...) e cada uma é escrita e
+enviada ao cliente antes de ler a próxima, então a memória fica constante
+qualquer que seja o número de linhas. O XLSX é gerado direto (é um zip de
+XMLs), sem depender de bibliotecas externas: o zip é escrito em um buffer
+que é esvaziado a cada linha.
+
+O streaming depende do servidor WSGI: sob ASGI o Django lê o iterador
+inteiro antes de enviar (por isso as exportações não vão para o uvicorn,
+veja core/asgi.py).
+"""
+import csv
+import re
+import zipfile
+from datetime import date, datetime
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+from django.http import Http404, StreamingHttpResponse
+from django.utils import timezone
+
+TAMANHO_LOTE = 2000
+
+FORMATOS = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+# Texto que o Excel/LibreOffice interpretaria como fórmula (CSV injection)
+INICIO_FORMULA = ('=', '+', '-', '@', '\t', '\r')
+# Caracteres de controle não são válidos em XML 1.0 (tab e quebra de linha são)
+_CONTROLE = re.compile('[\x00-\x08\x0b-\x1f]')
+
+
+class Buffer:
+    """Arquivo só de escrita que acumula os bytes até serem retirados"""
+
+    def __init__(self):
+        self.partes = []
+
+    def write(self, dados):
+        if isinstance(dados, str):
+            dados = dados.encode('utf-8')
+        self.partes.append(bytes(dados))
+        return len(dados)
+
+    def flush(self):
+        pass
+
+    def retirar(self):
+        dados = b''.join(self.partes)
+        self.partes = []
+        return dados
+
+
+def _texto_csv(valor):
+    """Formato brasileiro, como o Excel em pt-BR espera"""
+    if valor is None:
+        return ''
+    if isinstance(valor, datetime):
+        return timezone.localtime(valor).strftime('%d/%m/%Y %H:%M') if timezone.is_aware(valor) else valor.strftime('%d/%m/%Y %H:%M')
+    if isinstance(valor, date):
+        return valor.strftime('%d/%m/%Y')
+    if isinstance(valor, (Decimal, float)):
+        return f'{valor:.2f}'.replace('.', ',')
+    if isinstance(valor, str) and valor.startswith(INICIO_FORMULA):
+        # O apóstrofo faz a planilha tratar o valor como texto
+        return f"'{valor}"
+    return valor
+
+
+def gerar_csv(colunas, linhas):
+    buffer = Buffer()
+    # BOM para o Excel reconhecer UTF-8; ';' porque a vírgula é o separador decimal
+    buffer.write('\ufeff')
+    writer = csv.writer(buffer, delimiter=';')
+    writer.writerow(colunas)
+    yield buffer.retirar()
+    for linha in linhas:
+        writer.writerow([_texto_csv(valor) for valor in linha])
+        yield buffer.retirar()
+
+
+# Estilos (cellXfs): 0 padrão, 1 data, 2 data e hora, 3 valor com 2 casas
+ESTILO_DATA, ESTILO_DATA_HORA, ESTILO_VALOR = 1, 2, 3
+EPOCA_EXCEL = datetime(1899, 12, 30)
+
+ARQUIVOS_XLSX = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+        '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/styles.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        '<numFmts count="1"><numFmt numFmtId="164" formatCode="dd/mm/yyyy hh:mm"/></numFmts>'
+        '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+        '<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>'
+        '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+        '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+        '<cellXfs count="4">'
+        '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+        '<xf numFmtId="14" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+        '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+        '<xf numFmtId="4" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+        '</cellXfs>'
+        '</styleSheet>'
+    ),
+}
+
+
+def _celula_xlsx(valor):
+    if valor is None:
+        return '<c/>'
+    if isinstance(valor, bool):
+        return f'<c t="b"><v>{int(valor)}</v></c>'
+    if isinstance(valor, datetime):
+        if timezone.is_aware(valor):
+            valor = timezone.make_naive(valor)
+        serial = (valor - EPOCA_EXCEL).total_seconds() / 86400
+        return f'<c s="{ESTILO_DATA_HORA}"><v>{serial}</v></c>'
+    if isinstance(valor, date):
+        serial = (valor - EPOCA_EXCEL.date()).days
+        return f'<c s="{ESTILO_DATA}"><v>{serial}</v></c>'
+    if isinstance(valor, Decimal):
+        return f'<c s="{ESTILO_VALOR}"><v>{valor}</v></c>'
+    if isinstance(valor, (int, float)):
+        return f'<c><v>{valor}</v></c>'
+    texto = escape(_CONTROLE.sub('', str(valor)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{texto}</t></is></c>'
+
+
+def _linha_xlsx(valores):
+    return '<row>' + ''.join(_celula_xlsx(valor) for valor in valores) + '</row>'
+
+
+def gerar_xlsx(colunas, linhas, nome_planilha='Dados'):
+    buffer = Buffer()
+    # O buffer não tem seek(): o zipfile grava os tamanhos em data descriptors
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as arquivo:
+        for nome, conteudo in ARQUIVOS_XLSX.items():
+            arquivo.writestr(nome, conteudo)
+        arquivo.writestr('xl/workbook.xml', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            f'<sheets><sheet name="{escape(nome_planilha[:31])}" sheetId="1" r:id="rId1"/></sheets>'
+            '</workbook>'
+        ))
+        yield buffer.retirar()
+
+        with arquivo.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as planilha:
+            planilha.write((
+                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                '<sheetData>' + _linha_xlsx(colunas)
+            ).encode('utf-8'))
+            for linha in linhas:
+                planilha.write(_linha_xlsx(linha).encode('utf-8'))
+                # O compressor só libera bytes de tempos em tempos
+                dados = buffer.retirar()
+                if dados:
+                    yield dados
+            planilha.write(b'</sheetData></worksheet>')
+    yield buffer.retirar()
+
+
+def resposta_exportacao(request, nome, colunas, linhas):
+    """
+    StreamingHttpResponse com as linhas no formato de ?formato= (csv ou
+    xlsx). `linhas` deve ser um iterável preguiçoso, ex. um iterator().
+    """
+    formato = request.GET.get('formato', 'csv')
+    if formato not in FORMATOS:
+        raise Http404('Formato de exportação inválido.')
+
+    if formato == 'csv':
+        conteudo = gerar_csv(colunas, linhas)
+    else:
+        conteudo = gerar_xlsx(colunas, linhas, nome_planilha=nome)
+
+    resposta = StreamingHttpResponse(conteudo, content_type=FORMATOS[formato])
+    arquivo = f'{nome}_{timezone.localdate():%Y-%m-%d}.{formato}'
+    resposta['Content-Disposition'] = f'attachment; filename="{arquivo}"'
+    return resposta
@@ -1,4 +1,6 @@
 from django import forms
+from django.db.models import Q
+from django.forms.models import construct_instance
 from .models import (
     Veiculo, Despesa, Cliente, Fornecedor, 
     Venda, TipoDespesa, FormaPagamento
@@ -249,3 +251,133 @@ class FormaPagamentoForm(forms.ModelForm):
                 'class': 'rounded border-gray-300 text-blue-600 focus:ring-blue-500'
             }),
         }
+
+
+class VeiculoImportacaoForm(VeiculoForm):
+    """
+    Mesmas regras do VeiculoForm para uma linha da planilha de importação.
+    O fornecedor vem como nome ou CNPJ/CPF e é resolvido pelo mapa em
+    memória; a unicidade da placa é verificada por lote (veiculos.importacao).
+    """
+    fornecedor = forms.CharField(required=False)
+
+    def __init__(self, *args, fornecedores=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fornecedores = fornecedores or {}
+
+    def clean_fornecedor(self):
+        from .importacao import chave_fornecedor
+
+        valor = self.cleaned_data['fornecedor'].strip()
+        if not valor:
+            return None
+        fornecedor_id = self.fornecedores.get(chave_fornecedor(valor))
+        if fornecedor_id is None:
+            raise forms.ValidationError(f'Fornecedor "{valor}" não cadastrado.')
+        return fornecedor_id
+
+    def _post_clean(self):
+        # Sem o full_clean do model: o Veiculo não tem clean() e max_length,
+        # validators e choices já foram aplicados pelos campos do form.
+        # fornecedor é um id, não uma instância, e é atribuído à parte
+        fornecedor_id = self.cleaned_data.pop('fornecedor', None)
+        self.instance = construct_instance(self, self.instance, self._meta.fields, self._meta.exclude)
+        self.instance.fornecedor_id = fornecedor_id
+
+    def validar_linha(self, dados):
+        """
+        Revalida o mesmo form com os dados de outra linha. Evita recriar o
+        form (e copiar todos os campos e widgets) a cada uma das linhas.
+        """
+        self.data = dados
+        self.instance = Veiculo()
+        self._errors = None
+        return self.is_valid()
+
+
+class ImportacaoVeiculosForm(forms.Form):
+    # Cabeçalhos esperados (também aceita os nomes dos campos)
+    COLUNAS = [
+        'Marca', 'Modelo', 'Ano', 'Placa', 'RENAVAM', 'Cor', 'Quilometragem', 'Chassi',
+        'Valor de Compra', 'Valor de Venda', 'Fornecedor (nome ou CNPJ/CPF)', 'Status',
+        'Data de Compra', 'Observações',
+    ]
+
+    arquivo = forms.FileField(
+        label='Planilha (CSV ou XLSX)',
+        widget=forms.ClearableFileInput(attrs={
+            'class': 'mt-1 block w-full text-sm text-gray-700',
+            'accept': '.csv,.xlsx',
+        })
+    )
+
+
+class EscolhaEmMemoriaField(forms.ModelChoiceField):
+    """
+    ModelChoiceField que valida e monta as opções a partir de objetos já
+    carregados, para que cada linha de um formset não faça suas próprias
+    consultas (uma para o <select> e outra para validar).
+    """
+
+    def __init__(self, objetos, **kwargs):
+        self.objetos = {str(objeto.pk): objeto for objeto in objetos}
+        super().__init__(queryset=None, **kwargs)
+
+    def _get_choices(self):
+        vazio = [('', self.empty_label)] if self.empty_label is not None else []
+        return vazio + [(pk, str(objeto)) for pk, objeto in self.objetos.items()]
+
+    choices = property(_get_choices, forms.ChoiceField.choices.fset)
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        try:
+            return self.objetos[str(value)]
+        except KeyError:
+            raise forms.ValidationError(self.error_messages['invalid_choice'], code='invalid_choice')
+
+
+class DespesaLoteForm(DespesaForm):
+    """Uma linha da tela de várias despesas"""
+
+    def __init__(self, *args, tipos=(), fornecedores=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        for campo, objetos in (('tipo', tipos), ('fornecedor', fornecedores)):
+            original = self.fields[campo]
+            self.fields[campo] = EscolhaEmMemoriaField(
+                objetos,
+                required=original.required,
+                label=original.label,
+                widget=original.widget,
+            )
+        self.fields['descricao'].widget.attrs['rows'] = 1
+
+    def _get_validation_exclusions(self):
+        # Já validados contra os objetos carregados; evita um SELECT por linha
+        return super()._get_validation_exclusions() | {'tipo', 'fornecedor'}
+
+
+DespesaLoteFormSet = forms.formset_factory(
+    DespesaLoteForm, extra=5, min_num=1, validate_min=True, max_num=100, validate_max=True
+)
+
+
+class DespesaLoteVeiculosForm(forms.Form):
+    veiculos = forms.ModelMultipleChoiceField(
+        queryset=Veiculo.objects.none(),
+        label='Veículos',
+        help_text='As mesmas despesas são lançadas para cada veículo selecionado.',
+        widget=forms.SelectMultiple(attrs={
+            'class': 'mt-1 block w-full rounded-md border-gray-300 shadow-sm focus:border-blue-500 focus:ring-blue-500',
+            'size': 8,
+        })
+    )
+
+    def __init__(self, *args, incluir=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Veículos em estoque, mais o que veio pré-selecionado (mesmo se vendido)
+        filtro = ~Q(status='vendido')
+        if incluir:
+            filtro |= Q(pk__in=incluir)
+        self.fields['veiculos'].queryset = Veiculo.objects.filter(filtro).order_by('marca', 'modelo', 'placa')
@@ -0,0 +1,97 @@
+"""
+Geração das versões reduzidas (derivados) das imagens dos veículos.
+
+Para cada upload são gerados os tamanhos de TAMANHOS em WebP e JPEG
+progressivo, sem EXIF (a orientação é aplicada antes de descartá-lo).
+Os caminhos ficam em VeiculoImagem.derivados:
+
+    {'thumb': {'webp': 'veiculos/2024/05/foto_thumb.webp',
+               'jpeg': 'veiculos/2024/05/foto_thumb.jpg',
+               'largura': 320, 'altura': 240}, ...}
+"""
+import hashlib
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+# Maior lado, em pixels, de cada derivado (thumb e card cobrem telas 2x)
+TAMANHOS = {
+    'thumb': 320,
+    'card': 640,
+    'full': 1600,
+}
+
+FORMATOS = {
+    'webp': {'format': 'WEBP', 'extensao': 'webp', 'opcoes': {'quality': 80, 'method': 4}},
+    'jpeg': {'format': 'JPEG', 'extensao': 'jpg', 'opcoes': {'quality': 82, 'optimize': True, 'progressive': True}},
+}
+
+
+def abrir_imagem(arquivo):
+    """Abre a imagem já rotacionada conforme o EXIF e em RGB"""
+    arquivo.seek(0)
+    with Image.open(arquivo) as original:
+        imagem = ImageOps.exif_transpose(original)
+        if imagem.mode not in ('RGB', 'L'):
+            # Transparência vira fundo branco (JPEG não tem canal alfa)
+            fundo = Image.new('RGB', imagem.size, (255, 255, 255))
+            imagem = imagem.convert('RGBA')
+            fundo.paste(imagem, mask=imagem.getchannel('A'))
+            imagem = fundo
+        return imagem.convert('RGB')
+
+
+def codificar(imagem, formato):
+    """Codifica a imagem no formato pedido, sem metadados"""
+    config = FORMATOS[formato]
+    buffer = BytesIO()
+    imagem.save(buffer, format=config['format'], **config['opcoes'])
+    return buffer.getvalue()
+
+
+def gerar_derivados(nome, storage, arquivo=None):
+    """
+    Gera e grava no storage todos os derivados do arquivo `nome`.
+    Retorna o dicionário a ser gravado em VeiculoImagem.derivados.
+    """
+    if arquivo is None:
+        with storage.open(nome, 'rb') as arquivo:
+            base = abrir_imagem(arquivo)
+    else:
+        base = abrir_imagem(arquivo)
+
+    raiz = os.path.splitext(nome)[0]
+    derivados = {}
+    for tamanho, lado in TAMANHOS.items():
+        imagem = base.copy()
+        imagem.thumbnail((lado, lado), Image.LANCZOS)
+
+        derivados[tamanho] = {'largura': imagem.width, 'altura': imagem.height}
+        for formato, config in FORMATOS.items():
+            destino = f"{raiz}_{tamanho}.{config['extensao']}"
+            if storage.exists(destino):
+                storage.delete(destino)
+            derivados[tamanho][formato] = storage.save(destino, ContentFile(codificar(imagem, formato)))
+
+    return derivados
+
+
+def remover_derivados(derivados, storage):
+    for versoes in derivados.values():
+        for formato in FORMATOS:
+            if versoes.get(formato):
+                storage.delete(versoes[formato])
+
+
+def calcular_sha256(nome, storage):
+    """Hash do arquivo original, lido em blocos (ou do nome, no ArmazenamentoConteudo)"""
+    hash_do_nome = getattr(storage, 'hash_do_nome', None)
+    if hash_do_nome and hash_do_nome(nome):
+        return hash_do_nome(nome)
+    sha = hashlib.sha256()
+    with storage.open(nome, 'rb') as arquivo:
+        for bloco in arquivo.chunks():
+            sha.update(bloco)
+    return sha.hexdigest()
@@ -0,0 +1,290 @@
+"""
+Importação de veículos em massa a partir de planilhas CSV ou XLSX.
+
+As linhas são lidas em streaming e processadas em lotes: cada linha passa
+pelas regras do VeiculoForm (VeiculoImportacaoForm), as placas do lote são
+conferidas com uma única consulta IN, os fornecedores são resolvidos por um
+mapa em memória (nome ou CNPJ/CPF) e os válidos entram com bulk_create, em
+uma transação por lote. Linhas com erro são reportadas e não interrompem a
+importação.
+"""
+import codecs
+import csv
+import io
+import re
+import zipfile
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from itertools import islice
+from xml.etree import ElementTree
+
+from django.db import IntegrityError, transaction
+
+from .busca import normalizar
+from .cache import invalidar as invalidar_cache
+from .forms import VeiculoImportacaoForm
+from .models import Fornecedor, Veiculo
+
+TAMANHO_LOTE = 1000
+
+# Tentadas em ordem: UTF-8 (com ou sem BOM) e a do Excel no Windows
+CODIFICACOES = ('utf-8-sig', 'cp1252')
+
+# Valores usados quando a coluna não existe na planilha
+PADROES = {'status': 'disponivel'}
+
+CAMPOS_VALOR = ('valor_compra', 'valor_venda')
+
+NS_PLANILHA = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+EPOCA_EXCEL = date(1899, 12, 30)
+
+
+class PlanilhaInvalida(Exception):
+    pass
+
+
+def chave_fornecedor(valor):
+    """Chave do mapa de fornecedores: os dígitos do CNPJ/CPF, ou o nome normalizado"""
+    digitos = re.sub(r'[\s./-]', '', valor)
+    if digitos.isdigit():
+        return digitos
+    return normalizar(' '.join(valor.split()))
+
+
+def mapa_fornecedores():
+    mapa = {}
+    for pk, nome, cnpj_cpf in Fornecedor.objects.values_list('pk', 'nome', 'cnpj_cpf').iterator():
+        mapa.setdefault(chave_fornecedor(nome), pk)
+        if cnpj_cpf:
+            mapa.setdefault(chave_fornecedor(cnpj_cpf), pk)
+    return mapa
+
+
+def mapa_colunas():
+    """Cabeçalhos aceitos (nome do campo ou rótulo, sem acento) -> campo"""
+    colunas = {}
+    for nome in VeiculoImportacaoForm._meta.fields:
+        colunas[normalizar(nome)] = nome
+        colunas[normalizar(Veiculo._meta.get_field(nome).verbose_name)] = nome
+    colunas['fornecedor'] = 'fornecedor'
+    colunas['cnpj'] = 'fornecedor'
+    return colunas
+
+
+class _PontoEVirgula(csv.excel):
+    delimiter = ';'
+
+
+def _codificacao(arquivo):
+    """Primeira de CODIFICACOES que decodifica o arquivo inteiro (lido em blocos)"""
+    for codificacao in CODIFICACOES:
+        decodificador = codecs.getincrementaldecoder(codificacao)()
+        arquivo.seek(0)
+        try:
+            for bloco in iter(lambda: arquivo.read(64 * 1024), b''):
+                decodificador.decode(bloco)
+            decodificador.decode(b'', final=True)
+        except UnicodeDecodeError:
+            continue
+        arquivo.seek(0)
+        return codificacao
+    raise PlanilhaInvalida('Codificação do arquivo não reconhecida (use UTF-8).')
+
+
+def _dialeto(amostra):
+    try:
+        return csv.Sniffer().sniff(amostra, delimiters=';,\t')
+    except csv.Error:
+        # Uma coluna só ou amostra ambígua: o padrão do Excel em pt-BR é ';'
+        cabecalho = amostra.partition('\n')[0]
+        return csv.excel if cabecalho.count(',') > cabecalho.count(';') else _PontoEVirgula
+
+
+def ler_csv(arquivo):
+    texto = io.TextIOWrapper(arquivo, encoding=_codificacao(arquivo), newline='')
+    amostra = texto.read(4096)
+    texto.seek(0)
+    try:
+        yield from csv.reader(texto, _dialeto(amostra) if amostra else csv.excel)
+    except csv.Error as e:
+        raise PlanilhaInvalida(f'Arquivo CSV inválido: {e}.')
+
+
+def _indice_coluna(referencia):
+    """'AB12' -> 27"""
+    indice = 0
+    for letra in re.match(r'[A-Z]+', referencia).group():
+        indice = indice * 26 + ord(letra) - 64
+    return indice - 1
+
+
+def ler_xlsx(arquivo):
+    """Linhas da primeira planilha, lidas com iterparse (sem carregar tudo)"""
+    try:
+        pacote = zipfile.ZipFile(arquivo)
+    except zipfile.BadZipFile:
+        raise PlanilhaInvalida('Arquivo XLSX inválido.')
+
+    try:
+        with pacote:
+            compartilhadas = []
+            if 'xl/sharedStrings.xml' in pacote.namelist():
+                with pacote.open('xl/sharedStrings.xml') as xml:
+                    for _, elemento in ElementTree.iterparse(xml):
+                        if elemento.tag == f'{NS_PLANILHA}si':
+                            compartilhadas.append(''.join(t.text or '' for t in elemento.iter(f'{NS_PLANILHA}t')))
+                            elemento.clear()
+
+            planilha = 'xl/worksheets/sheet1.xml'
+            if planilha not in pacote.namelist():
+                planilhas = sorted(n for n in pacote.namelist() if n.startswith('xl/worksheets/sheet'))
+                if not planilhas:
+                    raise PlanilhaInvalida('O arquivo não tem planilhas.')
+                planilha = planilhas[0]
+
+            with pacote.open(planilha) as xml:
+                for _, elemento in ElementTree.iterparse(xml):
+                    if elemento.tag != f'{NS_PLANILHA}row':
+                        continue
+                    linha = []
+                    for celula in elemento.iter(f'{NS_PLANILHA}c'):
+                        tipo = celula.get('t')
+                        if tipo == 'inlineStr':
+                            valor = ''.join(t.text or '' for t in celula.iter(f'{NS_PLANILHA}t'))
+                        else:
+                            v = celula.find(f'{NS_PLANILHA}v')
+                            valor = v.text if v is not None and v.text is not None else ''
+                            if tipo == 's' and valor:
+                                valor = compartilhadas[int(valor)]
+                        if celula.get('r'):
+                            indice = _indice_coluna(celula.get('r'))
+                            linha.extend([''] * (indice - len(linha)))
+                        linha.append(valor)
+                    elemento.clear()
+                    yield linha
+    except (ElementTree.ParseError, zipfile.BadZipFile, KeyError, IndexError, ValueError) as e:
+        raise PlanilhaInvalida(f'Arquivo XLSX inválido: {e}.')
+
+
+def ler_planilha(arquivo, nome):
+    """(número da linha, {campo: valor}) para cada linha, a partir do cabeçalho"""
+    linhas = ler_xlsx(arquivo) if nome.lower().endswith('.xlsx') else ler_csv(arquivo)
+    cabecalho = next(linhas, None)
+    if not cabecalho:
+        raise PlanilhaInvalida('A planilha está vazia.')
+
+    colunas = mapa_colunas()
+    campos = [colunas.get(normalizar(titulo.strip())) for titulo in cabecalho]
+    if 'placa' not in campos:
+        raise PlanilhaInvalida('A planilha precisa de uma coluna "Placa".')
+
+    for numero, linha in enumerate(linhas, start=2):
+        if not any(str(valor).strip() for valor in linha):
+            continue
+        dados = dict(PADROES)
+        dados.update(
+            (campo, str(valor).strip()) for campo, valor in zip(campos, linha) if campo
+        )
+        yield numero, dados
+
+
+def _data_excel(valor):
+    """Datas do XLSX vêm como número de dias desde 30/12/1899"""
+    if re.fullmatch(r'\d+(\.0+)?', valor or ''):
+        return (EPOCA_EXCEL + timedelta(days=int(float(valor)))).isoformat()
+    return valor
+
+
+@dataclass
+class ResultadoImportacao:
+    criados: int = 0
+    erros: list = field(default_factory=list)  # [(número da linha, [mensagens])]
+
+    @property
+    def total_erros(self):
+        return len(self.erros)
+
+
+class ImportadorVeiculos:
+    def __init__(self, lote=TAMANHO_LOTE):
+        self.lote = lote
+        self.fornecedores = mapa_fornecedores()
+        self.placas_vistas = set()
+        self.form = VeiculoImportacaoForm({}, fornecedores=self.fornecedores)
+
+    def validar(self, dados):
+        if 'data_compra' in dados:
+            dados['data_compra'] = _data_excel(dados['data_compra'])
+        for campo in CAMPOS_VALOR:
+            # "25.900,00" (formato brasileiro) -> "25900.00"
+            if ',' in dados.get(campo, ''):
+                dados[campo] = dados[campo].replace('.', '').replace(',', '.')
+        form = self.form
+        if form.validar_linha(dados):
+            return form.instance, None
+        return None, [
+            f'{campo}: {mensagem}' if campo != '__all__' else mensagem
+            for campo, mensagens in form.errors.items()
+            for mensagem in mensagens
+        ]
+
+    def importar_lote(self, linhas, resultado):
+        """linhas: [(número da linha, dados)]"""
+        validos = []
+        for numero, dados in linhas:
+            veiculo, erros = self.validar(dados)
+            if erros:
+                resultado.erros.append((numero, erros))
+            elif veiculo.placa in self.placas_vistas:
+                resultado.erros.append((numero, [f'placa: {veiculo.placa} repetida na planilha.']))
+            else:
+                self.placas_vistas.add(veiculo.placa)
+                validos.append((numero, veiculo))
+
+        novos = self.descartar_existentes(validos, resultado)
+        while novos:
+            try:
+                with transaction.atomic():
+                    Veiculo.objects.bulk_create([veiculo for _, veiculo in novos])
+                    invalidar_cache()
+            except IntegrityError:
+                # Outra importação (ou um cadastro) gravou uma das placas
+                # entre a conferência acima e o INSERT: confere de novo
+                restantes = self.descartar_existentes(novos, resultado)
+                if len(restantes) == len(novos):
+                    raise
+                for _, veiculo in restantes:
+                    # O bulk_create desfeito pode ter preenchido o pk
+                    veiculo.pk = None
+                    veiculo._state.adding = True
+                novos = restantes
+            else:
+                resultado.criados += len(novos)
+                break
+
+    @staticmethod
+    def descartar_existentes(linhas, resultado):
+        """Reporta as linhas cuja placa já está no banco (uma consulta IN) e retorna as outras"""
+        existentes = set(Veiculo.objects.filter(
+            placa__in=[veiculo.placa for _, veiculo in linhas]
+        ).values_list('placa', flat=True))
+        restantes = []
+        for numero, veiculo in linhas:
+            if veiculo.placa in existentes:
+                resultado.erros.append((numero, [f'placa: Veículo com a placa {veiculo.placa} já existe.']))
+            else:
+                restantes.append((numero, veiculo))
+        return restantes
+
+    def importar(self, linhas, progresso=None):
+        """Importa um iterável de (número da linha, dados), como o de ler_planilha()"""
+        resultado = ResultadoImportacao()
+        linhas = iter(linhas)
+        while True:
+            lote = list(islice(linhas, self.lote))
+            if not lote:
+                break
+            self.importar_lote(lote, resultado)
+            if progresso:
+                progresso(resultado)
+        return resultado
@@ -0,0 +1,201 @@
+import json
+import os
+import platform
+import shutil
+import statistics
+import tempfile
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.test import Client
+from django.test.utils import (
+    override_settings, setup_databases, setup_test_environment, teardown_databases,
+    teardown_test_environment,
+)
+from django.urls import URLPattern, reverse
+
+from veiculos import urls
+from veiculos.api import RECURSOS
+from veiculos.cache import get_cache
+from veiculos.dados_sinteticos import Configuracao, GeradorDados, limpar_dados
+from veiculos.middleware import coletar_sql
+from veiculos.models import Cliente, Despesa, Fornecedor, Veiculo, VeiculoImagem, Venda
+from veiculos.redimensionamento import url_redimensionada
+
+# Views que alteram dados mesmo em GET, e as de gravação da API
+IGNORADAS = {'veiculo_imagem_principal'} | {f'api_{nome}_lote' for nome in RECURSOS}
+
+# Parâmetros de URL -> como escolher um objeto existente
+PARAMETROS = {
+    'veiculo_pk': lambda nome: Veiculo.objects.filter(status='disponivel').order_by('pk').first(),
+}
+MODELS_POR_PREFIXO = [
+    *[(f'api_{nome}_', recurso.model) for nome, recurso in RECURSOS.items()],
+    ('veiculo_imagem', VeiculoImagem),
+    ('veiculo', Veiculo),
+    ('despesa', Despesa),
+    ('cliente', Cliente),
+    ('fornecedor', Fornecedor),
+    ('venda', Venda),
+]
+
+# URLs montadas por inteiro: os parâmetros não são pks e a URL é assinada
+URLS_PRONTAS = {
+    'imagem_redimensionada': lambda: url_redimensionada(
+        VeiculoImagem.objects.order_by('pk').values_list('imagem', flat=True).first(), 800, 600
+    ),
+}
+
+# Variações com filtros, além da URL sem parâmetros
+VARIACOES = {
+    'dashboard': ['?periodo=mes', '?periodo=ano'],
+    'veiculo_lista': ['?status=disponivel', '?busca=gol'],
+    'cliente_lista': ['?busca=silva'],
+    'relatorio_por_veiculo': ['?placa=SIM'],
+    'veiculo_exportar': ['?formato=csv', '?formato=xlsx'],
+    'venda_exportar': ['?formato=csv'],
+    'despesa_exportar': ['?formato=csv'],
+    'relatorio_por_veiculo_exportar': ['?formato=csv'],
+}
+
+
+def objeto_para(nome_url, parametro):
+    if parametro in PARAMETROS:
+        objeto = PARAMETROS[parametro](nome_url)
+    else:
+        model = next((model for prefixo, model in MODELS_POR_PREFIXO if nome_url.startswith(prefixo)), None)
+        if model is None:
+            # Uma rota nova sem regra aqui não pode sumir do resultado em silêncio
+            raise CommandError(
+                f'Sem objeto para o parâmetro "{parametro}" de {nome_url}: '
+                'inclua a rota em PARAMETROS, MODELS_POR_PREFIXO ou URLS_PRONTAS.'
+            )
+        objeto = model.objects.order_by('pk').first()
+    if objeto is None:
+        raise CommandError(f'Os dados sintéticos não têm objeto para {nome_url}.')
+    return objeto
+
+
+def urls_do_app():
+    """(nome, caminho) de cada URL GET de veiculos/urls.py, com objetos reais nos parâmetros"""
+    for padrao in urls.urlpatterns:
+        if not isinstance(padrao, URLPattern) or padrao.name in IGNORADAS:
+            continue
+        if padrao.name in URLS_PRONTAS:
+            caminho = URLS_PRONTAS[padrao.name]()
+        else:
+            kwargs = {
+                parametro: objeto_para(padrao.name, parametro).pk
+                for parametro in padrao.pattern.converters
+            }
+            caminho = reverse(padrao.name, kwargs=kwargs)
+        yield padrao.name, caminho
+        for variacao in VARIACOES.get(padrao.name, []):
+            yield f'{padrao.name}{variacao}', caminho + variacao
+
+
+class Command(BaseCommand):
+    help = (
+        'Gera dados sintéticos em um banco de teste e mede cada URL do app '
+        '(tempo, queries e tamanho da resposta), salvando o resultado em JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--escalas',
+            default='1000,10000,100000',
+            help='Quantidades de veículos, separadas por vírgula (padrão: 1000,10000,100000)'
+        )
+        parser.add_argument(
+            '--repeticoes',
+            type=int,
+            default=5,
+            help='Requisições por URL; o tempo registrado é a mediana (padrão: 5)'
+        )
+        parser.add_argument(
+            '--saida',
+            default=f'benchmark_{datetime.now():%Y%m%d_%H%M%S}.json',
+            help='Arquivo JSON de saída'
+        )
+        parser.add_argument(
+            '--semente',
+            type=int,
+            default=Configuracao.semente,
+            help='Semente dos dados sintéticos'
+        )
+
+    def medir(self, cliente, caminho, repeticoes):
+        # Primeira requisição com o cache vazio; as demais, como em produção
+        get_cache().clear()
+        tempos = []
+        for _ in range(repeticoes):
+            # Todos os bancos, inclusive as threads das consultas em paralelo
+            with coletar_sql() as queries:
+                inicio = time.perf_counter()
+                resposta = cliente.get(caminho)
+                conteudo = b''.join(resposta) if resposta.streaming else resposta.content
+                tempos.append(time.perf_counter() - inicio)
+            if len(tempos) == 1:
+                primeira = {'queries': queries.quantidade, 'tempo_ms': round(tempos[0] * 1000, 2)}
+        return {
+            'status': resposta.status_code,
+            'tempo_ms': round(statistics.median(tempos) * 1000, 2),
+            'tempo_frio_ms': primeira['tempo_ms'],
+            'queries': queries.quantidade,
+            'queries_frio': primeira['queries'],
+            'bytes': len(conteudo),
+        }
+
+    def handle(self, *args, **options):
+        escalas = [int(escala) for escala in options['escalas'].split(',')]
+        resultado = {
+            'data': datetime.now().isoformat(timespec='seconds'),
+            'banco': connection.vendor,
+            'python': platform.python_version(),
+            'repeticoes': options['repeticoes'],
+            'escalas': {},
+        }
+
+        # Bancos de teste (todos os aliases, a réplica inclusive) e MEDIA_ROOT
+        # temporário: os dados e arquivos reais nunca são tocados
+        setup_test_environment()
+        bancos = setup_databases(verbosity=0, interactive=False, serialized_aliases=set())
+        arquivos = tempfile.mkdtemp(prefix='benchmark_media_')
+        ajustes = override_settings(
+            MEDIA_ROOT=arquivos,
+            VEICULOS_CACHE_IMAGENS_DIR=os.path.join(arquivos, 'cache'),
+            # Nada replica o banco de teste: as views de leitura usam o default
+            VEICULOS_BANCO_LEITURA=DEFAULT_DB_ALIAS,
+        )
+        ajustes.enable()
+        try:
+            cliente = Client()
+            for escala in escalas:
+                self.stdout.write(f'📦 Gerando dados para {escala} veículos...')
+                limpar_dados()
+                inicio = time.perf_counter()
+                GeradorDados(Configuracao.para_escala(escala, semente=options['semente'])).gerar()
+                self.stdout.write(f'   gerados em {time.perf_counter() - inicio:.1f}s')
+
+                medidas = {}
+                for nome, caminho in urls_do_app():
+                    medidas[nome] = {'url': caminho, **self.medir(cliente, caminho, options['repeticoes'])}
+                    m = medidas[nome]
+                    self.stdout.write(
+                        f"   {m['status']} {m['tempo_ms']:>9.1f} ms {m['queries']:>4} queries "
+                        f"{m['bytes']:>9} bytes  {caminho}"
+                    )
+                resultado['escalas'][str(escala)] = medidas
+        finally:
+            ajustes.disable()
+            shutil.rmtree(arquivos, ignore_errors=True)
+            teardown_databases(bancos, verbosity=0)
+            # SQLite em memória: as conexões com os bancos de teste continuam abertas
+            connections.close_all()
+            teardown_test_environment()
+
+        with open(options['saida'], 'w', encoding='utf-8') as arquivo:
+            json.dump(resultado, arquivo, ensure_ascii=False, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"✅ Resultado salvo em {options['saida']}"))
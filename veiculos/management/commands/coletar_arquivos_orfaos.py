@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from veiculos.models import VeiculoImagem
+
+
+class Command(BaseCommand):
+    help = (
+        'Apaga os arquivos do armazenamento por conteúdo que nenhuma imagem usa '
+        '(nem como original nem como derivado), ex. depois de exclusões em massa'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--simular',
+            action='store_true',
+            help='Só lista os arquivos órfãos, sem apagar'
+        )
+
+    def handle(self, *args, **options):
+        storage = VeiculoImagem._meta.get_field('imagem').storage
+        if not hasattr(storage, 'listar_conteudo'):
+            raise CommandError(
+                'O storage das imagens não é o ArmazenamentoConteudo (veja STORAGES em settings).'
+            )
+
+        usados = set()
+        for nome, derivados in VeiculoImagem.objects.values_list('imagem', 'derivados').iterator(chunk_size=2000):
+            usados.add(nome)
+            for versoes in derivados.values():
+                usados.update(caminho for caminho in versoes.values() if isinstance(caminho, str))
+
+        apagados = bytes_liberados = 0
+        for nome in storage.listar_conteudo():
+            # Recentes podem ser de um upload que ainda não chegou ao banco
+            if nome in usados or storage.recente(nome):
+                continue
+            tamanho = storage.size(nome)
+            if options['simular']:
+                self.stdout.write(f'  {nome} ({tamanho / 1024:.1f} KB)')
+            else:
+                storage.delete(nome)
+            apagados += 1
+            bytes_liberados += tamanho
+
+        acao = 'encontrados' if options['simular'] else 'apagados'
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {apagados} arquivos órfãos {acao} ({bytes_liberados / 1024 / 1024:.1f} MB).'
+        ))
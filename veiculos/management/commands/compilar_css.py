@@ -0,0 +1,44 @@
+import shutil
+import subprocess
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+ENTRADA = 'static_src/app.css'
+SAIDA = 'static/css/app.css'
+
+
+class Command(BaseCommand):
+    help = (
+        'Compila o CSS do Tailwind (static_src/app.css -> static/css/app.css) '
+        'só com as classes usadas nos templates. Depois, em produção, rode '
+        'collectstatic para gerar os nomes com hash e as versões gzip/brotli'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--watch',
+            action='store_true',
+            help='Recompila a cada alteração nos templates (desenvolvimento)'
+        )
+
+    def handle(self, *args, **options):
+        # O executável standalone do Tailwind, sem Node: pip install -r requirements-dev.txt
+        executavel = getattr(settings, 'VEICULOS_TAILWIND', 'tailwindcss')
+        if not shutil.which(executavel):
+            raise CommandError(
+                f'Executável "{executavel}" não encontrado. '
+                'Instale com: pip install -r requirements-dev.txt'
+            )
+
+        comando = [executavel, '-i', ENTRADA, '-o', SAIDA]
+        comando.append('--watch' if options['watch'] else '--minify')
+        try:
+            subprocess.run(comando, cwd=settings.BASE_DIR, check=True)
+        except subprocess.CalledProcessError as e:
+            raise CommandError(f'Falha ao compilar o CSS (código {e.returncode}).')
+        except KeyboardInterrupt:
+            return
+
+        tamanho = (settings.BASE_DIR / SAIDA).stat().st_size
+        self.stdout.write(self.style.SUCCESS(f'✅ {SAIDA} compilado ({tamanho / 1024:.1f} KB).'))
@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand
+
+from veiculos.dados_sinteticos import Configuracao, GeradorDados, limpar_dados
+
+
+class Command(BaseCommand):
+    help = 'Gera um conjunto de dados sintético e reproduzível (fornecedores, clientes, veículos, despesas, vendas e imagens)'
+
+    def add_arguments(self, parser):
+        padrao = Configuracao()
+        parser.add_argument('--veiculos', type=int, default=padrao.veiculos,
+                            help=f'Quantidade de veículos (padrão: {padrao.veiculos})')
+        parser.add_argument('--fornecedores', type=int, default=None,
+                            help='Quantidade de fornecedores (padrão: proporcional aos veículos)')
+        parser.add_argument('--clientes', type=int, default=None,
+                            help='Quantidade de clientes (padrão: proporcional aos veículos)')
+        parser.add_argument('--despesas-por-veiculo', type=int, default=padrao.despesas_por_veiculo,
+                            help=f'Média de despesas por veículo (padrão: {padrao.despesas_por_veiculo})')
+        parser.add_argument('--vendidos', type=float, default=padrao.vendidos,
+                            help=f'Fração dos veículos vendidos (padrão: {padrao.vendidos})')
+        parser.add_argument('--entradas', type=float, default=padrao.entradas,
+                            help=f'Fração das vendas com veículo na troca (padrão: {padrao.entradas})')
+        parser.add_argument('--imagens-por-veiculo', type=int, default=padrao.imagens_por_veiculo,
+                            help=f'Imagens por veículo (padrão: {padrao.imagens_por_veiculo})')
+        parser.add_argument('--semente', type=int, default=padrao.semente,
+                            help=f'Semente do gerador aleatório (padrão: {padrao.semente})')
+        parser.add_argument('--limpar', action='store_true',
+                            help='Apaga os dados existentes antes de gerar (CUIDADO: apaga tudo)')
+
+    def handle(self, *args, **options):
+        if options['limpar']:
+            limpar_dados()
+            self.stdout.write('🗑️  Dados anteriores apagados.')
+
+        extras = {
+            campo: options[campo]
+            for campo in ('fornecedores', 'clientes')
+            if options[campo] is not None
+        }
+        config = Configuracao.para_escala(
+            options['veiculos'],
+            despesas_por_veiculo=options['despesas_por_veiculo'],
+            vendidos=options['vendidos'],
+            entradas=options['entradas'],
+            imagens_por_veiculo=options['imagens_por_veiculo'],
+            semente=options['semente'],
+        )
+        for campo, valor in extras.items():
+            setattr(config, campo, valor)
+
+        GeradorDados(config, saida=self.stdout.write).gerar()
+        self.stdout.write(self.style.SUCCESS(f'✅ Dados gerados ({config.veiculos} veículos).'))
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+
+from veiculos.models import VeiculoImagem
+
+
+class Command(BaseCommand):
+    help = 'Gera as versões reduzidas (thumb/card/full) das imagens já cadastradas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--todas',
+            action='store_true',
+            help='Regera também as imagens que já possuem derivados'
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=200,
+            help='Quantidade de imagens lidas do banco por vez (padrão: 200)'
+        )
+
+    def handle(self, *args, **options):
+        imagens = VeiculoImagem.objects.order_by('pk')
+        if not options['todas']:
+            imagens = imagens.filter(derivados={})
+
+        processadas = erros = 0
+        ultimo_id = 0
+        while True:
+            lote = list(imagens.filter(pk__gt=ultimo_id)[:options['lote']])
+            if not lote:
+                break
+            ultimo_id = lote[-1].pk
+
+            for imagem in lote:
+                try:
+                    imagem.gerar_derivados()
+                    processadas += 1
+                except Exception as e:
+                    erros += 1
+                    self.stderr.write(f'  ✗ {imagem.imagem.name}: {e}')
+
+            self.stdout.write(f'  {processadas} imagens processadas...')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Derivados gerados para {processadas} imagens ({erros} com erro).'
+        ))
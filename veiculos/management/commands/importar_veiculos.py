@@ -0,0 +1,41 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from veiculos.importacao import ImportadorVeiculos, PlanilhaInvalida, TAMANHO_LOTE, ler_planilha
+
+
+class Command(BaseCommand):
+    help = 'Importa veículos de uma planilha CSV ou XLSX, validando e inserindo em lotes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('arquivo', help='Caminho da planilha (.csv ou .xlsx)')
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=TAMANHO_LOTE,
+            help=f'Quantidade de linhas por transação (padrão: {TAMANHO_LOTE})'
+        )
+
+    def handle(self, *args, **options):
+        caminho = options['arquivo']
+        if not os.path.exists(caminho):
+            raise CommandError(f'Arquivo não encontrado: {caminho}')
+
+        importador = ImportadorVeiculos(lote=options['lote'])
+
+        def progresso(resultado):
+            self.stdout.write(f'  {resultado.criados} importados, {resultado.total_erros} com erro...')
+
+        with open(caminho, 'rb') as arquivo:
+            try:
+                resultado = importador.importar(ler_planilha(arquivo, caminho), progresso=progresso)
+            except PlanilhaInvalida as e:
+                raise CommandError(str(e))
+
+        for numero, erros in resultado.erros:
+            self.stderr.write(f'  Linha {numero}: {"; ".join(erros)}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {resultado.criados} veículos importados, {resultado.total_erros} linhas com erro.'
+        ))
@@ -0,0 +1,67 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+
+from veiculos import tarefas
+
+
+class Command(BaseCommand):
+    help = 'Worker da fila de tarefas (processamento de imagens) usando um pool de processos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processos',
+            type=int,
+            default=os.cpu_count() or 2,
+            help='Quantidade de processos no pool (padrão: número de CPUs)'
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=float,
+            default=2.0,
+            help='Segundos de espera quando a fila está vazia (padrão: 2)'
+        )
+        parser.add_argument(
+            '--uma-vez',
+            action='store_true',
+            help='Processa o que estiver na fila e encerra'
+        )
+
+    def handle(self, *args, **options):
+        processos = options['processos']
+        self.stdout.write(f'🔧 Worker iniciado com {processos} processos.')
+
+        # spawn: os processos não herdam as conexões abertas do processo pai
+        with ProcessPoolExecutor(
+            max_workers=processos,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=tarefas.inicializar_processo,
+        ) as pool:
+            try:
+                while True:
+                    reservadas = tarefas.reservar(limite=processos * 2)
+                    if not reservadas:
+                        if options['uma_vez']:
+                            break
+                        time.sleep(options['intervalo'])
+                        continue
+
+                    futures = {
+                        pool.submit(tarefas.executar, tarefa.tipo, tarefa.parametros): tarefa
+                        for tarefa in reservadas
+                    }
+                    for future in as_completed(futures):
+                        tarefa = futures[future]
+                        try:
+                            future.result()
+                        except Exception as e:
+                            tarefas.falhar(tarefa, f'{type(e).__name__}: {e}')
+                            self.stderr.write(f'  ✗ {tarefa}: {e}')
+                        else:
+                            tarefas.concluir(tarefa)
+                            self.stdout.write(f'  ✓ {tarefa}')
+            except KeyboardInterrupt:
+                self.stdout.write('Encerrando worker...')
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from veiculos.models import Veiculo
+
+
+class Command(BaseCommand):
+    help = 'Recalcula total_despesas e qtd_despesas de todos os veículos, em lotes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=1000,
+            help='Quantidade de veículos por transação (padrão: 1000)'
+        )
+
+    def handle(self, *args, **options):
+        lote = options['lote']
+        ultimo_id = 0
+        total = 0
+
+        while True:
+            ids = list(
+                Veiculo.objects.filter(pk__gt=ultimo_id)
+                .order_by('pk')
+                .values_list('pk', flat=True)[:lote]
+            )
+            if not ids:
+                break
+
+            with transaction.atomic():
+                Veiculo.objects.filter(pk__in=ids).recalcular_despesas()
+
+            total += len(ids)
+            ultimo_id = ids[-1]
+            self.stdout.write(f'  {total} veículos recalculados...')
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Totais de despesas recalculados para {total} veículos.'))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from veiculos.models import ResumoDiario
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói do zero o resumo diário (vendas, despesas e lucro por dia)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=1000,
+            help='Quantidade de dias por INSERT (padrão: 1000)'
+        )
+
+    def handle(self, *args, **options):
+        resumos = ResumoDiario.calcular()
+
+        with transaction.atomic():
+            ResumoDiario.objects.all().delete()
+            ResumoDiario.objects.bulk_create(
+                sorted(resumos.values(), key=lambda resumo: resumo.data),
+                batch_size=options['lote'],
+            )
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Resumo diário reconstruído com {len(resumos)} dias.'))
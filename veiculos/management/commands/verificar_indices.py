@@ -0,0 +1,80 @@
+import re
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Sum
+
+from veiculos.models import Cliente, Despesa, Fornecedor, ResumoDiario, Veiculo, Venda
+
+
+def consultas():
+    """Consultas principais das views, como elas as montam"""
+    hoje = date.today()
+    inicio = hoje.replace(day=1) - timedelta(days=60)
+    por_pagina = 26  # KeysetPaginator busca uma linha a mais
+
+    return {
+        'dashboard: veículos disponíveis': (
+            Veiculo.objects.filter(status='disponivel').order_by('-data_cadastro', '-id')[:5]
+        ),
+        'dashboard: contagem por status': Veiculo.objects.filter(status='vendido').values('pk'),
+        'dashboard: últimas vendas do período': (
+            Venda.objects.filter(data_venda__gte=inicio, data_venda__lte=hoje).order_by('-data_venda')[:5]
+        ),
+        'dashboard: resumo do período': (
+            ResumoDiario.objects.filter(data__gte=inicio, data__lte=hoje).values('total_vendas')
+        ),
+        'veiculo_lista': Veiculo.objects.order_by('-data_cadastro', '-id')[:por_pagina],
+        'veiculo_lista (status)': (
+            Veiculo.objects.filter(status='manutencao').order_by('-data_cadastro', '-id')[:por_pagina]
+        ),
+        'cliente_lista': Cliente.objects.order_by('nome', 'id')[:por_pagina],
+        'fornecedor_lista': Fornecedor.objects.order_by('nome', 'id')[:por_pagina],
+        'venda_lista': Venda.objects.order_by('-data_venda', '-id')[:por_pagina],
+        'vendas por período (soma)': (
+            Venda.objects.filter(data_venda__gte=inicio, data_venda__lte=hoje)
+            .order_by().values('data_venda').annotate(total=Sum('valor_venda'))
+        ),
+        'despesas por período (soma)': (
+            Despesa.objects.filter(data_despesa__gte=inicio, data_despesa__lte=hoje)
+            .order_by().values('data_despesa').annotate(total=Sum('valor'))
+        ),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Roda EXPLAIN nas consultas principais das views e falha se alguma '
+        'fizer leitura sequencial da tabela (Seq Scan / SCAN)'
+    )
+
+    def handle(self, *args, **options):
+        if connection.vendor == 'postgresql':
+            # Com tabelas pequenas o planner prefere Seq Scan mesmo com índice;
+            # desligando, ele só faz Seq Scan quando não há índice utilizável.
+            varredura = re.compile(r'Seq Scan on (\S+)')
+        elif connection.vendor == 'sqlite':
+            varredura = re.compile(r'\bSCAN (\w+)\s*$', re.MULTILINE)
+        else:
+            raise CommandError(f'Banco {connection.vendor} não suportado.')
+
+        falhas = []
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+
+            for nome, queryset in consultas().items():
+                plano = queryset.explain()
+                tabelas = varredura.findall(plano)
+                if tabelas:
+                    falhas.append(nome)
+                    self.stderr.write(f'  ✗ {nome}: leitura sequencial em {", ".join(tabelas)}')
+                    self.stderr.write('    ' + plano.replace('\n', '\n    '))
+                else:
+                    self.stdout.write(f'  ✓ {nome}')
+
+        if falhas:
+            raise CommandError(f'{len(falhas)} consulta(s) sem índice: {", ".join(falhas)}')
+        self.stdout.write(self.style.SUCCESS('✅ Todas as consultas usam índices.'))
@@ -0,0 +1,219 @@
+"""
+Instrumentação de SQL por requisição.
+
+Cada query executada durante a requisição passa por um execute_wrapper que
+mede o tempo e agrupa o SQL pela sua "impressão digital" (o texto com as
+listas IN colapsadas e os números trocados por ?). A mesma impressão
+digital repetida muitas vezes é o sinal de um N+1.
+
+O wrapper só fica instalado durante a requisição (medir_conexoes, um
+ExitStack de connection.execute_wrapper sobre todas as conexões da thread).
+O coletor fica em uma ContextVar, que o asgiref copia para as threads de
+sync_to_async: as threads que consultam em paralelo (veja
+veiculos/paralelo.py) instalam o wrapper nas suas conexões enquanto rodam e
+as queries entram na conta da mesma requisição.
+
+Os totais vão no cabeçalho Server-Timing (visível na aba Network do
+navegador) e as requisições acima dos limites são registradas no logger
+'veiculos.requisicoes_lentas' como JSON.
+
+Configuração (settings):
+    VEICULOS_REQUISICAO_LENTA_MS: tempo total a partir do qual a requisição
+        é registrada (padrão 500)
+    VEICULOS_REQUISICAO_LENTA_QUERIES: idem para quantidade de queries
+        (padrão 100)
+    VEICULOS_QUERIES_REPETIDAS: repetições da mesma impressão digital para
+        considerar N+1 (padrão 5)
+"""
+import heapq
+import json
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger('veiculos.requisicoes_lentas')
+
+LIMITE_MS_PADRAO = 500
+LIMITE_QUERIES_PADRAO = 100
+REPETICOES_PADRAO = 5
+
+# Quantas queries mais lentas e quantas repetidas entram no log
+MAIS_LENTAS = 5
+MAIS_REPETIDAS = 5
+TAMANHO_MAXIMO_SQL = 1000
+
+_LISTA_IN = re.compile(r'\bIN \([^()]*\)', re.IGNORECASE)
+_NUMERO = re.compile(r'\b\d+(?:\.\d+)?\b')
+_ESPACOS = re.compile(r'\s+')
+
+_coletor_atual = ContextVar('coletor_sql', default=None)
+
+
+def impressao_digital(sql):
+    """SQL sem os valores: queries que só mudam nos parâmetros ficam iguais"""
+    sql = _LISTA_IN.sub('IN (...)', sql)
+    sql = _NUMERO.sub('?', sql)
+    return _ESPACOS.sub(' ', sql).strip()
+
+
+class ColetorSQL:
+    """
+    execute_wrapper que acumula as estatísticas das queries da requisição.
+    Com `pai` (um coletor externo, ex. o do comando benchmark), cada query
+    também é registrada nele.
+    """
+
+    def __init__(self, pai=None):
+        self.pai = pai
+        self.quantidade = 0
+        self.tempo = 0.0
+        self.impressoes = Counter()
+        self.lentas = []  # heap de (duração, ordem, alias, sql)
+        # Views async consultam em várias threads ao mesmo tempo
+        self.lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duracao = time.perf_counter() - inicio
+            self.registrar(context['connection'].alias, sql, duracao)
+
+    def registrar(self, alias, sql, duracao):
+        impressao = impressao_digital(sql)
+        with self.lock:
+            self.quantidade += 1
+            self.tempo += duracao
+            self.impressoes[impressao] += 1
+            item = (duracao, self.quantidade, alias, sql)
+            if len(self.lentas) < MAIS_LENTAS:
+                heapq.heappush(self.lentas, item)
+            else:
+                heapq.heappushpop(self.lentas, item)
+        if self.pai is not None:
+            self.pai.registrar(alias, sql, duracao)
+
+    def repetidas(self, minimo):
+        return [(sql, vezes) for sql, vezes in self.impressoes.most_common() if vezes >= minimo]
+
+    def mais_lentas(self):
+        return [
+            {'ms': round(duracao * 1000, 2), 'banco': alias, 'sql': sql[:TAMANHO_MAXIMO_SQL]}
+            for duracao, _, alias, sql in sorted(self.lentas, reverse=True)
+        ]
+
+
+def _medir(execute, sql, params, many, context):
+    coletor = _coletor_atual.get()
+    if coletor is None:
+        return execute(sql, params, many, context)
+    return coletor(execute, sql, params, many, context)
+
+
+def medir_conexoes():
+    """Context manager que mede as queries de todas as conexões da thread atual"""
+    pilha = ExitStack()
+    for conexao in connections.all():
+        # Já medida por um medir_conexoes externo: o coletor atual recebe a query
+        if _medir not in conexao.execute_wrappers:
+            pilha.enter_context(conexao.execute_wrapper(_medir))
+    return pilha
+
+
+@contextmanager
+def coletar_sql():
+    """Coleta em um ColetorSQL as queries do bloco, de todas as conexões"""
+    coletor = ColetorSQL(pai=_coletor_atual.get())
+    token = _coletor_atual.set(coletor)
+    try:
+        with medir_conexoes():
+            yield coletor
+    finally:
+        _coletor_atual.reset(token)
+
+
+class InstrumentacaoSQLMiddleware:
+    """
+    Mede tempo total, tempo de banco e queries de cada requisição, adiciona
+    o cabeçalho Server-Timing e registra as requisições lentas. Deve ficar
+    no topo de MIDDLEWARE para medir a requisição inteira.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.limite_ms = getattr(settings, 'VEICULOS_REQUISICAO_LENTA_MS', LIMITE_MS_PADRAO)
+        self.limite_queries = getattr(settings, 'VEICULOS_REQUISICAO_LENTA_QUERIES', LIMITE_QUERIES_PADRAO)
+        self.repeticoes = getattr(settings, 'VEICULOS_QUERIES_REPETIDAS', REPETICOES_PADRAO)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        inicio = time.perf_counter()
+        with coletar_sql() as coletor:
+            response = self.get_response(request)
+        return self.finalizar(request, response, inicio, coletor)
+
+    async def __acall__(self, request):
+        coletor = ColetorSQL(pai=_coletor_atual.get())
+        token = _coletor_atual.set(coletor)
+        inicio = time.perf_counter()
+        # A thread de sync_to_async desta requisição é a que o ORM async usa
+        medicao = await sync_to_async(medir_conexoes)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(medicao.close)()
+            _coletor_atual.reset(token)
+        return self.finalizar(request, response, inicio, coletor)
+
+    def finalizar(self, request, response, inicio, coletor):
+        # Em respostas streaming, o corpo (e suas queries) vem depois daqui
+        total_ms = (time.perf_counter() - inicio) * 1000
+        db_ms = coletor.tempo * 1000
+        repetidas = coletor.repetidas(self.repeticoes)
+
+        metricas = [
+            f'total;dur={total_ms:.1f}',
+            f'db;dur={db_ms:.1f};desc="{coletor.quantidade} queries"',
+        ]
+        if repetidas:
+            maior = repetidas[0][1]
+            # Cabeçalhos HTTP: só ASCII
+            metricas.append(f'n1;desc="{len(repetidas)} queries repetidas (max {maior}x)"')
+        response['Server-Timing'] = ', '.join(metricas)
+
+        if total_ms >= self.limite_ms or coletor.quantidade >= self.limite_queries:
+            self.registrar_lenta(request, response, total_ms, db_ms, coletor, repetidas)
+        return response
+
+    def registrar_lenta(self, request, response, total_ms, db_ms, coletor, repetidas):
+        match = request.resolver_match
+        dados = {
+            'metodo': request.method,
+            'caminho': request.get_full_path(),
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'total_ms': round(total_ms, 1),
+            'db_ms': round(db_ms, 1),
+            'queries': coletor.quantidade,
+            'repetidas': [
+                {'vezes': vezes, 'sql': sql[:TAMANHO_MAXIMO_SQL]}
+                for sql, vezes in repetidas[:MAIS_REPETIDAS]
+            ],
+            'mais_lentas': coletor.mais_lentas(),
+        }
+        logger.warning(json.dumps(dados, ensure_ascii=False), extra={'requisicao': dados})
@@ -0,0 +1,50 @@
+# Generated by Django 5.0 on 2026-10-18 12:32
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def preencher_totais(apps, schema_editor):
+    Veiculo = apps.get_model('veiculos', 'Veiculo')
+    Despesa = apps.get_model('veiculos', 'Despesa')
+    despesas = Despesa.objects.filter(veiculo=OuterRef('pk')).order_by().values('veiculo')
+    Veiculo.objects.update(
+        total_despesas=Coalesce(
+            Subquery(
+                despesas.annotate(total=Sum('valor')).values('total'),
+                output_field=models.DecimalField(max_digits=12, decimal_places=2),
+            ),
+            Value(Decimal('0.00')),
+            output_field=models.DecimalField(max_digits=12, decimal_places=2),
+        ),
+        qtd_despesas=Coalesce(
+            Subquery(
+                despesas.annotate(qtd=Count('pk')).values('qtd'),
+                output_field=models.IntegerField(),
+            ),
+            Value(0),
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('veiculos', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='veiculo',
+            name='qtd_despesas',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Quantidade de Despesas'),
+        ),
+        migrations.AddField(
+            model_name='veiculo',
+            name='total_despesas',
+            field=models.DecimalField(db_index=True, decimal_places=2, default=Decimal('0.00'), editable=False, max_digits=12, verbose_name='Total de Despesas'),
+        ),
+        migrations.RunPython(preencher_totais, migrations.RunPython.noop),
+    ]
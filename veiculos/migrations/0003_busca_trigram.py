@@ -0,0 +1,57 @@
+from django.db import migrations
+
+# Mesmas expressões de veiculos.busca.PostgresTrigramBackend.expressao()
+INDICES = {
+    'veiculos_veiculo_busca_trgm': (
+        'veiculos_veiculo',
+        "coalesce(\"marca\", '') || ' ' || coalesce(\"modelo\", '') || ' ' || "
+        "coalesce(\"placa\", '') || ' ' || coalesce(\"ano\"::text, '')",
+    ),
+    'veiculos_cliente_busca_trgm': (
+        'veiculos_cliente',
+        "coalesce(\"nome\", '') || ' ' || coalesce(\"cpf\", '') || ' ' || coalesce(\"telefone\", '')",
+    ),
+    'veiculos_fornecedor_busca_trgm': (
+        'veiculos_fornecedor',
+        "coalesce(\"nome\", '') || ' ' || coalesce(\"cnpj_cpf\", '')",
+    ),
+}
+
+
+def criar_indices(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS unaccent')
+    # unaccent() não é IMMUTABLE, então não pode ser usada direto em um índice
+    schema_editor.execute(
+        "CREATE OR REPLACE FUNCTION veiculos_unaccent(text) RETURNS text AS "
+        "$$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$ "
+        "LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT"
+    )
+    for nome, (tabela, expressao) in INDICES.items():
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS "{nome}" ON "{tabela}" '
+            f'USING gin ((veiculos_unaccent(lower({expressao}))) gin_trgm_ops)'
+        )
+
+
+def remover_indices(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    for nome in INDICES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{nome}"')
+    schema_editor.execute('DROP FUNCTION IF EXISTS veiculos_unaccent(text)')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('veiculos', '0002_veiculo_totais_despesas'),
+    ]
+
+    operations = [
+        migrations.RunPython(criar_indices, remover_indices),
+    ]
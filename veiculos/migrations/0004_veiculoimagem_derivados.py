@@ -0,0 +1,18 @@
+# Generated by Django 5.0 on 2026-10-18 12:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('veiculos', '0003_busca_trigram'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='veiculoimagem',
+            name='derivados',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Versões Reduzidas'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.0 on 2026-10-18 12:38
+
+from django.db import migrations, models
+
+
+def marcar_processadas(apps, schema_editor):
+    VeiculoImagem = apps.get_model('veiculos', 'VeiculoImagem')
+    VeiculoImagem.objects.exclude(derivados={}).update(processamento='concluido')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('veiculos', '0004_veiculoimagem_derivados'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='veiculoimagem',
+            name='processamento',
+            field=models.CharField(choices=[('pendente', 'Pendente'), ('processando', 'Processando'), ('concluido', 'Concluído'), ('erro', 'Erro')], default='pendente', editable=False, max_length=20, verbose_name='Processamento'),
+        ),
+        migrations.AddField(
+            model_name='veiculoimagem',
+            name='sha256',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=64, verbose_name='Hash SHA-256'),
+        ),
+        migrations.RunPython(marcar_processadas, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='Tarefa',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('processar_imagem', 'Processar imagem')], max_length=50, verbose_name='Tipo')),
+                ('parametros', models.JSONField(blank=True, default=dict, verbose_name='Parâmetros')),
+                ('status', models.CharField(choices=[('pendente', 'Pendente'), ('processando', 'Processando'), ('concluida', 'Concluída'), ('erro', 'Erro')], default='pendente', max_length=20, verbose_name='Status')),
+                ('tentativas', models.PositiveSmallIntegerField(default=0, verbose_name='Tentativas')),
+                ('erro', models.TextField(blank=True, verbose_name='Último Erro')),
+                ('criada_em', models.DateTimeField(auto_now_add=True, verbose_name='Criada em')),
+                ('iniciada_em', models.DateTimeField(blank=True, null=True, verbose_name='Iniciada em')),
+                ('concluida_em', models.DateTimeField(blank=True, null=True, verbose_name='Concluída em')),
+            ],
+            options={
+                'verbose_name': 'Tarefa',
+                'verbose_name_plural': 'Tarefas',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['status', 'id'], name='veiculos_tarefa_fila_idx')],
+            },
+        ),
+    ]
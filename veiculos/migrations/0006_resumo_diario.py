@@ -0,0 +1,70 @@
+# Generated by Django 5.0 on 2026-10-18 12:41
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Case, Count, F, Sum, Value, When
+
+
+def preencher_resumo(apps, schema_editor):
+    """Mesmo cálculo de ResumoDiario.calcular(), com os models históricos"""
+    Venda = apps.get_model('veiculos', 'Venda')
+    Despesa = apps.get_model('veiculos', 'Despesa')
+    ResumoDiario = apps.get_model('veiculos', 'ResumoDiario')
+    zero = Decimal('0.00')
+
+    resumos = {}
+    for linha in Venda.objects.order_by().values('data_venda').annotate(
+        qtd=Count('id'),
+        vendas=Sum('valor_venda'),
+        entradas=Sum('valor_entrada'),
+        lucro=Sum(Case(
+            When(
+                veiculo__status='vendido',
+                then=F('valor_venda') - F('veiculo__valor_compra') - F('veiculo__total_despesas'),
+            ),
+            default=Value(zero),
+            output_field=models.DecimalField(max_digits=12, decimal_places=2),
+        )),
+    ):
+        resumos[linha['data_venda']] = ResumoDiario(
+            data=linha['data_venda'],
+            qtd_vendas=linha['qtd'],
+            total_vendas=linha['vendas'] or zero,
+            total_entradas=linha['entradas'] or zero,
+            lucro=linha['lucro'] or zero,
+        )
+
+    for linha in Despesa.objects.order_by().values('data_despesa').annotate(total=Sum('valor')):
+        resumo = resumos.setdefault(linha['data_despesa'], ResumoDiario(data=linha['data_despesa']))
+        resumo.total_despesas = linha['total'] or zero
+
+    ResumoDiario.objects.bulk_create(resumos.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('veiculos', '0005_tarefa_processamento_imagens'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumoDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.DateField(unique=True, verbose_name='Data')),
+                ('qtd_vendas', models.PositiveIntegerField(default=0, verbose_name='Quantidade de Vendas')),
+                ('total_vendas', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14, verbose_name='Total de Vendas')),
+                ('total_entradas', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14, verbose_name='Total de Entradas')),
+                ('total_despesas', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14, verbose_name='Total de Despesas')),
+                ('lucro', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14, verbose_name='Lucro')),
+                ('atualizado_em', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+            ],
+            options={
+                'verbose_name': 'Resumo Diário',
+                'verbose_name_plural': 'Resumos Diários',
+                'ordering': ['-data'],
+            },
+        ),
+        migrations.RunPython(preencher_resumo, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.0 on 2026-10-18 12:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('veiculos', '0006_resumo_diario'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['nome', 'id'], name='veiculos_cli_nome_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='despesa',
+            index=models.Index(fields=['data_despesa'], include=('valor', 'veiculo'), name='veiculos_desp_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fornecedor',
+            index=models.Index(fields=['nome', 'id'], name='veiculos_forn_nome_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='veiculo',
+            index=models.Index(fields=['-data_cadastro', '-id'], name='veiculos_veic_cadastro_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='veiculo',
+            index=models.Index(fields=['status', '-data_cadastro', '-id'], name='veiculos_veic_status_cad_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='veiculo',
+            index=models.Index(condition=models.Q(('status', 'disponivel')), fields=['-data_cadastro', '-id'], name='veiculos_veic_disponivel_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='venda',
+            index=models.Index(fields=['-data_venda', '-id'], name='veiculos_venda_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='venda',
+            index=models.Index(fields=['data_venda'], include=('valor_venda', 'valor_entrada', 'veiculo'), name='veiculos_venda_periodo_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0 on 2026-10-18 13:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('veiculos', '0009_atualizado_em_indices'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='veiculoimagem',
+            name='imagem',
+            field=models.ImageField(db_index=True, upload_to='veiculos/%Y/%m/', verbose_name='Imagem'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0 on 2026-10-18 13:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('veiculos', '0010_imagem_indice'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tipodespesa',
+            name='atualizado_em',
+            field=models.DateTimeField(auto_now=True, db_index=True, verbose_name='Atualizado em'),
+        ),
+    ]
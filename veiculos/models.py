@@ -1,7 +1,17 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import Case, Count, F, OuterRef, Prefetch, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
 from django.core.validators import MinValueValidator
+from django.utils import timezone
 from decimal import Decimal
 
+from .cache import invalidar as invalidar_cache
+from .imagens import TAMANHOS, gerar_derivados, remover_derivados
+from .redimensionamento import url_redimensionada
+from .resumo import marcar_resumo
+
+VALOR_FIELD = models.DecimalField(max_digits=12, decimal_places=2)
+
 
 class Fornecedor(models.Model):
     """Fornecedor de serviços/peças para os veículos"""
@@ -12,11 +22,18 @@ class Fornecedor(models.Model):
     endereco = models.TextField(blank=True, verbose_name='Endereço')
     ativo = models.BooleanField(default=True, verbose_name='Ativo')
     data_cadastro = models.DateTimeField(auto_now_add=True, verbose_name='Data de Cadastro')
+    atualizado_em = models.DateTimeField(auto_now=True, db_index=True, verbose_name='Atualizado em')
 
     class Meta:
         verbose_name = 'Fornecedor'
         verbose_name_plural = 'Fornecedores'
         ordering = ['nome']
+        indexes = [
+            # Listagem paginada por (nome, id)
+            models.Index(fields=['nome', 'id'], name='veiculos_forn_nome_idx'),
+        ]
+
+    CAMPOS_BUSCA = ('nome', 'cnpj_cpf')
 
     def __str__(self):
         return self.nome
@@ -30,16 +47,114 @@ class Cliente(models.Model):
     email = models.EmailField(blank=True, verbose_name='E-mail')
     endereco = models.TextField(blank=True, verbose_name='Endereço')
     data_cadastro = models.DateTimeField(auto_now_add=True, verbose_name='Data de Cadastro')
+    # Versão da linha (cache de fragmentos dos templates e ETag das páginas)
+    atualizado_em = models.DateTimeField(auto_now=True, db_index=True, verbose_name='Atualizado em')
 
     class Meta:
         verbose_name = 'Cliente'
         verbose_name_plural = 'Clientes'
         ordering = ['nome']
+        indexes = [
+            # Listagem paginada por (nome, id)
+            models.Index(fields=['nome', 'id'], name='veiculos_cli_nome_idx'),
+        ]
+
+    CAMPOS_BUSCA = ('nome', 'cpf', 'telefone')
 
     def __str__(self):
         return self.nome
 
 
+class VeiculoQuerySet(models.QuerySet):
+    """Cálculos financeiros dos veículos feitos direto no banco"""
+
+    def com_financeiro(self):
+        """
+        Anota valor_despesas, valor_lucro_previsto e valor_lucro_real.
+        O lucro real segue a mesma regra de Veiculo.lucro_real(): só existe
+        para veículos vendidos e vale 0 se a venda não for encontrada.
+        """
+        return self.annotate(
+            valor_despesas=F('total_despesas'),
+            valor_lucro_previsto=models.ExpressionWrapper(
+                F('valor_venda') - F('valor_compra') - F('total_despesas'),
+                output_field=VALOR_FIELD,
+            ),
+            valor_lucro_real=Case(
+                When(status='vendido', then=Coalesce(
+                    F('venda__valor_venda') - F('valor_compra') - F('total_despesas'),
+                    Value(Decimal('0.00')),
+                    output_field=VALOR_FIELD,
+                )),
+                default=None,
+                output_field=VALOR_FIELD,
+            ),
+        )
+
+    def recalcular_despesas(self):
+        """
+        Recalcula total_despesas/qtd_despesas a partir da tabela de despesas.
+        Usado após operações em massa e pelo comando recalcular_despesas.
+        """
+        despesas = Despesa.objects.filter(
+            veiculo=OuterRef('pk')
+        ).order_by().values('veiculo')
+
+        linhas = self.update(
+            total_despesas=Coalesce(
+                Subquery(
+                    despesas.annotate(total=Sum('valor')).values('total'),
+                    output_field=VALOR_FIELD,
+                ),
+                Value(Decimal('0.00')),
+                output_field=VALOR_FIELD,
+            ),
+            qtd_despesas=Coalesce(
+                Subquery(
+                    despesas.annotate(qtd=Count('pk')).values('qtd'),
+                    output_field=models.IntegerField(),
+                ),
+                Value(0),
+            ),
+            atualizado_em=timezone.now(),
+        )
+        invalidar_cache()
+        return linhas
+
+    def tocar(self):
+        """Nova versão (atualizado_em) para os veículos, ex. quando as imagens mudam"""
+        return self.update(atualizado_em=timezone.now())
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        # Sem sinais: faz o que veiculo_salvo e dados_alterados fariam
+        agora = timezone.now()
+        for obj in objs:
+            obj.atualizado_em = agora
+        fields = [campo for campo in fields if campo != 'atualizado_em'] + ['atualizado_em']
+        with transaction.atomic(using=self.db):
+            rows = super().bulk_update(objs, fields, *args, **kwargs)
+            invalidar_cache()
+            marcar_resumo(veiculos=[obj.pk for obj in objs])
+        return rows
+
+    def com_imagem_principal(self):
+        """
+        Carrega a imagem principal de todos os veículos em uma única query
+        extra (prefetch com ROW_NUMBER), usada por Veiculo.imagem_principal().
+        """
+        return self.prefetch_related(Prefetch(
+            'imagens',
+            queryset=VeiculoImagem.objects.order_by('-principal', 'ordem', '-data_upload')[:1],
+            to_attr='imagens_principais',
+        ))
+
+    def lucro_total(self):
+        """Soma do lucro real dos veículos do queryset em uma única query"""
+        return self.com_financeiro().aggregate(
+            total=Sum('valor_lucro_real')
+        )['total'] or Decimal('0.00')
+
+
 class Veiculo(models.Model):
     """Veículo para compra/venda"""
     STATUS_CHOICES = [
@@ -47,6 +162,8 @@ class Veiculo(models.Model):
         ('vendido', 'Vendido'),
         ('manutencao', 'Em Manutenção'),
     ]
+    CAMPOS_TOTAIS = ('total_despesas', 'qtd_despesas')
+    CAMPOS_BUSCA = ('marca', 'modelo', 'placa', 'ano')
 
     marca = models.CharField(max_length=100, verbose_name='Marca')
     modelo = models.CharField(max_length=100, verbose_name='Modelo')
@@ -88,24 +205,61 @@ class Veiculo(models.Model):
     observacoes = models.TextField(blank=True, verbose_name='Observações')
     data_compra = models.DateField(verbose_name='Data de Compra')
     data_cadastro = models.DateTimeField(auto_now_add=True, verbose_name='Data de Cadastro')
+    # Versão da linha: auto_now no save() e atualizado à mão nos update();
+    # inclui as imagens (veja VeiculoQuerySet.tocar)
+    atualizado_em = models.DateTimeField(auto_now=True, db_index=True, verbose_name='Atualizado em')
+
+    # Totais desnormalizados, mantidos por Despesa.save()/delete() e DespesaQuerySet
+    total_despesas = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        editable=False,
+        db_index=True,
+        verbose_name='Total de Despesas'
+    )
+    qtd_despesas = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Quantidade de Despesas'
+    )
+
+    objects = VeiculoQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Veículo'
         verbose_name_plural = 'Veículos'
         ordering = ['-data_cadastro']
+        indexes = [
+            # Listagem paginada por (-data_cadastro, -id), com ou sem filtro de status
+            models.Index(fields=['-data_cadastro', '-id'], name='veiculos_veic_cadastro_idx'),
+            models.Index(fields=['status', '-data_cadastro', '-id'], name='veiculos_veic_status_cad_idx'),
+            # Estoque (dashboard, venda): só os disponíveis, bem menos linhas
+            models.Index(
+                fields=['-data_cadastro', '-id'],
+                condition=models.Q(status='disponivel'),
+                name='veiculos_veic_disponivel_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.marca} {self.modelo} - {self.ano} ({self.placa})"
 
-    def total_despesas(self):
-        """Calcula o total de despesas do veículo"""
-        return self.despesas.aggregate(
-            total=models.Sum('valor')
-        )['total'] or Decimal('0.00')
+    def save(self, *args, **kwargs):
+        """
+        Em atualizações não regrava total_despesas/qtd_despesas, para não
+        sobrescrever com valores desatualizados os totais mantidos por Despesa.
+        """
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.CAMPOS_TOTAIS
+            ]
+        super().save(*args, **kwargs)
 
     def lucro_previsto(self):
         """Calcula o lucro previsto (venda - compra - despesas)"""
-        return self.valor_venda - self.valor_compra - self.total_despesas()
+        return self.valor_venda - self.valor_compra - self.total_despesas
 
     def lucro_real(self):
         """Calcula o lucro real se o veículo foi vendido"""
@@ -114,17 +268,17 @@ class Veiculo(models.Model):
                 venda = self.venda
                 # Lucro = Valor de venda - Valor de compra - Despesas
                 # O valor de entrada (troca) NÃO entra no cálculo
-                return venda.valor_venda - self.valor_compra - self.total_despesas()
+                return venda.valor_venda - self.valor_compra - self.total_despesas
             except:
                 return Decimal('0.00')
         return None
 
     def imagem_principal(self):
         """Retorna a imagem principal ou a primeira imagem"""
-        img = self.imagens.filter(principal=True).first()
-        if not img:
-            img = self.imagens.first()
-        return img
+        if hasattr(self, 'imagens_principais'):
+            return self.imagens_principais[0] if self.imagens_principais else None
+        # A ordenação padrão já coloca a principal na frente
+        return self.imagens.order_by('-principal', 'ordem', '-data_upload').first()
 
 
 class TipoDespesa(models.Model):
@@ -132,6 +286,7 @@ class TipoDespesa(models.Model):
     nome = models.CharField(max_length=100, unique=True, verbose_name='Nome')
     descricao = models.TextField(blank=True, verbose_name='Descrição')
     ativo = models.BooleanField(default=True, verbose_name='Ativo')
+    atualizado_em = models.DateTimeField(auto_now=True, db_index=True, verbose_name='Atualizado em')
 
     class Meta:
         verbose_name = 'Tipo de Despesa'
@@ -142,6 +297,78 @@ class TipoDespesa(models.Model):
         return self.nome
 
 
+class DespesaQuerySet(models.QuerySet):
+    """Operações em massa que mantêm os totais de despesas dos veículos"""
+
+    def _recalcular_veiculos(self, veiculo_ids):
+        if veiculo_ids:
+            Veiculo.objects.filter(pk__in=set(veiculo_ids)).recalcular_despesas()
+
+    def bulk_create(self, objs, *args, **kwargs):
+        with transaction.atomic(using=self.db):
+            objs = super().bulk_create(objs, *args, **kwargs)
+            self._recalcular_veiculos(obj.veiculo_id for obj in objs)
+            invalidar_cache()
+            marcar_resumo(
+                datas=[obj.data_despesa for obj in objs],
+                veiculos=[obj.veiculo_id for obj in objs],
+            )
+        return objs
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        # auto_now não vale para bulk_update
+        agora = timezone.now()
+        for obj in objs:
+            obj.atualizado_em = agora
+        fields = [campo for campo in fields if campo != 'atualizado_em'] + ['atualizado_em']
+        with transaction.atomic(using=self.db):
+            ids = {obj.pk for obj in objs}
+            anteriores = list(
+                self.model.objects.filter(pk__in=ids).values_list('veiculo_id', 'data_despesa')
+            )
+            veiculo_ids = {veiculo_id for veiculo_id, _ in anteriores}
+            rows = super().bulk_update(objs, fields, *args, **kwargs)
+            if 'valor' in fields or 'veiculo' in fields:
+                veiculo_ids.update(obj.veiculo_id for obj in objs)
+                self._recalcular_veiculos(veiculo_ids)
+            invalidar_cache()
+            marcar_resumo(
+                datas=[data for _, data in anteriores] + [obj.data_despesa for obj in objs],
+                veiculos=veiculo_ids | {obj.veiculo_id for obj in objs},
+            )
+        return rows
+
+    def update(self, **kwargs):
+        kwargs.setdefault('atualizado_em', timezone.now())
+        with transaction.atomic(using=self.db):
+            anteriores = list(self.values_list('veiculo_id', 'data_despesa'))
+            veiculo_ids = {veiculo_id for veiculo_id, _ in anteriores}
+            rows = super().update(**kwargs)
+            novo = kwargs.get('veiculo', kwargs.get('veiculo_id'))
+            if novo is not None:
+                veiculo_ids.add(getattr(novo, 'pk', novo))
+            if 'valor' in kwargs or novo is not None:
+                self._recalcular_veiculos(veiculo_ids)
+            invalidar_cache()
+            marcar_resumo(
+                datas=[data for _, data in anteriores] + [kwargs.get('data_despesa')],
+                veiculos=veiculo_ids,
+            )
+        return rows
+
+    update.alters_data = True
+
+    def delete(self):
+        with transaction.atomic(using=self.db):
+            veiculo_ids = set(self.values_list('veiculo_id', flat=True))
+            resultado = super().delete()
+            self._recalcular_veiculos(veiculo_ids)
+        return resultado
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+
 class Despesa(models.Model):
     """Despesas relacionadas a um veículo"""
     veiculo = models.ForeignKey(
@@ -171,15 +398,64 @@ class Despesa(models.Model):
     descricao = models.TextField(verbose_name='Descrição')
     data_despesa = models.DateField(verbose_name='Data da Despesa')
     data_cadastro = models.DateTimeField(auto_now_add=True, verbose_name='Data de Cadastro')
+    atualizado_em = models.DateTimeField(auto_now=True, db_index=True, verbose_name='Atualizado em')
+
+    objects = DespesaQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Despesa'
         verbose_name_plural = 'Despesas'
         ordering = ['-data_despesa']
+        indexes = [
+            # Somas por período sem ler a tabela (INCLUDE só no PostgreSQL)
+            models.Index(
+                fields=['data_despesa'],
+                include=['valor', 'veiculo'],
+                name='veiculos_desp_data_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.tipo.nome} - R$ {self.valor} ({self.veiculo})"
 
+    @staticmethod
+    def _ajustar_totais(veiculo_id, valor, qtd):
+        Veiculo.objects.filter(pk=veiculo_id).update(
+            total_despesas=F('total_despesas') + valor,
+            qtd_despesas=F('qtd_despesas') + qtd,
+            atualizado_em=timezone.now(),
+        )
+
+    def save(self, *args, **kwargs):
+        """Ao salvar, atualiza incrementalmente os totais do(s) veículo(s)"""
+        with transaction.atomic():
+            anterior = None
+            if self.pk:
+                anterior = Despesa.objects.select_for_update().filter(
+                    pk=self.pk
+                ).values('veiculo_id', 'valor').first()
+
+            super().save(*args, **kwargs)
+
+            if anterior and anterior['veiculo_id'] == self.veiculo_id:
+                self._ajustar_totais(self.veiculo_id, self.valor - anterior['valor'], 0)
+            else:
+                # Despesa nova ou movida para outro veículo
+                if anterior:
+                    self._ajustar_totais(anterior['veiculo_id'], -anterior['valor'], -1)
+                self._ajustar_totais(self.veiculo_id, self.valor, 1)
+
+    def delete(self, *args, **kwargs):
+        """Ao deletar, desconta a despesa do total do veículo"""
+        with transaction.atomic():
+            anterior = Despesa.objects.select_for_update().filter(
+                pk=self.pk
+            ).values('veiculo_id', 'valor').first()
+            resultado = super().delete(*args, **kwargs)
+            if anterior:
+                self._ajustar_totais(anterior['veiculo_id'], -anterior['valor'], -1)
+        return resultado
+
 
 class FormaPagamento(models.Model):
     """Formas de pagamento aceitas"""
@@ -195,6 +471,14 @@ class FormaPagamento(models.Model):
         return self.nome
 
 
+class VendaConflito(Exception):
+    """A venda não pode ser gravada porque outra venda usou o mesmo veículo"""
+
+    def __init__(self, mensagem, campo=None):
+        super().__init__(mensagem)
+        self.campo = campo
+
+
 class Venda(models.Model):
     """Venda de um veículo"""
     veiculo = models.OneToOneField(
@@ -242,11 +526,22 @@ class Venda(models.Model):
     observacoes = models.TextField(blank=True, verbose_name='Observações')
     data_venda = models.DateField(verbose_name='Data da Venda')
     data_cadastro = models.DateTimeField(auto_now_add=True, verbose_name='Data de Cadastro')
+    atualizado_em = models.DateTimeField(auto_now=True, db_index=True, verbose_name='Atualizado em')
 
     class Meta:
         verbose_name = 'Venda'
         verbose_name_plural = 'Vendas'
         ordering = ['-data_venda']
+        indexes = [
+            # Listagem paginada por (-data_venda, -id)
+            models.Index(fields=['-data_venda', '-id'], name='veiculos_venda_data_idx'),
+            # Somas por período sem ler a tabela (INCLUDE só no PostgreSQL)
+            models.Index(
+                fields=['data_venda'],
+                include=['valor_venda', 'valor_entrada', 'veiculo'],
+                name='veiculos_venda_periodo_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"Venda {self.veiculo} para {self.cliente}"
@@ -257,22 +552,65 @@ class Venda(models.Model):
         return self.valor_venda - self.valor_entrada
 
     def save(self, *args, **kwargs):
-        """Ao salvar, marca o veículo como vendido"""
-        super().save(*args, **kwargs)
-        self.veiculo.status = 'vendido'
-        self.veiculo.save()
+        """
+        Ao salvar, marca o veículo como vendido. Venda nova trava antes as
+        linhas do veículo e do veículo de entrada (select_for_update), então
+        duas vendas simultâneas do mesmo carro não passam as duas: a segunda
+        recebe VendaConflito.
+        """
+        with transaction.atomic():
+            if self._state.adding:
+                self._travar_veiculos()
+            try:
+                with transaction.atomic():
+                    super().save(*args, **kwargs)
+            except IntegrityError:
+                # Bancos sem SELECT ... FOR UPDATE (SQLite): o OneToOne barra
+                if Venda.objects.filter(veiculo_id=self.veiculo_id).exclude(pk=self.pk).exists():
+                    raise VendaConflito('Este veículo já foi vendido!')
+                raise
+            # Só o status, sem reescrever as outras colunas do veículo; o
+            # resumo do dia e o cache já são atualizados pelo post_save da venda
+            Veiculo.objects.filter(pk=self.veiculo_id).exclude(status='vendido').update(
+                status='vendido', atualizado_em=timezone.now()
+            )
+        if Venda.veiculo.is_cached(self):
+            self.veiculo.status = 'vendido'
+
+    def _travar_veiculos(self):
+        """Trava veículo e entrada (em ordem de pk, sem deadlock) e confere se ainda estão livres"""
+        ids = {self.veiculo_id, self.veiculo_entrada_id} - {None}
+        status = dict(
+            Veiculo.objects.select_for_update().filter(pk__in=ids).order_by('pk').values_list('pk', 'status')
+        )
+        if status.get(self.veiculo_id) == 'vendido' or Venda.objects.filter(veiculo_id=self.veiculo_id).exists():
+            raise VendaConflito('Este veículo já foi vendido!')
+        if self.veiculo_entrada_id and status.get(self.veiculo_entrada_id) != 'disponivel':
+            raise VendaConflito(
+                'O veículo de entrada não está mais disponível.', campo='veiculo_entrada'
+            )
 
 
 class VeiculoImagem(models.Model):
     """Imagens de um veículo"""
+    PROCESSAMENTO_CHOICES = [
+        ('pendente', 'Pendente'),
+        ('processando', 'Processando'),
+        ('concluido', 'Concluído'),
+        ('erro', 'Erro'),
+    ]
+
     veiculo = models.ForeignKey(
         Veiculo, 
         on_delete=models.CASCADE, 
         related_name='imagens',
         verbose_name='Veículo'
     )
+    # Com o ArmazenamentoConteudo, o nome final é o hash do conteúdo e
+    # imagens com o mesmo nome compartilham o arquivo (veja liberar_arquivos)
     imagem = models.ImageField(
         upload_to='veiculos/%Y/%m/',
+        db_index=True,
         verbose_name='Imagem'
     )
     descricao = models.CharField(
@@ -292,6 +630,27 @@ class VeiculoImagem(models.Model):
         auto_now_add=True, 
         verbose_name='Data do Upload'
     )
+    # Versões reduzidas geradas por veiculos.imagens.gerar_derivados()
+    derivados = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name='Versões Reduzidas'
+    )
+    processamento = models.CharField(
+        max_length=20,
+        choices=PROCESSAMENTO_CHOICES,
+        default='pendente',
+        editable=False,
+        verbose_name='Processamento'
+    )
+    sha256 = models.CharField(
+        max_length=64,
+        blank=True,
+        editable=False,
+        db_index=True,
+        verbose_name='Hash SHA-256'
+    )
 
     class Meta:
         verbose_name = 'Imagem do Veículo'
@@ -308,4 +667,241 @@ class VeiculoImagem(models.Model):
                 veiculo=self.veiculo, 
                 principal=True
             ).update(principal=False)
+        arquivo_novo = bool(self.imagem) and not self.imagem._committed
+        if arquivo_novo:
+            self.processamento = 'pendente'
         super().save(*args, **kwargs)
+        if arquivo_novo:
+            # Derivados e hash são gerados pelo worker (processar_tarefas)
+            Tarefa.enfileirar_imagens([self])
+
+    @property
+    def processada(self):
+        return self.processamento == 'concluido'
+
+    def gerar_derivados(self):
+        """
+        Gera thumb/card/full em WebP e JPEG e grava os caminhos em derivados.
+        As imagens com o mesmo arquivo (reenvios da mesma foto) compartilham
+        os derivados e são atualizadas juntas.
+        """
+        mesmo_arquivo = VeiculoImagem.objects.filter(imagem=self.imagem.name)
+        antigos = [self.derivados, *mesmo_arquivo.exclude(pk=self.pk).values_list('derivados', flat=True)]
+        self.derivados = gerar_derivados(self.imagem.name, self.imagem.storage)
+        self.processamento = 'concluido'
+        veiculo_ids = list(mesmo_arquivo.values_list('veiculo_id', flat=True).distinct())
+        mesmo_arquivo.update(derivados=self.derivados, processamento=self.processamento)
+        Veiculo.objects.filter(pk__in=veiculo_ids).tocar()
+        invalidar_cache()
+        # Nomes iguais são sobrescritos; remove só os que mudaram de caminho
+        novos = {c for v in self.derivados.values() for c in v.values() if isinstance(c, str)}
+        for derivados in antigos:
+            remover_derivados({
+                tamanho: {f: c for f, c in versoes.items() if c not in novos}
+                for tamanho, versoes in derivados.items()
+            }, self.imagem.storage)
+
+    @classmethod
+    def liberar_arquivos(cls, nome, derivados, storage):
+        """
+        Apaga o arquivo e os derivados de uma imagem removida se nenhuma
+        outra VeiculoImagem usa o mesmo arquivo. Arquivos reenviados há pouco
+        (armazenamento.CARENCIA) ficam para o comando coletar_arquivos_orfaos.
+        """
+        if not nome or cls.objects.filter(imagem=nome).exists():
+            return
+        recente = getattr(storage, 'recente', None)
+        if recente and recente(nome):
+            return
+        storage.delete(nome)
+        remover_derivados(derivados, storage)
+
+    def _versao(self, tamanho):
+        """
+        URLs de um derivado para o template. Enquanto o worker não gera os
+        derivados, o original é reduzido sob demanda (WebP ou JPEG conforme
+        o navegador), em vez de servir a foto inteira
+        """
+        versao = self.derivados.get(tamanho)
+        if not versao:
+            lado = TAMANHOS[tamanho]
+            url = url_redimensionada(self.imagem.name, lado, lado)
+            return {'webp': None, 'jpeg': url, 'largura': None, 'altura': None}
+        storage = self.imagem.storage
+        return {
+            'webp': storage.url(versao['webp']),
+            'jpeg': storage.url(versao['jpeg']),
+            'largura': versao['largura'],
+            'altura': versao['altura'],
+        }
+
+    @property
+    def thumb(self):
+        return self._versao('thumb')
+
+    @property
+    def card(self):
+        return self._versao('card')
+
+    @property
+    def full(self):
+        return self._versao('full')
+
+
+class Tarefa(models.Model):
+    """Fila de tarefas em segundo plano, consumida pelo comando processar_tarefas"""
+    PROCESSAR_IMAGEM = 'processar_imagem'
+    TIPO_CHOICES = [
+        (PROCESSAR_IMAGEM, 'Processar imagem'),
+    ]
+    STATUS_CHOICES = [
+        ('pendente', 'Pendente'),
+        ('processando', 'Processando'),
+        ('concluida', 'Concluída'),
+        ('erro', 'Erro'),
+    ]
+
+    tipo = models.CharField(max_length=50, choices=TIPO_CHOICES, verbose_name='Tipo')
+    parametros = models.JSONField(default=dict, blank=True, verbose_name='Parâmetros')
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='pendente',
+        verbose_name='Status'
+    )
+    tentativas = models.PositiveSmallIntegerField(default=0, verbose_name='Tentativas')
+    erro = models.TextField(blank=True, verbose_name='Último Erro')
+    criada_em = models.DateTimeField(auto_now_add=True, verbose_name='Criada em')
+    iniciada_em = models.DateTimeField(null=True, blank=True, verbose_name='Iniciada em')
+    concluida_em = models.DateTimeField(null=True, blank=True, verbose_name='Concluída em')
+
+    class Meta:
+        verbose_name = 'Tarefa'
+        verbose_name_plural = 'Tarefas'
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'id'], name='veiculos_tarefa_fila_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} #{self.pk} ({self.get_status_display()})"
+
+    @classmethod
+    def enfileirar_imagens(cls, imagens):
+        """Cria, em um único INSERT, uma tarefa de processamento por imagem"""
+        return cls.objects.bulk_create([
+            cls(tipo=cls.PROCESSAR_IMAGEM, parametros={'imagem_id': imagem.pk})
+            for imagem in imagens
+        ])
+
+
+class ResumoDiario(models.Model):
+    """
+    Totais financeiros por dia, mantidos por veiculos.signals e usados pelo
+    dashboard. Pode ser reconstruído com o comando recalcular_resumo.
+    """
+    data = models.DateField(unique=True, verbose_name='Data')
+    qtd_vendas = models.PositiveIntegerField(default=0, verbose_name='Quantidade de Vendas')
+    total_vendas = models.DecimalField(
+        max_digits=14, decimal_places=2, default=Decimal('0.00'), verbose_name='Total de Vendas'
+    )
+    total_entradas = models.DecimalField(
+        max_digits=14, decimal_places=2, default=Decimal('0.00'), verbose_name='Total de Entradas'
+    )
+    total_despesas = models.DecimalField(
+        max_digits=14, decimal_places=2, default=Decimal('0.00'), verbose_name='Total de Despesas'
+    )
+    # Lucro real dos veículos vendidos no dia (mesma regra de Veiculo.lucro_real)
+    lucro = models.DecimalField(
+        max_digits=14, decimal_places=2, default=Decimal('0.00'), verbose_name='Lucro'
+    )
+    atualizado_em = models.DateTimeField(auto_now=True, verbose_name='Atualizado em')
+
+    CAMPOS_TOTAIS = ('qtd_vendas', 'total_vendas', 'total_entradas', 'total_despesas', 'lucro')
+
+    class Meta:
+        verbose_name = 'Resumo Diário'
+        verbose_name_plural = 'Resumos Diários'
+        ordering = ['-data']
+
+    def __str__(self):
+        return f"Resumo de {self.data:%d/%m/%Y}"
+
+    @classmethod
+    def calcular(cls, datas=None):
+        """
+        Calcula os totais direto das tabelas de vendas e despesas, agrupados
+        por dia. Sem `datas`, calcula todos os dias.
+        """
+        vendas = Venda.objects.order_by()
+        despesas = Despesa.objects.order_by()
+        if datas is not None:
+            vendas = vendas.filter(data_venda__in=datas)
+            despesas = despesas.filter(data_despesa__in=datas)
+
+        resumos = {}
+        for linha in vendas.values('data_venda').annotate(
+            qtd=Count('id'),
+            vendas=Sum('valor_venda'),
+            entradas=Sum('valor_entrada'),
+            lucro=Sum(Case(
+                When(
+                    veiculo__status='vendido',
+                    then=F('valor_venda') - F('veiculo__valor_compra') - F('veiculo__total_despesas'),
+                ),
+                default=Value(Decimal('0.00')),
+                output_field=VALOR_FIELD,
+            )),
+        ):
+            resumo = resumos.setdefault(linha['data_venda'], cls(data=linha['data_venda']))
+            resumo.qtd_vendas = linha['qtd']
+            resumo.total_vendas = linha['vendas'] or Decimal('0.00')
+            resumo.total_entradas = linha['entradas'] or Decimal('0.00')
+            resumo.lucro = linha['lucro'] or Decimal('0.00')
+
+        for linha in despesas.values('data_despesa').annotate(total=Sum('valor')):
+            resumo = resumos.setdefault(linha['data_despesa'], cls(data=linha['data_despesa']))
+            resumo.total_despesas = linha['total'] or Decimal('0.00')
+
+        return resumos
+
+    @classmethod
+    def recalcular(cls, datas):
+        """
+        Recalcula e grava (upsert) os dias informados.
+
+        O cálculo é feito com as linhas dos dias travadas (select_for_update),
+        então dois commits concorrentes que recalculam o mesmo dia se
+        enfileiram: quem trava por último lê os dados de ambos e o resultado
+        de um snapshot mais antigo nunca sobrescreve o mais novo.
+        """
+        datas = sorted(set(datas))
+        if not datas:
+            return
+        with transaction.atomic():
+            # Dias ainda sem linha ganham uma, para que também possam ser travados
+            cls.objects.bulk_create([cls(data=data) for data in datas], ignore_conflicts=True)
+            list(cls.objects.select_for_update().filter(data__in=datas).order_by('data').values_list('pk'))
+            resumos = cls.calcular(datas)
+            # Dias que ficaram sem movimento
+            cls.objects.filter(data__in=set(datas) - set(resumos)).delete()
+            cls.objects.bulk_create(
+                resumos.values(),
+                update_conflicts=True,
+                unique_fields=['data'],
+                update_fields=list(cls.CAMPOS_TOTAIS) + ['atualizado_em'],
+            )
+
+    @classmethod
+    def totais(cls, data_inicio=None, data_fim=None):
+        """Soma os resumos do período (uma linha por dia)"""
+        resumos = cls.objects.all()
+        if data_inicio:
+            resumos = resumos.filter(data__gte=data_inicio)
+        if data_fim:
+            resumos = resumos.filter(data__lte=data_fim)
+        totais = resumos.aggregate(*[Sum(campo) for campo in cls.CAMPOS_TOTAIS])
+        return {
+            campo: totais[f'{campo}__sum'] or (0 if campo == 'qtd_vendas' else Decimal('0.00'))
+            for campo in cls.CAMPOS_TOTAIS
+        }
@@ -0,0 +1,150 @@
+"""
+Paginação por cursor (keyset) para as listagens.
+
+Em vez de OFFSET, cada página continua a partir dos valores de ordenação da
+última linha exibida, então a página 500 custa o mesmo que a primeira. O
+cursor é opaco para o usuário: base64 de um JSON com a direção e os valores.
+"""
+import base64
+import binascii
+import json
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+POR_PAGINA = 25
+
+
+class CursorInvalido(ValueError):
+    pass
+
+
+class PaginaKeyset:
+    """Uma página de resultados com os cursores para a próxima e a anterior"""
+
+    def __init__(self, itens, proximo_cursor=None, cursor_anterior=None):
+        self.itens = itens
+        self.proximo_cursor = proximo_cursor
+        self.cursor_anterior = cursor_anterior
+
+    def __iter__(self):
+        return iter(self.itens)
+
+    def __len__(self):
+        return len(self.itens)
+
+    def __bool__(self):
+        return bool(self.itens)
+
+    @property
+    def has_next(self):
+        return self.proximo_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.cursor_anterior is not None
+
+    @property
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+
+class KeysetPaginator:
+    """
+    Pagina um queryset pela ordenação informada, que deve terminar em um
+    campo único (normalmente 'id' ou '-id') para desempatar registros.
+    Campos anotados no queryset (ex.: `relevancia` da busca) também valem.
+
+        paginator = KeysetPaginator(Cliente.objects.all(), ('nome', 'id'))
+        pagina = paginator.get_page(request.GET.get('cursor'))
+    """
+
+    def __init__(self, queryset, ordenacao, por_pagina=POR_PAGINA):
+        self.queryset = queryset
+        self.ordenacao = tuple(ordenacao)
+        self.por_pagina = por_pagina
+        self.campos = [campo.lstrip('-') for campo in self.ordenacao]
+
+    def get_page(self, cursor=None):
+        """Retorna a página do cursor; cursores inválidos voltam ao início"""
+        try:
+            direcao, valores = self._decodificar(cursor) if cursor else ('>', None)
+        except CursorInvalido:
+            direcao, valores = '>', None
+
+        anterior = direcao == '<'
+        ordenacao = self._inverter(self.ordenacao) if anterior else self.ordenacao
+        queryset = self.queryset.order_by(*ordenacao)
+        if valores is not None:
+            queryset = queryset.filter(self._filtro_apos(ordenacao, valores))
+
+        itens = list(queryset[:self.por_pagina + 1])
+        tem_mais = len(itens) > self.por_pagina
+        itens = itens[:self.por_pagina]
+
+        if anterior:
+            itens.reverse()
+            tem_proxima = True
+            tem_anterior = tem_mais
+        else:
+            tem_proxima = tem_mais
+            tem_anterior = valores is not None
+
+        return PaginaKeyset(
+            itens,
+            proximo_cursor=self._codificar('>', itens[-1]) if tem_proxima and itens else None,
+            cursor_anterior=self._codificar('<', itens[0]) if tem_anterior and itens else None,
+        )
+
+    @staticmethod
+    def _inverter(ordenacao):
+        return tuple(campo[1:] if campo.startswith('-') else f'-{campo}' for campo in ordenacao)
+
+    def _filtro_apos(self, ordenacao, valores):
+        """
+        Monta (a > x) OR (a = x AND b > y) OR ... respeitando a direção de
+        cada campo, que é a forma expandida de uma comparação de tuplas.
+        """
+        condicoes = []
+        for i, campo in enumerate(ordenacao):
+            nome = campo.lstrip('-')
+            lookup = 'lt' if campo.startswith('-') else 'gt'
+            iguais = {self.campos[j]: valores[j] for j in range(i)}
+            condicoes.append(Q(**iguais, **{f'{nome}__{lookup}': valores[i]}))
+        return reduce(or_, condicoes)
+
+    def _codificar(self, direcao, obj):
+        valores = []
+        for campo in self.campos:
+            # Objetos do model ou dicionários de values() (API)
+            valor = obj[campo] if isinstance(obj, dict) else getattr(obj, campo)
+            valores.append(valor.isoformat() if hasattr(valor, 'isoformat') else valor)
+        dados = json.dumps([direcao, valores], default=str, separators=(',', ':'))
+        return base64.urlsafe_b64encode(dados.encode()).decode().rstrip('=')
+
+    def _decodificar(self, cursor):
+        try:
+            preenchimento = '=' * (-len(cursor) % 4)
+            direcao, valores = json.loads(base64.urlsafe_b64decode(cursor + preenchimento))
+        except (binascii.Error, ValueError, TypeError):
+            raise CursorInvalido(cursor)
+
+        if direcao not in ('>', '<') or not isinstance(valores, list) or len(valores) != len(self.campos):
+            raise CursorInvalido(cursor)
+
+        try:
+            return direcao, [
+                self._field(campo).to_python(valor)
+                for campo, valor in zip(self.campos, valores)
+            ]
+        except ValidationError:
+            raise CursorInvalido(cursor)
+
+    def _field(self, campo):
+        """Campo do model ou, para anotações como `relevancia`, seu output_field"""
+        anotacao = self.queryset.query.annotations.get(campo)
+        if anotacao is not None:
+            return anotacao.output_field
+        return self.queryset.model._meta.get_field(campo)
@@ -0,0 +1,45 @@
+"""
+Consultas concorrentes para as views async.
+
+Os métodos async do ORM (acount, aaggregate, ...) rodam todos na mesma
+thread (sync_to_async com thread_sensitive=True), então um asyncio.gather
+sobre eles ainda executa uma query de cada vez. Aqui cada consulta roda em
+uma thread do pool (thread_sensitive=False) e, como as conexões do Django
+são por thread, cada uma usa a sua própria conexão com o banco: o tempo
+total fica perto do da consulta mais lenta.
+
+As consultas não compartilham transação, então não enxergam um snapshot
+único do banco; serve para painéis e relatórios, não para escrita. Com
+CONN_MAX_AGE > 0 as threads do pool mantêm as conexões abertas entre as
+requisições; com o padrão (0) cada consulta abre e fecha a sua.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+
+from .middleware import medir_conexoes
+
+
+def _executar_em_thread(funcao):
+    close_old_connections()
+    try:
+        with medir_conexoes():
+            return funcao()
+    finally:
+        close_old_connections()
+
+
+async def executar(funcao):
+    """Executa funcao() (código síncrono do ORM) em uma thread com conexão própria"""
+    return await sync_to_async(_executar_em_thread, thread_sensitive=False)(funcao)
+
+
+async def em_paralelo(**consultas):
+    """
+    Executa as funções (sem argumentos) ao mesmo tempo e retorna
+    {nome: resultado}. As funções devem devolver valores já avaliados
+    (ex. list(queryset)), não QuerySets preguiçosos.
+    """
+    resultados = await asyncio.gather(*(executar(funcao) for funcao in consultas.values()))
+    return dict(zip(consultas, resultados))
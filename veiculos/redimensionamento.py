@@ -0,0 +1,321 @@
+"""
+Imagens redimensionadas sob demanda: /media/r/<largura>x<altura>/<caminho>?s=<assinatura>
+
+A URL é assinada (url_redimensionada), então só os tamanhos que o próprio
+sistema gerou são aceitos. A imagem é reduzida para caber no retângulo, sem
+ampliar, em WebP para os navegadores que aceitam e JPEG para os outros.
+As URLs são usadas pelo filtro |redimensionada (templatetags), pelo campo
+imagens da API e por VeiculoImagem.thumb/card/full enquanto os derivados
+não ficam prontos.
+
+Cada variante é gerada uma vez e guardada em um cache em disco
+(settings.VEICULOS_CACHE_IMAGENS_DIR) limitado a
+settings.VEICULOS_CACHE_IMAGENS_MB. A data de modificação dos arquivos do
+cache registra o último uso; quando o limite é ultrapassado, os menos usados
+são apagados até sobrar ESPACO_APOS_LIMPEZA do limite.
+
+Requisições simultâneas para a mesma variante geram a imagem uma vez só: as
+threads do processo esperam uma trava e os outros processos, um arquivo
+.lock criado com O_EXCL. O arquivo final é gravado em um temporário e
+renomeado, então nunca é servido pela metade.
+
+As respostas usam FileResponse, que o servidor WSGI (gunicorn, uWSGI) envia
+com sendfile, e aceitam Range. Com settings.VEICULOS_CACHE_IMAGENS_X_ACCEL
+(o prefixo de uma location internal do nginx apontando para o diretório do
+cache), o envio fica todo com o nginx via X-Accel-Redirect.
+"""
+import hashlib
+import os
+import re
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import PermissionDenied
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.crypto import constant_time_compare
+from django.utils.http import http_date
+from PIL import Image, UnidentifiedImageError
+
+from .imagens import FORMATOS, abrir_imagem, codificar
+
+LADO_MAXIMO = 2400
+CACHE_MB_PADRAO = 500
+ESPACO_APOS_LIMPEZA = 0.9
+# Uso registrado no máximo uma vez por intervalo (segundos), para não
+# escrever no disco a cada acerto
+INTERVALO_USO = 3600
+# Um .lock mais velho que isso é de um processo que morreu gerando a imagem
+TRAVA_EXPIRADA = 30
+MAX_AGE = 86400
+
+_signer = signing.Signer(salt='veiculos.redimensionamento')
+_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+_travas = {}
+_travas_lock = threading.Lock()
+_tamanho_estimado = None
+
+
+def diretorio_cache():
+    return str(getattr(settings, 'VEICULOS_CACHE_IMAGENS_DIR', settings.BASE_DIR / 'cache_imagens'))
+
+
+def _assinatura(largura, altura, caminho):
+    return _signer.signature(f'{largura}x{altura}/{caminho}')
+
+
+def url_redimensionada(caminho, largura, altura):
+    """URL assinada da imagem `caminho` (nome no storage) reduzida para largura x altura"""
+    url = reverse('imagem_redimensionada', kwargs={
+        'largura': largura, 'altura': altura, 'caminho': caminho,
+    })
+    return f'{url}?s={_assinatura(largura, altura, caminho)}'
+
+
+# ============= CACHE EM DISCO =============
+
+def _versao_origem(caminho, estado):
+    """
+    O que identifica o conteúdo do original. No ArmazenamentoConteudo é o
+    hash que está no próprio nome (reenviar a mesma foto renova a data do
+    arquivo, que só serve à coleta de órfãos); nos outros storages, a data
+    e o tamanho, para que um arquivo substituído gere outra variante.
+    """
+    hash_do_nome = getattr(default_storage, 'hash_do_nome', None)
+    sha256 = hash_do_nome(caminho) if hash_do_nome else None
+    if sha256:
+        return f'sha256:{sha256}', None
+    return f'{caminho}|{estado.st_mtime_ns}|{estado.st_size}', int(estado.st_mtime)
+
+
+def _caminho_cache(versao, largura, altura, formato):
+    chave = hashlib.sha256(f'{versao}|{largura}x{altura}|{formato}'.encode()).hexdigest()
+    extensao = FORMATOS[formato]['extensao']
+    return chave, os.path.join(diretorio_cache(), chave[:2], f'{chave}.{extensao}')
+
+
+def _gerar(origem, destino, largura, altura, formato):
+    with open(origem, 'rb') as arquivo:
+        imagem = abrir_imagem(arquivo)
+    imagem.thumbnail((largura, altura), Image.LANCZOS)
+    conteudo = codificar(imagem, formato)
+
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    fd, temporario = tempfile.mkstemp(dir=os.path.dirname(destino), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as saida:
+            saida.write(conteudo)
+        os.replace(temporario, destino)
+    except BaseException:
+        os.unlink(temporario)
+        raise
+    _registrar_gravacao(len(conteudo))
+
+
+def _esperar_outro_processo(trava, destino):
+    """True se outro processo gerou o arquivo; False se a trava ficou livre"""
+    while os.path.exists(trava):
+        if os.path.exists(destino):
+            return True
+        try:
+            if time.time() - os.stat(trava).st_mtime > TRAVA_EXPIRADA:
+                os.unlink(trava)
+                return False
+        except FileNotFoundError:
+            break
+        time.sleep(0.05)
+    return os.path.exists(destino)
+
+
+def _gerar_uma_vez(origem, destino, largura, altura, formato):
+    with _travas_lock:
+        trava_thread = _travas.setdefault(destino, threading.Lock())
+    try:
+        with trava_thread:
+            trava = f'{destino}.lock'
+            while not os.path.exists(destino):
+                os.makedirs(os.path.dirname(destino), exist_ok=True)
+                try:
+                    os.close(os.open(trava, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                except FileExistsError:
+                    _esperar_outro_processo(trava, destino)
+                    continue
+                try:
+                    if not os.path.exists(destino):
+                        _gerar(origem, destino, largura, altura, formato)
+                finally:
+                    os.unlink(trava)
+    finally:
+        with _travas_lock:
+            # Quem chegar depois encontra o arquivo pronto
+            _travas.pop(destino, None)
+
+
+def _registrar_uso(destino, estado):
+    if time.time() - estado.st_mtime > INTERVALO_USO:
+        try:
+            os.utime(destino)
+        except FileNotFoundError:
+            pass
+
+
+def _arquivos_cache():
+    for pasta in os.scandir(diretorio_cache()):
+        if not pasta.is_dir():
+            continue
+        for arquivo in os.scandir(pasta.path):
+            if arquivo.name.endswith(('.tmp', '.lock')):
+                continue
+            try:
+                estado = arquivo.stat()
+            except FileNotFoundError:
+                continue
+            yield arquivo.path, estado
+
+
+def _registrar_gravacao(tamanho):
+    """Soma o arquivo novo à estimativa e limpa o cache se passou do limite"""
+    global _tamanho_estimado
+    limite = getattr(settings, 'VEICULOS_CACHE_IMAGENS_MB', CACHE_MB_PADRAO) * 1024 * 1024
+    with _travas_lock:
+        if _tamanho_estimado is not None:
+            _tamanho_estimado += tamanho
+            if _tamanho_estimado <= limite:
+                return
+    # Primeira gravação do processo ou limite atingido: a varredura dá o
+    # tamanho real, que inclui o que os outros processos gravaram
+    total = limpar_cache(limite)
+    with _travas_lock:
+        _tamanho_estimado = total
+
+
+def limpar_cache(limite):
+    """Apaga os arquivos menos usados até o cache caber no limite. Retorna o tamanho final"""
+    arquivos = sorted(_arquivos_cache(), key=lambda item: item[1].st_mtime)
+    total = sum(estado.st_size for _, estado in arquivos)
+    if total <= limite:
+        return total
+    alvo = limite * ESPACO_APOS_LIMPEZA
+    for caminho, estado in arquivos:
+        if total <= alvo:
+            break
+        try:
+            os.unlink(caminho)
+        except FileNotFoundError:
+            pass
+        total -= estado.st_size
+    return total
+
+
+# ============= RESPOSTA =============
+
+class _Trecho:
+    """Lê só os `restante` bytes de um Range que não vai até o fim do arquivo"""
+
+    def __init__(self, arquivo, restante):
+        self.arquivo = arquivo
+        self.restante = restante
+
+    def read(self, tamanho=-1):
+        if tamanho < 0 or tamanho > self.restante:
+            tamanho = self.restante
+        dados = self.arquivo.read(tamanho)
+        self.restante -= len(dados)
+        return dados
+
+    def close(self):
+        self.arquivo.close()
+
+
+def _intervalo(cabecalho, tamanho):
+    """(início, fim) do Range pedido, None sem Range ou com um inválido/múltiplo"""
+    match = _RANGE.match(cabecalho or '')
+    if not match or match.groups() == ('', ''):
+        return None
+    inicio, fim = match.groups()
+    if inicio == '':
+        # bytes=-500: os últimos 500 bytes
+        return max(0, tamanho - int(fim)), tamanho - 1
+    fim = min(int(fim), tamanho - 1) if fim else tamanho - 1
+    return int(inicio), fim
+
+
+def _servir(request, destino, tipo, etag, estado):
+    x_accel = getattr(settings, 'VEICULOS_CACHE_IMAGENS_X_ACCEL', None)
+    if x_accel:
+        # O nginx cuida do envio e do Range
+        response = HttpResponse(content_type=tipo)
+        relativo = os.path.relpath(destino, diretorio_cache()).replace(os.sep, '/')
+        response['X-Accel-Redirect'] = f"{x_accel.rstrip('/')}/{relativo}"
+        return response
+
+    tamanho = estado.st_size
+    arquivo = open(destino, 'rb')
+    intervalo = _intervalo(request.headers.get('Range'), tamanho) if request.method == 'GET' else None
+    if request.headers.get('If-Range', etag) != etag:
+        intervalo = None
+
+    if intervalo is None:
+        response = FileResponse(arquivo, content_type=tipo)
+    else:
+        inicio, fim = intervalo
+        if inicio >= tamanho or inicio > fim:
+            arquivo.close()
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{tamanho}'
+            return response
+        arquivo.seek(inicio)
+        corpo = arquivo if fim == tamanho - 1 else _Trecho(arquivo, fim - inicio + 1)
+        response = FileResponse(corpo, status=206, content_type=tipo)
+        response['Content-Length'] = fim - inicio + 1
+        response['Content-Range'] = f'bytes {inicio}-{fim}/{tamanho}'
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def imagem_redimensionada(request, largura, altura, caminho):
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponse(status=405, headers={'Allow': 'GET, HEAD'})
+    if not constant_time_compare(request.GET.get('s', ''), _assinatura(largura, altura, caminho)):
+        raise PermissionDenied
+    maximo = getattr(settings, 'VEICULOS_REDIMENSIONAR_MAXIMO', LADO_MAXIMO)
+    if not (0 < largura <= maximo and 0 < altura <= maximo):
+        raise Http404
+
+    try:
+        origem = default_storage.path(caminho)
+        estado_origem = os.stat(origem)
+    except (FileNotFoundError, NotImplementedError):
+        raise Http404
+
+    formato = 'webp' if 'image/webp' in request.headers.get('Accept', '') else 'jpeg'
+    # Sem data (None) quando a versão é o hash: só o ETag valida
+    versao, ultima_alteracao = _versao_origem(caminho, estado_origem)
+    chave, destino = _caminho_cache(versao, largura, altura, formato)
+    etag = f'"{chave[:32]}"'
+
+    response = get_conditional_response(request, etag=etag, last_modified=ultima_alteracao)
+    if response is None:
+        try:
+            estado = os.stat(destino)
+            _registrar_uso(destino, estado)
+        except FileNotFoundError:
+            try:
+                _gerar_uma_vez(origem, destino, largura, altura, formato)
+            except (UnidentifiedImageError, Image.DecompressionBombError):
+                raise Http404
+            estado = os.stat(destino)
+        response = _servir(request, destino, f'image/{formato}', etag, estado)
+
+    response['ETag'] = etag
+    if ultima_alteracao is not None:
+        response['Last-Modified'] = http_date(ultima_alteracao)
+    patch_cache_control(response, public=True, max_age=MAX_AGE)
+    patch_vary_headers(response, ['Accept'])
+    return response
@@ -0,0 +1,79 @@
+"""
+Atualização incremental de ResumoDiario.
+
+As alterações marcam os dias (e veículos, cujo dia de venda é resolvido
+depois) afetados; no commit da transação cada dia marcado é recalculado uma
+única vez, mesmo que várias despesas do mesmo dia tenham mudado. O
+recálculo trava as linhas dos dias (ResumoDiario.recalcular), então commits
+concorrentes não sobrescrevem um ao outro com totais antigos.
+
+As marcações ficam no próprio callback de on_commit (Recalculo), um por
+bloco atomic: se o bloco é desfeito, o Django descarta o callback junto e
+nada do que foi marcado nele é recalculado depois. Os Recalculos de uma
+transação compartilham o que já foi feito no commit, então um dia marcado
+em vários blocos é recalculado uma vez só.
+"""
+from django.db import models, transaction
+
+_to_date = models.DateField().to_python
+
+
+class Recalculo:
+    """Callback de on_commit com os dias e veículos marcados em um bloco atomic"""
+
+    def __init__(self, feitos):
+        self.datas = set()
+        self.veiculos = set()
+        # Compartilhado pelos Recalculos da transação
+        self.feitos = feitos
+
+    def __call__(self):
+        from .models import ResumoDiario, Venda
+
+        veiculos = self.veiculos - self.feitos['veiculos']
+        self.feitos['veiculos'] |= veiculos
+        datas = set(self.datas)
+        if veiculos:
+            datas |= set(
+                Venda.objects.filter(veiculo_id__in=veiculos).values_list('data_venda', flat=True)
+            )
+        datas -= self.feitos['datas']
+        self.feitos['datas'] |= datas
+        ResumoDiario.recalcular(datas)
+
+
+def _recalculo_do_bloco(conexao):
+    """
+    O Recalculo do bloco atomic atual e o registro compartilhado da transação.
+
+    Serve o Recalculo descartado junto com qualquer savepoint ainda aberto; os
+    outros ids do conjunto são de savepoints já liberados (como o do próprio
+    save()), que não podem mais ser desfeitos.
+    """
+    if not conexao.in_atomic_block:
+        return None, {'datas': set(), 'veiculos': set()}
+    abertos = set(conexao.savepoint_ids)
+    recalculos = [
+        (savepoints, callback)
+        for savepoints, callback, _ in conexao.run_on_commit
+        if isinstance(callback, Recalculo)
+    ]
+    if not recalculos:
+        return None, {'datas': set(), 'veiculos': set()}
+    for savepoints, callback in recalculos:
+        if abertos <= savepoints:
+            return callback, callback.feitos
+    return None, recalculos[0][1].feitos
+
+
+def marcar_resumo(datas=(), veiculos=()):
+    """Agenda o recálculo dos dias e dos dias de venda dos veículos informados"""
+    recalculo, feitos = _recalculo_do_bloco(transaction.get_connection())
+    novo = recalculo is None
+    if novo:
+        recalculo = Recalculo(feitos)
+    recalculo.datas.update(_to_date(data) for data in datas if data)
+    recalculo.veiculos.update(veiculo for veiculo in veiculos if veiculo)
+    if novo:
+        # Fora de um bloco atomic, roda na hora
+        transaction.on_commit(recalculo)
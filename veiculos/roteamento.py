@@ -0,0 +1,99 @@
+"""
+Leitura em réplica para as views só de leitura.
+
+As views marcadas com @usar_replica leem do banco settings.VEICULOS_BANCO_LEITURA
+(padrão 'replica'), se ele existir em DATABASES; todo o resto, e toda
+escrita, vai para o 'default'. A escolha fica em uma ContextVar, então vale
+também para as consultas em paralelo das views async (veiculos/paralelo.py).
+
+Ler os próprios dados: depois de um POST (ou outro método que escreve), o
+ReplicaMiddleware grava um cookie que dura settings.VEICULOS_JANELA_ESCRITA
+segundos (padrão 10). Enquanto ele existir, as views marcadas leem do
+'default', para o usuário ver o que acabou de salvar mesmo com a réplica
+atrasada.
+
+O que vai para o cache (veiculos/cache.py) é sempre calculado no
+'default' (ler_do_principal): a versão do cache sobe no commit do
+principal, e um valor lido de uma réplica atrasada ficaria guardado sob a
+versão nova, servido a todos até a próxima escrita.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.deprecation import MiddlewareMixin
+
+BANCO_LEITURA_PADRAO = 'replica'
+JANELA_ESCRITA_PADRAO = 10
+COOKIE_ESCRITA = 'veiculos_escrita'
+
+_banco_leitura = ContextVar('banco_leitura', default=None)
+
+
+def banco_leitura(request):
+    """Alias de onde a view deve ler nesta requisição"""
+    alias = getattr(settings, 'VEICULOS_BANCO_LEITURA', BANCO_LEITURA_PADRAO)
+    if alias not in settings.DATABASES or request.COOKIES.get(COOKIE_ESCRITA):
+        return DEFAULT_DB_ALIAS
+    return alias
+
+
+def usar_replica(view):
+    """Decorator para views só de leitura (sync ou async)"""
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def _view(request, *args, **kwargs):
+            token = _banco_leitura.set(banco_leitura(request))
+            try:
+                return await view(request, *args, **kwargs)
+            finally:
+                _banco_leitura.reset(token)
+    else:
+        @wraps(view)
+        def _view(request, *args, **kwargs):
+            token = _banco_leitura.set(banco_leitura(request))
+            try:
+                return view(request, *args, **kwargs)
+            finally:
+                _banco_leitura.reset(token)
+    return _view
+
+
+@contextmanager
+def ler_do_principal():
+    """Leituras do bloco no 'default', mesmo dentro de uma view @usar_replica"""
+    token = _banco_leitura.set(DEFAULT_DB_ALIAS)
+    try:
+        yield
+    finally:
+        _banco_leitura.reset(token)
+
+
+class RoteadorReplica:
+    """DATABASE_ROUTERS: leituras no banco escolhido por @usar_replica, escritas no default"""
+
+    def db_for_read(self, model, **hints):
+        return _banco_leitura.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Réplica e default têm os mesmos dados
+        return True
+
+
+class ReplicaMiddleware(MiddlewareMixin):
+    """Marca o navegador por alguns segundos depois de uma escrita"""
+
+    def process_response(self, request, response):
+        if request.method not in ('GET', 'HEAD', 'OPTIONS', 'TRACE'):
+            response.set_cookie(
+                COOKIE_ESCRITA, '1',
+                max_age=getattr(settings, 'VEICULOS_JANELA_ESCRITA', JANELA_ESCRITA_PADRAO),
+                httponly=True, samesite='Lax',
+            )
+        return response
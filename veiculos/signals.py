@@ -0,0 +1,79 @@
+"""Sinais que mantêm os dados derivados (resumo diário e cache) em dia"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .cache import invalidar as invalidar_cache
+from .models import Despesa, Veiculo, VeiculoImagem, Venda
+from .resumo import marcar_resumo
+
+
+@receiver(pre_save, sender=Venda)
+@receiver(pre_save, sender=Despesa)
+def guardar_valores_anteriores(sender, instance, raw=False, **kwargs):
+    """Guarda data e veículo antes da alteração, para recalcular o dia antigo"""
+    campo_data = 'data_venda' if sender is Venda else 'data_despesa'
+    instance._anterior = None
+    if instance.pk and not raw:
+        instance._anterior = sender._base_manager.filter(pk=instance.pk).values(
+            campo_data, 'veiculo_id'
+        ).first()
+
+
+@receiver(post_save, sender=Venda)
+def venda_salva(sender, instance, raw=False, **kwargs):
+    anterior = getattr(instance, '_anterior', None) or {}
+    marcar_resumo(datas=[instance.data_venda, anterior.get('data_venda')])
+
+
+@receiver(post_delete, sender=Venda)
+def venda_deletada(sender, instance, **kwargs):
+    marcar_resumo(datas=[instance.data_venda])
+
+
+@receiver(post_save, sender=Despesa)
+def despesa_salva(sender, instance, raw=False, **kwargs):
+    anterior = getattr(instance, '_anterior', None) or {}
+    marcar_resumo(
+        datas=[instance.data_despesa, anterior.get('data_despesa')],
+        veiculos=[instance.veiculo_id, anterior.get('veiculo_id')],
+    )
+
+
+@receiver(post_delete, sender=Despesa)
+def despesa_deletada(sender, instance, **kwargs):
+    marcar_resumo(datas=[instance.data_despesa], veiculos=[instance.veiculo_id])
+
+
+@receiver(post_save, sender=Veiculo)
+def veiculo_salvo(sender, instance, created=False, raw=False, **kwargs):
+    # Valor de compra ou status alteram o lucro do dia da venda
+    if not created:
+        marcar_resumo(veiculos=[instance.pk])
+
+
+@receiver(post_save, sender=VeiculoImagem)
+@receiver(post_delete, sender=VeiculoImagem)
+def imagem_alterada(sender, instance, raw=False, **kwargs):
+    # A imagem principal aparece na listagem: nova versão do veículo
+    if not raw:
+        Veiculo.objects.filter(pk=instance.veiculo_id).tocar()
+
+
+@receiver(post_delete, sender=VeiculoImagem)
+def imagem_removida(sender, instance, **kwargs):
+    # Também na exclusão em cascata do veículo, que não chama VeiculoImagem.delete()
+    nome, derivados, storage = instance.imagem.name, instance.derivados, instance.imagem.storage
+    transaction.on_commit(lambda: VeiculoImagem.liberar_arquivos(nome, derivados, storage))
+
+
+@receiver(post_save, sender=Venda)
+@receiver(post_delete, sender=Venda)
+@receiver(post_save, sender=Despesa)
+@receiver(post_delete, sender=Despesa)
+@receiver(post_save, sender=Veiculo)
+@receiver(post_delete, sender=Veiculo)
+@receiver(post_save, sender=VeiculoImagem)
+@receiver(post_delete, sender=VeiculoImagem)
+def dados_alterados(sender, **kwargs):
+    invalidar_cache()
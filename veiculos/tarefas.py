@@ -0,0 +1,125 @@
+"""
+Execução das tarefas em segundo plano (model Tarefa).
+
+As views só gravam os arquivos e enfileiram tarefas; o comando
+processar_tarefas reserva lotes da fila e executa cada tarefa em um pool de
+processos, fora do ciclo de request. Cada processo do pool abre sua própria
+conexão com o banco.
+"""
+from datetime import timedelta
+
+import django
+from django.db import connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+MAX_TENTATIVAS = 3
+
+# Tarefas "processando" há mais tempo que isso são de um worker que morreu
+TEMPO_LIMITE = timedelta(minutes=10)
+
+
+def processar_imagem(imagem_id):
+    """Calcula o hash e gera os derivados de uma VeiculoImagem"""
+    from .cache import invalidar as invalidar_cache
+    from .imagens import calcular_sha256
+    from .models import Veiculo, VeiculoImagem
+
+    imagem = VeiculoImagem.objects.filter(pk=imagem_id).first()
+    if imagem is None:
+        # Imagem removida antes de ser processada
+        return
+
+    VeiculoImagem.objects.filter(pk=imagem_id).update(processamento='processando')
+    sha256 = calcular_sha256(imagem.imagem.name, imagem.imagem.storage)
+    VeiculoImagem.objects.filter(pk=imagem_id).update(sha256=sha256)
+
+    # Foto reenviada: o mesmo arquivo já tem derivados prontos
+    pronta = VeiculoImagem.objects.filter(
+        imagem=imagem.imagem.name, processamento='concluido'
+    ).exclude(pk=imagem_id).values('derivados').first()
+    if pronta:
+        VeiculoImagem.objects.filter(pk=imagem_id).update(
+            derivados=pronta['derivados'], processamento='concluido'
+        )
+        Veiculo.objects.filter(pk=imagem.veiculo_id).tocar()
+        invalidar_cache()
+        return
+    imagem.gerar_derivados()
+
+
+def processar_imagem_falhou(imagem_id):
+    from .models import VeiculoImagem
+
+    VeiculoImagem.objects.filter(pk=imagem_id).update(processamento='erro')
+
+
+# tipo -> (executar, ao_falhar_definitivamente)
+TIPOS = {
+    'processar_imagem': (processar_imagem, processar_imagem_falhou),
+}
+
+
+def inicializar_processo():
+    """Initializer do pool: cada processo configura o Django e conexões próprias"""
+    django.setup()
+    connections.close_all()
+
+
+def executar(tipo, parametros):
+    """Roda dentro do processo do pool"""
+    try:
+        TIPOS[tipo][0](**parametros)
+    finally:
+        connections.close_all()
+
+
+def reservar(limite):
+    """
+    Marca até `limite` tarefas como "processando" e as retorna. Com
+    SKIP LOCKED, vários workers podem consumir a fila ao mesmo tempo.
+
+    Tarefas abandonadas (o worker morreu, ex. sem memória ou com um crash
+    do Pillow numa imagem ruim) voltam para a fila até MAX_TENTATIVAS; a
+    partir daí vão para "erro", como as que falham com exceção.
+    """
+    from .models import Tarefa
+
+    agora = timezone.now()
+    abandonadas = Q(status='processando', iniciada_em__lt=agora - TEMPO_LIMITE)
+    with transaction.atomic():
+        for tarefa in Tarefa.objects.select_for_update(skip_locked=True).filter(
+            abandonadas, tentativas__gte=MAX_TENTATIVAS
+        ):
+            falhar(tarefa, 'O worker parou durante a execução (tempo limite excedido).')
+
+        ids = list(
+            Tarefa.objects.select_for_update(skip_locked=True).filter(
+                Q(status='pendente') | (abandonadas & Q(tentativas__lt=MAX_TENTATIVAS))
+            ).order_by('id').values_list('id', flat=True)[:limite]
+        )
+        Tarefa.objects.filter(id__in=ids).update(
+            status='processando',
+            iniciada_em=agora,
+            tentativas=F('tentativas') + 1,
+        )
+    return list(Tarefa.objects.filter(id__in=ids))
+
+
+def concluir(tarefa):
+    tarefa.status = 'concluida'
+    tarefa.erro = ''
+    tarefa.concluida_em = timezone.now()
+    tarefa.save(update_fields=['status', 'erro', 'concluida_em'])
+
+
+def falhar(tarefa, erro):
+    """Volta a tarefa para a fila ou, após MAX_TENTATIVAS, marca como erro"""
+    tarefa.erro = erro
+    if tarefa.tentativas < MAX_TENTATIVAS:
+        tarefa.status = 'pendente'
+    else:
+        tarefa.status = 'erro'
+        tarefa.concluida_em = timezone.now()
+        TIPOS[tarefa.tipo][1](**tarefa.parametros)
+    tarefa.save(update_fields=['status', 'erro', 'concluida_em'])
@@ -0,0 +1,25 @@
+"""
+Filtro para URLs de imagens reduzidas sob demanda:
+
+    {% load redimensionamento %}
+    <img src="{{ imagem.imagem|redimensionada:'800x600' }}">
+
+Aceita o campo do arquivo ou o nome no storage. Os tamanhos fixos (thumb,
+card, full) já vêm prontos em VeiculoImagem.thumb/card/full; este filtro é
+para os outros.
+"""
+from django import template
+
+from veiculos.redimensionamento import url_redimensionada
+
+register = template.Library()
+
+
+@register.filter
+def redimensionada(imagem, tamanho):
+    """URL assinada de `imagem` reduzida para 'LARGURAxALTURA'"""
+    nome = getattr(imagem, 'name', imagem)
+    if not nome:
+        return ''
+    largura, _, altura = str(tamanho).partition('x')
+    return url_redimensionada(nome, int(largura), int(altura))
@@ -1,5 +1,6 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import api, redimensionamento, views
 
 urlpatterns = [
     # Dashboard
@@ -8,6 +9,8 @@ urlpatterns = [
     # Veículos
     path('veiculos/', views.veiculo_lista, name='veiculo_lista'),
     path('veiculos/novo/', views.veiculo_novo, name='veiculo_novo'),
+    path('veiculos/importar/', views.veiculo_importar, name='veiculo_importar'),
+    path('veiculos/exportar/', views.veiculo_exportar, name='veiculo_exportar'),
     path('veiculos/<int:pk>/', views.veiculo_detalhe, name='veiculo_detalhe'),
     path('veiculos/<int:pk>/editar/', views.veiculo_editar, name='veiculo_editar'),
     path('veiculos/<int:pk>/deletar/', views.veiculo_deletar, name='veiculo_deletar'),
@@ -20,6 +23,8 @@ urlpatterns = [
     path('veiculos/<int:veiculo_pk>/despesa/nova/', views.despesa_nova, name='despesa_nova'),
     path('despesas/<int:pk>/editar/', views.despesa_editar, name='despesa_editar'),
     path('despesas/<int:pk>/deletar/', views.despesa_deletar, name='despesa_deletar'),
+    path('despesas/lote/', views.despesa_lote, name='despesa_lote'),
+    path('despesas/exportar/', views.despesa_exportar, name='despesa_exportar'),
     
     # Clientes
     path('clientes/', views.cliente_lista, name='cliente_lista'),
@@ -36,15 +41,32 @@ urlpatterns = [
     # Vendas
     path('veiculos/<int:veiculo_pk>/vender/', views.venda_nova, name='venda_nova'),
     path('vendas/', views.venda_lista, name='venda_lista'),
+    path('vendas/exportar/', views.venda_exportar, name='venda_exportar'),
     path('vendas/<int:pk>/', views.venda_detalhe, name='venda_detalhe'),
     
     # Relatórios
     path('relatorios/geral/', views.relatorio_geral, name='relatorio_geral'),
     path('relatorios/por-veiculo/', views.relatorio_por_veiculo, name='relatorio_por_veiculo'),
+    path('relatorios/por-veiculo/exportar/', views.relatorio_por_veiculo_exportar, name='relatorio_por_veiculo_exportar'),
     
     # Configurações
     path('tipos-despesa/', views.tipo_despesa_lista, name='tipo_despesa_lista'),
     path('tipos-despesa/novo/', views.tipo_despesa_novo, name='tipo_despesa_novo'),
     path('formas-pagamento/', views.forma_pagamento_lista, name='forma_pagamento_lista'),
     path('formas-pagamento/nova/', views.forma_pagamento_nova, name='forma_pagamento_nova'),
+
+    # Imagens redimensionadas sob demanda (servidas também sem DEBUG)
+    path(
+        f"{settings.MEDIA_URL.lstrip('/')}r/<int:largura>x<int:altura>/<path:caminho>",
+        redimensionamento.imagem_redimensionada,
+        name='imagem_redimensionada',
+    ),
 ]
+
+# API JSON (veiculos/api.py)
+for nome in api.RECURSOS:
+    urlpatterns += [
+        path(f'api/{nome}/', api.lista, {'recurso': nome}, name=f'api_{nome}_lista'),
+        path(f'api/{nome}/<int:pk>/', api.detalhe, {'recurso': nome}, name=f'api_{nome}_detalhe'),
+        path(f'api/{nome}/lote/', api.lote, {'recurso': nome}, name=f'api_{nome}_lote'),
+    ]
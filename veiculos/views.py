@@ -1,26 +1,59 @@
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
-from django.db.models import Sum, Q, Count
+from django.core.paginator import Paginator
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.db.models import Case, Count, F, Max, Prefetch, Sum, Value, When
 from decimal import Decimal
+from functools import partial
 from .models import (
     Veiculo, VeiculoImagem, Despesa, Cliente, Fornecedor, Venda,
-    TipoDespesa, FormaPagamento
+    TipoDespesa, FormaPagamento, Tarefa, ResumoDiario, VendaConflito
 )
+from .busca import buscar
+from .cache import aobter_ou_calcular
+from .condicional import get_condicional, versao_tabela
+from .exportacao import TAMANHO_LOTE, resposta_exportacao
+from .importacao import ImportadorVeiculos, PlanilhaInvalida, ler_planilha
+from .paginacao import KeysetPaginator
+from .paralelo import em_paralelo
+from .roteamento import usar_replica
 from .forms import (
     VeiculoForm, DespesaForm, ClienteForm, FornecedorForm,
-    VendaForm, TipoDespesaForm, FormaPagamentoForm
+    VendaForm, TipoDespesaForm, FormaPagamentoForm, ImportacaoVeiculosForm,
+    DespesaLoteFormSet, DespesaLoteVeiculosForm
 )
 
+RELATORIO_POR_PAGINA = 25
+ERROS_IMPORTACAO_EXIBIDOS = 200
+
+
+def _data(valor):
+    """Data de um parâmetro GET ('2026-1-1', '2026-01-01'); None se ausente ou inválida"""
+    try:
+        return models.DateField().to_python(valor) if valor else None
+    except ValidationError:
+        return None
+
+
+def _filtros_query(request, *remover):
+    """Query string atual sem os parâmetros de paginação, para os links"""
+    filtros = request.GET.copy()
+    for chave in remover:
+        filtros.pop(chave, None)
+    return filtros.urlencode()
+
 
 # ============= DASHBOARD =============
 
-def dashboard(request):
-    """Dashboard principal com resumo geral"""
+async def dashboard(request):
+    """Dashboard principal com resumo geral (consultas em paralelo)"""
     from datetime import datetime, timedelta
     
     # Filtros de período
-    data_inicio = request.GET.get('data_inicio')
-    data_fim = request.GET.get('data_fim')
+    data_inicio = _data(request.GET.get('data_inicio'))
+    data_fim = _data(request.GET.get('data_fim'))
     periodo_rapido = request.GET.get('periodo')
     
     # Períodos rápidos
@@ -38,90 +71,141 @@ def dashboard(request):
         data_inicio = hoje.replace(month=1, day=1)
         data_fim = hoje
     
-    # Query base de vendas
-    vendas = Venda.objects.all()
-    
-    # Aplicar filtros de data
-    if data_inicio:
-        vendas = vendas.filter(data_venda__gte=data_inicio)
-    if data_fim:
-        vendas = vendas.filter(data_venda__lte=data_fim)
-    
-    total_veiculos_disponiveis = Veiculo.objects.filter(status='disponivel').count()
-    total_veiculos_vendidos = Veiculo.objects.filter(status='vendido').count()
-    
-    # Total de vendas
-    total_vendas = vendas.aggregate(
-        total=Sum('valor_venda')
-    )['total'] or Decimal('0.00')
-    
-    # Total de despesas (filtrado por período se aplicável)
-    despesas = Despesa.objects.all()
-    if data_inicio:
-        despesas = despesas.filter(data_despesa__gte=data_inicio)
-    if data_fim:
-        despesas = despesas.filter(data_despesa__lte=data_fim)
-    
-    total_despesas = despesas.aggregate(
-        total=Sum('valor')
-    )['total'] or Decimal('0.00')
-    
-    # Lucro total (apenas veículos vendidos no período)
-    veiculos_vendidos_ids = vendas.values_list('veiculo_id', flat=True)
-    veiculos_vendidos = Veiculo.objects.filter(id__in=veiculos_vendidos_ids)
-    lucro_total = Decimal('0.00')
-    
-    for veiculo in veiculos_vendidos:
-        if hasattr(veiculo, 'venda'):
-            lucro = veiculo.lucro_real()
-            if lucro:
-                lucro_total += lucro
-    
-    # Últimas vendas (do período ou geral)
-    ultimas_vendas = vendas.select_related('veiculo', 'cliente').order_by('-data_venda')[:5]
-    
-    # Veículos disponíveis
-    veiculos_disponiveis = Veiculo.objects.filter(status='disponivel').order_by('-data_cadastro')[:5]
+    async def calcular():
+        # Query base de vendas
+        vendas = Venda.objects.all()
+    
+        # Aplicar filtros de data
+        if data_inicio:
+            vendas = vendas.filter(data_venda__gte=data_inicio)
+        if data_fim:
+            vendas = vendas.filter(data_venda__lte=data_fim)
+    
+        # Consultas independentes, cada uma em sua conexão (veja veiculos/paralelo.py)
+        dados = await em_paralelo(
+            total_veiculos_disponiveis=Veiculo.objects.filter(status='disponivel').count,
+            total_veiculos_vendidos=Veiculo.objects.filter(status='vendido').count,
+            # Totais do período somados a partir do resumo diário
+            resumo=partial(ResumoDiario.totais, data_inicio, data_fim),
+            # Últimas vendas (do período ou geral)
+            ultimas_vendas=lambda: list(
+                vendas.select_related('veiculo', 'cliente').order_by('-data_venda')[:5]
+            ),
+            # Veículos disponíveis
+            veiculos_disponiveis=lambda: list(
+                Veiculo.objects.filter(status='disponivel').com_imagem_principal().order_by('-data_cadastro')[:5]
+            ),
+        )
+        resumo = dados.pop('resumo')
+        dados.update({
+            'total_vendas': resumo['total_vendas'],
+            'total_despesas': resumo['total_despesas'],
+            'lucro_total': resumo['lucro'],
+        })
+        return dados
     
-    context = {
-        'total_veiculos_disponiveis': total_veiculos_disponiveis,
-        'total_veiculos_vendidos': total_veiculos_vendidos,
-        'total_vendas': total_vendas,
-        'total_despesas': total_despesas,
-        'lucro_total': lucro_total,
-        'ultimas_vendas': ultimas_vendas,
-        'veiculos_disponiveis': veiculos_disponiveis,
+    # Cache por período normalizado, invalidado a cada escrita (veja veiculos/cache.py)
+    periodo = tuple(data.isoformat() if data else '' for data in (data_inicio, data_fim))
+    context = await aobter_ou_calcular('dashboard', periodo, calcular)
+    context.update({
         'data_inicio': data_inicio,
         'data_fim': data_fim,
         'periodo_rapido': periodo_rapido,
-    }
+    })
     
-    return render(request, 'veiculos/dashboard.html', context)
+    return await sync_to_async(render)(request, 'veiculos/dashboard.html', context)
 
 
 # ============= VEÍCULOS =============
 
-def veiculo_lista(request):
-    """Lista todos os veículos"""
-    veiculos = Veiculo.objects.all().select_related('fornecedor').order_by('-data_cadastro')
+def _filtrar_veiculos(request):
+    """Veículos com os filtros da listagem (status e busca) e a ordenação"""
+    veiculos = Veiculo.objects.all()
     
-    # Filtros
     status = request.GET.get('status')
     if status:
         veiculos = veiculos.filter(status=status)
     
+    ordenacao = ('-data_cadastro', '-id')
     busca = request.GET.get('busca')
     if busca:
-        veiculos = veiculos.filter(
-            Q(marca__icontains=busca) |
-            Q(modelo__icontains=busca) |
-            Q(placa__icontains=busca)
-        )
+        veiculos = buscar(veiculos, busca)
+        ordenacao = ('-relevancia',) + ordenacao
+    
+    return veiculos, ordenacao
+
+
+def _versao_veiculos(request):
+    # A imagem principal também muda atualizado_em (VeiculoQuerySet.tocar)
+    return versao_tabela(Veiculo.objects.all())
+
+
+@usar_replica
+@get_condicional(_versao_veiculos)
+def veiculo_lista(request):
+    """Lista todos os veículos"""
+    veiculos, ordenacao = _filtrar_veiculos(request)
+    veiculos = veiculos.select_related('fornecedor').com_imagem_principal()
+    
+    pagina = KeysetPaginator(veiculos, ordenacao).get_page(request.GET.get('cursor'))
     
-    context = {'veiculos': veiculos}
+    context = {
+        'veiculos': pagina,
+        'pagina': pagina,
+        'filtros_query': _filtros_query(request, 'cursor'),
+    }
     return render(request, 'veiculos/veiculo_lista.html', context)
 
 
+def _salvar_imagens(veiculo, arquivos, primeira_principal=False):
+    """
+    Grava os arquivos e cria as VeiculoImagem com um único bulk_create.
+    Redimensionamento e hash ficam para o worker (processar_tarefas).
+    """
+    if not arquivos:
+        return []
+    
+    ordem_inicial = veiculo.imagens.count()
+    with transaction.atomic():
+        imagens = VeiculoImagem.objects.bulk_create([
+            VeiculoImagem(
+                veiculo=veiculo,
+                imagem=arquivo,
+                principal=primeira_principal and idx == 0,  # Primeira imagem é principal
+                ordem=ordem_inicial + idx,
+            )
+            for idx, arquivo in enumerate(arquivos)
+        ])
+        Tarefa.enfileirar_imagens(imagens)
+    return imagens
+
+
+def _versao_veiculo(request, pk):
+    """
+    Veículo, fornecedor, venda, despesas, tipos de despesa e imagens; None
+    se o veículo não existe. As imagens entram pelo estado: passar para
+    processando ou erro não muda o atualizado_em do veículo.
+    """
+    veiculo = Veiculo.objects.filter(pk=pk).values_list(
+        'atualizado_em', 'fornecedor__atualizado_em', 'venda__atualizado_em'
+    ).first()
+    if veiculo is None:
+        return None
+    imagens = tuple(
+        VeiculoImagem.objects.filter(veiculo_id=pk).order_by('pk').values_list(
+            'pk', 'processamento', 'principal'
+        )
+    )
+    return (
+        *veiculo,
+        *versao_tabela(Despesa.objects.filter(veiculo_id=pk)),
+        *versao_tabela(TipoDespesa.objects.all()),
+        imagens,
+    )
+
+
+@usar_replica
+@get_condicional(_versao_veiculo)
 def veiculo_detalhe(request, pk):
     """Detalhes de um veículo"""
     veiculo = get_object_or_404(Veiculo, pk=pk)
@@ -142,14 +226,7 @@ def veiculo_novo(request):
             veiculo = form.save()
             
             # Processar imagens enviadas
-            imagens = request.FILES.getlist('imagens')
-            for idx, imagem in enumerate(imagens):
-                VeiculoImagem.objects.create(
-                    veiculo=veiculo,
-                    imagem=imagem,
-                    principal=(idx == 0),  # Primeira imagem é principal
-                    ordem=idx
-                )
+            _salvar_imagens(veiculo, request.FILES.getlist('imagens'), primeira_principal=True)
             
             messages.success(request, 'Veículo cadastrado com sucesso!')
             return redirect('veiculo_detalhe', pk=veiculo.pk)
@@ -160,6 +237,34 @@ def veiculo_novo(request):
     return render(request, 'veiculos/veiculo_form.html', context)
 
 
+def veiculo_importar(request):
+    """Importar veículos em massa de uma planilha CSV ou XLSX"""
+    resultado = None
+    if request.method == 'POST':
+        form = ImportacaoVeiculosForm(request.POST, request.FILES)
+        if form.is_valid():
+            arquivo = form.cleaned_data['arquivo']
+            try:
+                resultado = ImportadorVeiculos().importar(ler_planilha(arquivo.file, arquivo.name))
+            except PlanilhaInvalida as e:
+                form.add_error('arquivo', str(e))
+            else:
+                if resultado.criados:
+                    messages.success(request, f'{resultado.criados} veículos importados com sucesso!')
+                if resultado.erros:
+                    messages.error(request, f'{resultado.total_erros} linhas não foram importadas.')
+    else:
+        form = ImportacaoVeiculosForm()
+    
+    context = {
+        'form': form,
+        'resultado': resultado,
+        'erros': resultado.erros[:ERROS_IMPORTACAO_EXIBIDOS] if resultado else [],
+        'colunas': ImportacaoVeiculosForm.COLUNAS,
+    }
+    return render(request, 'veiculos/veiculo_importar.html', context)
+
+
 def veiculo_editar(request, pk):
     """Editar veículo"""
     veiculo = get_object_or_404(Veiculo, pk=pk)
@@ -170,14 +275,7 @@ def veiculo_editar(request, pk):
             form.save()
             
             # Processar novas imagens
-            imagens = request.FILES.getlist('imagens')
-            for idx, imagem in enumerate(imagens):
-                ordem_atual = veiculo.imagens.count() + idx
-                VeiculoImagem.objects.create(
-                    veiculo=veiculo,
-                    imagem=imagem,
-                    ordem=ordem_atual
-                )
+            _salvar_imagens(veiculo, request.FILES.getlist('imagens'))
             
             messages.success(request, 'Veículo atualizado com sucesso!')
             return redirect('veiculo_detalhe', pk=veiculo.pk)
@@ -252,6 +350,46 @@ def despesa_nova(request, veiculo_pk):
     return render(request, 'veiculos/despesa_form.html', context)
 
 
+def despesa_lote(request):
+    """Lançar várias despesas de uma vez, para um ou mais veículos"""
+    selecionados = request.GET.getlist('veiculo')
+    tipos = list(TipoDespesa.objects.order_by('nome'))
+    fornecedores = list(Fornecedor.objects.order_by('nome'))
+    opcoes = {'tipos': tipos, 'fornecedores': fornecedores}
+    
+    if request.method == 'POST':
+        veiculos_form = DespesaLoteVeiculosForm(request.POST, incluir=selecionados)
+        formset = DespesaLoteFormSet(request.POST, form_kwargs=opcoes)
+        if veiculos_form.is_valid() and formset.is_valid():
+            veiculos = veiculos_form.cleaned_data['veiculos']
+            linhas = [form.cleaned_data for form in formset if form.has_changed()]
+            despesas = [
+                Despesa(veiculo=veiculo, **linha)
+                for veiculo in veiculos
+                for linha in linhas
+            ]
+            # Um INSERT; totais, resumo e cache são atualizados uma vez (DespesaQuerySet)
+            with transaction.atomic():
+                Despesa.objects.bulk_create(despesas)
+            
+            messages.success(request, f'{len(despesas)} despesas adicionadas com sucesso!')
+            if len(veiculos) == 1:
+                return redirect('veiculo_detalhe', pk=veiculos[0].pk)
+            return redirect('veiculo_lista')
+    else:
+        veiculos_form = DespesaLoteVeiculosForm(
+            initial={'veiculos': selecionados}, incluir=selecionados
+        )
+        formset = DespesaLoteFormSet(form_kwargs=opcoes)
+    
+    context = {
+        'veiculos_form': veiculos_form,
+        'formset': formset,
+        'titulo': 'Lançar Despesas',
+    }
+    return render(request, 'veiculos/despesa_lote.html', context)
+
+
 def despesa_editar(request, pk):
     """Editar despesa"""
     despesa = get_object_or_404(Despesa, pk=pk)
@@ -285,19 +423,25 @@ def despesa_deletar(request, pk):
 
 # ============= CLIENTES =============
 
+@usar_replica
+@get_condicional(lambda request: versao_tabela(Cliente.objects.all()))
 def cliente_lista(request):
     """Lista todos os clientes"""
     clientes = Cliente.objects.all().order_by('nome')
     
+    ordenacao = ('nome', 'id')
     busca = request.GET.get('busca')
     if busca:
-        clientes = clientes.filter(
-            Q(nome__icontains=busca) |
-            Q(cpf__icontains=busca) |
-            Q(telefone__icontains=busca)
-        )
+        clientes = buscar(clientes, busca)
+        ordenacao = ('-relevancia',) + ordenacao
     
-    context = {'clientes': clientes}
+    pagina = KeysetPaginator(clientes, ordenacao).get_page(request.GET.get('cursor'))
+    
+    context = {
+        'clientes': pagina,
+        'pagina': pagina,
+        'filtros_query': _filtros_query(request, 'cursor'),
+    }
     return render(request, 'veiculos/cliente_lista.html', context)
 
 
@@ -348,18 +492,25 @@ def cliente_deletar(request, pk):
 
 # ============= FORNECEDORES =============
 
+@usar_replica
+@get_condicional(lambda request: versao_tabela(Fornecedor.objects.all()))
 def fornecedor_lista(request):
     """Lista todos os fornecedores"""
     fornecedores = Fornecedor.objects.all().order_by('nome')
     
+    ordenacao = ('nome', 'id')
     busca = request.GET.get('busca')
     if busca:
-        fornecedores = fornecedores.filter(
-            Q(nome__icontains=busca) |
-            Q(cnpj_cpf__icontains=busca)
-        )
+        fornecedores = buscar(fornecedores, busca)
+        ordenacao = ('-relevancia',) + ordenacao
+    
+    pagina = KeysetPaginator(fornecedores, ordenacao).get_page(request.GET.get('cursor'))
     
-    context = {'fornecedores': fornecedores}
+    context = {
+        'fornecedores': pagina,
+        'pagina': pagina,
+        'filtros_query': _filtros_query(request, 'cursor'),
+    }
     return render(request, 'veiculos/fornecedor_lista.html', context)
 
 
@@ -423,14 +574,17 @@ def venda_nova(request, veiculo_pk):
         if form.is_valid():
             venda = form.save(commit=False)
             venda.veiculo = veiculo
-            venda.save()
-            
-            # Se houver veículo de entrada, marca ele como vendido também
-            # pois ele saiu do cliente e entrou no nosso estoque
-            if venda.veiculo_entrada:
-                veiculo_entrada = venda.veiculo_entrada
-                veiculo_entrada.status = 'disponivel'  # Fica disponível no nosso estoque
-                veiculo_entrada.save()
+            try:
+                # Travamento e status em Venda.save(); o veículo de entrada
+                # já está disponível no estoque (o form só aceita esses)
+                venda.save()
+            except VendaConflito as e:
+                if e.campo is None:
+                    messages.error(request, str(e))
+                    return redirect('veiculo_detalhe', pk=veiculo.pk)
+                form.add_error(e.campo, str(e))
+                context = {'form': form, 'veiculo': veiculo, 'titulo': 'Nova Venda'}
+                return render(request, 'veiculos/venda_form.html', context, status=409)
             
             messages.success(request, 'Venda realizada com sucesso!')
             return redirect('venda_detalhe', pk=venda.pk)
@@ -441,14 +595,54 @@ def venda_nova(request, veiculo_pk):
     return render(request, 'veiculos/venda_form.html', context)
 
 
+def _filtrar_vendas(request):
+    """Vendas do período informado (data_inicio/data_fim), se houver"""
+    vendas = Venda.objects.all()
+    
+    data_inicio = request.GET.get('data_inicio')
+    data_fim = request.GET.get('data_fim')
+    if data_inicio:
+        vendas = vendas.filter(data_venda__gte=data_inicio)
+    if data_fim:
+        vendas = vendas.filter(data_venda__lte=data_fim)
+    
+    return vendas
+
+
+def _versao_vendas(request):
+    # As linhas mostram o veículo e o cliente, que não podem ser excluídos
+    # enquanto tiverem venda (PROTECT): basta a última alteração deles
+    return (
+        *versao_tabela(Venda.objects.all()),
+        Veiculo.objects.aggregate(ultima=Max('atualizado_em'))['ultima'],
+        Cliente.objects.aggregate(ultima=Max('atualizado_em'))['ultima'],
+    )
+
+
+@usar_replica
+@get_condicional(_versao_vendas)
 def venda_lista(request):
     """Lista todas as vendas"""
-    vendas = Venda.objects.all().select_related('veiculo', 'cliente').order_by('-data_venda')
+    vendas = _filtrar_vendas(request).select_related('veiculo', 'cliente')
+    pagina = KeysetPaginator(vendas, ('-data_venda', '-id')).get_page(request.GET.get('cursor'))
     
-    context = {'vendas': vendas}
+    context = {
+        'vendas': pagina,
+        'pagina': pagina,
+        'filtros_query': _filtros_query(request, 'cursor'),
+    }
     return render(request, 'veiculos/venda_lista.html', context)
 
 
+def _versao_venda(request, pk):
+    return Venda.objects.filter(pk=pk).values_list(
+        'atualizado_em', 'cliente__atualizado_em',
+        'veiculo__atualizado_em', 'veiculo_entrada__atualizado_em',
+    ).first()
+
+
+@usar_replica
+@get_condicional(_versao_venda)
 def venda_detalhe(request, pk):
     """Detalhes de uma venda"""
     venda = get_object_or_404(Venda, pk=pk)
@@ -459,52 +653,51 @@ def venda_detalhe(request, pk):
 
 # ============= RELATÓRIOS =============
 
-def relatorio_geral(request):
-    """Relatório geral de vendas e despesas"""
-    vendas = Venda.objects.all().select_related('veiculo', 'cliente')
-    
-    total_vendas = vendas.aggregate(
-        total=Sum('valor_venda')
-    )['total'] or Decimal('0.00')
-    
-    total_entradas = vendas.aggregate(
-        total=Sum('valor_entrada')
-    )['total'] or Decimal('0.00')
-    
-    total_despesas = Despesa.objects.aggregate(
-        total=Sum('valor')
-    )['total'] or Decimal('0.00')
-    
-    # Calcular lucro total
-    veiculos_vendidos = Veiculo.objects.filter(status='vendido')
-    lucro_total = Decimal('0.00')
-    
-    for veiculo in veiculos_vendidos:
-        lucro = veiculo.lucro_real()
-        if lucro:
-            lucro_total += lucro
+@usar_replica
+async def relatorio_geral(request):
+    """Relatório geral de vendas e despesas (consultas em paralelo)"""
+    vendas = Venda.objects.all()
+    # Só uma página do histórico por vez, como na lista de vendas
+    paginator = KeysetPaginator(
+        vendas.select_related('veiculo', 'cliente'), ('-data_venda', '-id'), RELATORIO_POR_PAGINA
+    )
+    
+    dados = await em_paralelo(
+        totais_vendas=partial(
+            vendas.aggregate, total_vendas=Sum('valor_venda'), total_entradas=Sum('valor_entrada')
+        ),
+        total_despesas=lambda: Despesa.objects.aggregate(total=Sum('valor'))['total'],
+        # Calcular lucro total
+        lucro_total=Veiculo.objects.filter(status='vendido').lucro_total,
+        vendas=partial(paginator.get_page, request.GET.get('cursor')),
+    )
     
     context = {
-        'total_vendas': total_vendas,
-        'total_entradas': total_entradas,
-        'total_despesas': total_despesas,
-        'lucro_total': lucro_total,
-        'vendas': vendas,
+        'total_vendas': dados['totais_vendas']['total_vendas'] or Decimal('0.00'),
+        'total_entradas': dados['totais_vendas']['total_entradas'] or Decimal('0.00'),
+        'total_despesas': dados['total_despesas'] or Decimal('0.00'),
+        'lucro_total': dados['lucro_total'],
+        'vendas': dados['vendas'],
+        'pagina': dados['vendas'],
+        'filtros_query': _filtros_query(request, 'cursor'),
     }
     
-    return render(request, 'veiculos/relatorio_geral.html', context)
+    return await sync_to_async(render)(request, 'veiculos/relatorio_geral.html', context)
 
 
-def relatorio_por_veiculo(request):
-    """Relatório de lucro por veículo com filtros"""
-    # Filtros
+def _filtrar_relatorio_por_veiculo(request):
+    """Veículos vendidos, com os dados financeiros, filtrados como no relatório"""
     data_inicio = request.GET.get('data_inicio')
     data_fim = request.GET.get('data_fim')
     veiculo_id = request.GET.get('veiculo')
     cliente_id = request.GET.get('cliente')
+    placa = request.GET.get('placa')
+    cliente_nome = request.GET.get('cliente_nome')
     
-    # Query base
-    veiculos_vendidos = Veiculo.objects.filter(status='vendido').select_related('venda', 'venda__cliente', 'venda__veiculo_entrada')
+    # Venda, cliente, entrada e pagamento vêm no mesmo SELECT
+    veiculos_vendidos = Veiculo.objects.filter(status='vendido').select_related(
+        'venda', 'venda__cliente', 'venda__veiculo_entrada', 'venda__forma_pagamento'
+    ).com_financeiro()
     
     # Aplicar filtros
     if data_inicio:
@@ -515,42 +708,162 @@ def relatorio_por_veiculo(request):
         veiculos_vendidos = veiculos_vendidos.filter(id=veiculo_id)
     if cliente_id:
         veiculos_vendidos = veiculos_vendidos.filter(venda__cliente_id=cliente_id)
+    if placa:
+        veiculos_vendidos = veiculos_vendidos.filter(placa__icontains=placa)
+    if cliente_nome:
+        veiculos_vendidos = veiculos_vendidos.filter(venda__cliente__nome__icontains=cliente_nome)
+    
+    return veiculos_vendidos.order_by('-venda__data_venda', '-id')
+
+
+@usar_replica
+async def relatorio_por_veiculo(request):
+    """Relatório de lucro por veículo com filtros (totais e página em paralelo)"""
+    veiculos_vendidos = _filtrar_relatorio_por_veiculo(request)
+    
+    # Despesas de todos os veículos da página em um único prefetch
+    paginator = Paginator(
+        veiculos_vendidos.prefetch_related(
+            Prefetch(
+                'despesas',
+                queryset=Despesa.objects.select_related('tipo', 'fornecedor'),
+                to_attr='despesas_list',
+            )
+        ),
+        RELATORIO_POR_PAGINA,
+    )
+    
+    def carregar_pagina():
+        pagina = paginator.get_page(request.GET.get('pagina'))
+        pagina.object_list = list(pagina.object_list)
+        return pagina
+    
+    dados = await em_paralelo(
+        # Totais de todos os veículos filtrados em uma única query
+        totais=partial(
+            veiculos_vendidos.aggregate,
+            valor_compra=Sum('valor_compra'),
+            valor_venda=Sum('venda__valor_venda'),
+            despesas=Sum('total_despesas'),
+            lucro=Sum('valor_lucro_real'),
+        ),
+        pagina=carregar_pagina,
+    )
+    totais = {chave: valor or Decimal('0.00') for chave, valor in dados['totais'].items()}
+    pagina = dados['pagina']
     
     resultados = []
-    for veiculo in veiculos_vendidos:
-        despesas_list = veiculo.despesas.all().select_related('tipo', 'fornecedor')
-        despesas_total = veiculo.total_despesas()
-        lucro = veiculo.lucro_real()
+    for veiculo in pagina:
+        venda = getattr(veiculo, 'venda', None)
         
         resultados.append({
             'veiculo': veiculo,
-            'venda': veiculo.venda,
+            'venda': venda,
             'valor_compra': veiculo.valor_compra,
-            'valor_venda': veiculo.venda.valor_venda if hasattr(veiculo, 'venda') else Decimal('0.00'),
-            'despesas': despesas_total,
-            'despesas_list': despesas_list,
-            'lucro': lucro,
-            'tem_entrada': veiculo.venda.veiculo_entrada is not None if hasattr(veiculo, 'venda') else False,
+            'valor_venda': venda.valor_venda if venda else Decimal('0.00'),
+            'despesas': veiculo.valor_despesas,
+            'despesas_list': veiculo.despesas_list,
+            'lucro': veiculo.valor_lucro_real,
+            'tem_entrada': venda.veiculo_entrada_id is not None if venda else False,
         })
     
-    # Listas para os filtros
-    todos_veiculos_vendidos = Veiculo.objects.filter(status='vendido').order_by('marca', 'modelo')
-    todos_clientes = Cliente.objects.all().order_by('nome')
+    totais_pagina = {
+        chave: sum((resultado[chave] for resultado in resultados), Decimal('0.00'))
+        for chave in ('valor_compra', 'valor_venda', 'despesas', 'lucro')
+    }
     
     context = {
         'resultados': resultados,
-        'todos_veiculos': todos_veiculos_vendidos,
-        'todos_clientes': todos_clientes,
-        'data_inicio': data_inicio,
-        'data_fim': data_fim,
-        'veiculo_selecionado': veiculo_id,
-        'cliente_selecionado': cliente_id,
+        'pagina': pagina,
+        'totais': totais,
+        'totais_pagina': totais_pagina,
+        'filtros_query': _filtros_query(request, 'pagina'),
+        'data_inicio': request.GET.get('data_inicio'),
+        'data_fim': request.GET.get('data_fim'),
+        'placa': request.GET.get('placa'),
+        'cliente_nome': request.GET.get('cliente_nome'),
     }
-    return render(request, 'veiculos/relatorio_por_veiculo.html', context)
+    return await sync_to_async(render)(request, 'veiculos/relatorio_por_veiculo.html', context)
+
+
+# ============= EXPORTAÇÃO =============
+
+def veiculo_exportar(request):
+    """Exporta os veículos da listagem (mesmos filtros) em CSV ou XLSX"""
+    veiculos, ordenacao = _filtrar_veiculos(request)
+    veiculos = veiculos.order_by(*ordenacao).annotate(
+        status_nome=Case(
+            *[When(status=valor, then=Value(nome)) for valor, nome in Veiculo.STATUS_CHOICES],
+            default=F('status'),
+        ),
+    ).values_list(
+        'marca', 'modelo', 'ano', 'placa', 'cor', 'km', 'chassi', 'renavam', 'fornecedor__nome',
+        'status_nome', 'data_compra', 'valor_compra', 'valor_venda', 'total_despesas',
+    )
+    colunas = [
+        'Marca', 'Modelo', 'Ano', 'Placa', 'Cor', 'KM', 'Chassi', 'RENAVAM', 'Fornecedor',
+        'Status', 'Data de Compra', 'Valor de Compra', 'Valor de Venda', 'Total de Despesas',
+    ]
+    return resposta_exportacao(request, 'veiculos', colunas, veiculos.iterator(chunk_size=TAMANHO_LOTE))
+
+
+def venda_exportar(request):
+    """Exporta as vendas (filtro opcional de período) em CSV ou XLSX"""
+    vendas = _filtrar_vendas(request).order_by('-data_venda', '-id').annotate(
+        valor_final=F('valor_venda') - F('valor_entrada'),
+    ).values_list(
+        'data_venda', 'veiculo__marca', 'veiculo__modelo', 'veiculo__placa', 'cliente__nome',
+        'cliente__cpf', 'forma_pagamento__nome', 'valor_venda', 'veiculo_entrada__placa',
+        'valor_entrada', 'valor_final',
+    )
+    colunas = [
+        'Data da Venda', 'Marca', 'Modelo', 'Placa', 'Cliente', 'CPF', 'Forma de Pagamento',
+        'Valor de Venda', 'Placa da Entrada', 'Valor da Entrada', 'Valor Final',
+    ]
+    return resposta_exportacao(request, 'vendas', colunas, vendas.iterator(chunk_size=TAMANHO_LOTE))
+
+
+def despesa_exportar(request):
+    """Exporta as despesas (filtros: período, veículo, tipo e fornecedor) em CSV ou XLSX"""
+    despesas = Despesa.objects.all()
+    
+    data_inicio = request.GET.get('data_inicio')
+    data_fim = request.GET.get('data_fim')
+    if data_inicio:
+        despesas = despesas.filter(data_despesa__gte=data_inicio)
+    if data_fim:
+        despesas = despesas.filter(data_despesa__lte=data_fim)
+    for campo in ('veiculo', 'tipo', 'fornecedor'):
+        if request.GET.get(campo):
+            despesas = despesas.filter(**{f'{campo}_id': request.GET[campo]})
+    
+    despesas = despesas.order_by('-data_despesa', '-id').values_list(
+        'data_despesa', 'veiculo__placa', 'veiculo__marca', 'veiculo__modelo',
+        'tipo__nome', 'fornecedor__nome', 'descricao', 'valor',
+    )
+    colunas = ['Data', 'Placa', 'Marca', 'Modelo', 'Tipo', 'Fornecedor', 'Descrição', 'Valor']
+    return resposta_exportacao(request, 'despesas', colunas, despesas.iterator(chunk_size=TAMANHO_LOTE))
+
+
+def relatorio_por_veiculo_exportar(request):
+    """Exporta o relatório de lucro por veículo (mesmos filtros) em CSV ou XLSX"""
+    veiculos = _filtrar_relatorio_por_veiculo(request).values_list(
+        'venda__data_venda', 'marca', 'modelo', 'ano', 'placa', 'venda__cliente__nome',
+        'valor_compra', 'venda__valor_venda', 'venda__valor_entrada',
+        'qtd_despesas', 'valor_despesas', 'valor_lucro_real',
+    )
+    colunas = [
+        'Data da Venda', 'Marca', 'Modelo', 'Ano', 'Placa', 'Cliente', 'Valor de Compra',
+        'Valor de Venda', 'Valor da Entrada', 'Qtd. Despesas', 'Despesas', 'Lucro',
+    ]
+    return resposta_exportacao(
+        request, 'lucro_por_veiculo', colunas, veiculos.iterator(chunk_size=TAMANHO_LOTE)
+    )
 
 
 # ============= CONFIGURAÇÕES =============
 
+@usar_replica
 def tipo_despesa_lista(request):
     """Lista tipos de despesa"""
     tipos = TipoDespesa.objects.all().order_by('nome')
@@ -573,6 +886,7 @@ def tipo_despesa_novo(request):
     return render(request, 'veiculos/tipo_despesa_form.html', context)
 
 
+@usar_replica
 def forma_pagamento_lista(request):
     """Lista formas de pagamento"""
     formas = FormaPagamento.objects.all().order_by('nome')